@@ -0,0 +1,55 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""The request loop shared by the scripts that serve over stdin/stdout."""
+
+import io
+import json
+import sys
+
+
+class JsonLinesServer(object):
+    """Serve requests over stdin/stdout until stdin is closed.
+
+    Each request is a single line of JSON with an "id".  Each response is
+    a single line of JSON with the same "id" and either the "results" or
+    an "error".  Subclasses implement _handle_request(), which returns
+    the results for a request (or raises).
+    """
+
+    def __init__(self, stdin=None, stdout=None):
+        if stdin is None:
+            stdin = io.open(sys.stdin.fileno(), encoding="utf-8")
+        self._input = stdin
+        self._output = stdout if stdout is not None else sys.stdout
+
+    def _handle_request(self, request):
+        raise NotImplementedError
+
+    def _process_request(self, request):
+        request = json.loads(request)
+        try:
+            results = self._handle_request(request)
+        except Exception as exc:
+            return {"id": request.get("id"), "error": str(exc)}
+        return {"id": request.get("id"), "results": results}
+
+    def _write_partial(self, request, results):
+        """Write some of the results before the final response."""
+        self._write_response(
+            {"id": request.get("id"), "results": results, "partial": True}
+        )
+
+    def _write_response(self, response):
+        self._output.write(json.dumps(response) + "\n")
+        self._output.flush()
+
+    def watch(self):
+        for line in iter(self._input.readline, ""):
+            if not line.strip():
+                continue
+            try:
+                response = self._process_request(line)
+            except Exception as exc:
+                response = {"id": None, "error": str(exc)}
+            self._write_response(response)
@@ -3,31 +3,47 @@
 
 import ast
 import io
-import operator
-import os
+import os.path
+import re
 import sys
 import textwrap
-import token
 import tokenize
 
+if __name__ == "__main__":
+    # pyvsc-run-isolated.py leaves this dir out of sys.path.
+    sys.path.insert(1, os.path.dirname(os.path.abspath(__file__)))
+
+from jsonLinesServer import JsonLinesServer
 
-class Visitor(ast.NodeVisitor):
-    def __init__(self, lines):
-        self._lines = lines
-        self.line_numbers_with_nodes = set()
-        self.line_numbers_with_statements = []
 
-    def generic_visit(self, node):
-        if (
-            hasattr(node, "col_offset")
-            and hasattr(node, "lineno")
-            and node.col_offset == 0
-        ):
-            self.line_numbers_with_nodes.add(node.lineno)
-            if isinstance(node, ast.stmt):
-                self.line_numbers_with_statements.append(node.lineno)
+_OTHER_LINE_BREAK_RE = re.compile("\r(?!\n)|[\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]")
+_CONTINUATION_KEYWORDS = frozenset(["elif", "else", "except", "finally"])
 
-        ast.NodeVisitor.generic_visit(self, node)
+
+def _iter_statement_line_numbers(statements):
+    """Yield the line number of each statement that starts a line.
+
+    Nested statements only qualify if they start at column 0 (e.g. after
+    a line continuation).  The statements are yielded in source order.
+    """
+    for node in statements:
+        if node.col_offset == 0:
+            # A decorated definition starts at its first decorator.
+            decorators = getattr(node, "decorator_list", None)
+            yield decorators[0].lineno if decorators else node.lineno
+        for child in _iter_child_statements(node):
+            yield child
+
+
+def _iter_child_statements(node):
+    # The fields are in source order.
+    for field in ("body", "handlers", "cases", "orelse", "finalbody"):
+        statements = getattr(node, field, ())
+        if field in ("handlers", "cases"):
+            # Neither exception handlers nor match cases are statements.
+            statements = [child for clause in statements for child in clause.body]
+        for lineno in _iter_statement_line_numbers(statements):
+            yield lineno
 
 
 def _tokenize(source):
@@ -39,10 +55,13 @@ def _tokenize(source):
     return tokenize.generate_tokens(io.StringIO(source).readline)
 
 
-def _indent_size(line):
-    for index, char in enumerate(line):
-        if not char.isspace():
-            return index
+def _get_blank_line_numbers(source):
+    """Return the numbers of the blank lines that are not inside a string."""
+    return [
+        spos[0]
+        for (toknum, tokval, spos, epos, line) in _tokenize(source)
+        if toknum == tokenize.NL and spos[0] == epos[0] and len(line.strip()) == 0
+    ]
 
 
 def _get_global_statement_blocks(source, lines):
@@ -53,17 +72,12 @@ def _get_global_statement_blocks(source, lines):
 
     """
     tree = ast.parse(source)
-    visitor = Visitor(lines)
-    visitor.visit(tree)
+    line_numbers = list(_iter_statement_line_numbers(tree.body))
+    end_line_numbers = [next_line_number - 1 for next_line_number in line_numbers[1:]]
+    end_line_numbers.append(len(lines))
 
     statement_ranges = []
-    for index, line_number in enumerate(visitor.line_numbers_with_statements):
-        remaining_line_numbers = visitor.line_numbers_with_statements[index + 1 :]
-        end_line_number = (
-            len(lines)
-            if len(remaining_line_numbers) == 0
-            else min(remaining_line_numbers) - 1
-        )
+    for line_number, end_line_number in zip(line_numbers, end_line_numbers):
         current_statement_is_oneline = line_number == end_line_number
 
         if len(statement_ranges) == 0:
@@ -84,17 +98,7 @@ def _get_global_statement_blocks(source, lines):
     return statement_ranges
 
 
-def normalize_lines(source):
-    """Normalize blank lines for sending to the terminal.
-
-    Blank lines within a statement block are removed to prevent the REPL
-    from thinking the block is finished. Newlines are added to separate
-    top-level statements so that the REPL does not think there is a syntax
-    error.
-
-    """
-    # Ensure to dedent the code (#2837)
-    lines = textwrap.dedent(source).splitlines(False)
+def _get_trailing_newline(source, lines):
     # If we have two blank lines, then add two blank lines.
     # Do not trim the spaces, if we have blank lines with spaces, its possible
     # we have indented code.
@@ -107,42 +111,196 @@ def normalize_lines(source):
         trailing_newline = "\n"
     else:
         trailing_newline = ""
+    return trailing_newline
 
-    # Step 1: Remove empty lines.
-    tokens = _tokenize(source)
-    newlines_indexes_to_remove = (
-        spos[0]
-        for (toknum, tokval, spos, epos, line) in tokens
-        if len(line.strip()) == 0
-        and token.tok_name[toknum] == "NL"
-        and spos[0] == epos[0]
-    )
 
-    for line_number in reversed(list(newlines_indexes_to_remove)):
-        del lines[line_number - 1]
+def normalize_source(source):
+    """Return the source with blank lines normalized (see normalize_lines())."""
+    # Ensure to dedent the code (#2837)
+    lines = textwrap.dedent(source).splitlines(False)
+    trailing_newline = _get_trailing_newline(source, lines)
+
+    # Step 1: Remove empty lines.
+    blank_line_numbers = set(_get_blank_line_numbers(source))
+    lines = [
+        line
+        for line_number, line in enumerate(lines, 1)
+        if line_number not in blank_line_numbers
+    ]
 
     # Step 2: Add blank lines between each global statement block.
     # A consecutive single lines blocks of code will be treated as a single statement,
     # just to ensure we do not unnecessarily add too many blank lines.
-    source = "\n".join(lines)
-    tokens = _tokenize(source)
-    dedent_indexes = (
-        spos[0]
-        for (toknum, tokval, spos, epos, line) in tokens
-        if toknum == token.DEDENT and _indent_size(line) == 0
-    )
+    global_statement_ranges = _get_global_statement_blocks("\n".join(lines), lines)
+    start_positions = set(start for start, _, _ in global_statement_ranges)
+    normalized = []
+    for line_number, line in enumerate(lines, 1):
+        if line_number > 1 and line_number in start_positions:
+            normalized.append("")
+        normalized.append(line)
+
+    return "\n".join(normalized) + trailing_newline
+
+
+class _BlockStream(object):
+    """Split normalized source into blocks as top-level chunks are added.
+
+    This mirrors normalize_source(), except that the statements are
+    parsed a chunk at a time and each separator line is only decided
+    once the next statement is known.
+    """
+
+    def __init__(self, lines, trailing_newline):
+        self._lines = lines
+        self._trailing_newline = trailing_newline
+        self.removed = set()
+        # The (original) line number where the next chunk starts.
+        self.chunk_start = 1
+        # The normalized lines that have not been yielded yet.
+        self._pending = []
+        self._pending_start = 1
+        self._kept = 0
+        # The start of the statement whose block is not decided yet.
+        self._current = None
+        self._previous_oneline = None
 
-    global_statement_ranges = _get_global_statement_blocks(source, lines)
-    start_positions = map(operator.itemgetter(0), reversed(global_statement_ranges))
-    for line_number in filter(lambda x: x > 1, start_positions):
-        lines.insert(line_number - 1, "")
+    def add_chunk(self, end):
+        """Yield the blocks completed by the lines before "end"."""
+        chunk = self._lines[self.chunk_start - 1 : end - 1]
+        kept = [
+            line
+            for line_number, line in enumerate(chunk, self.chunk_start)
+            if line_number not in self.removed
+        ]
+        tree = ast.parse("\n".join(kept))
+        offset = self._kept
+        self._pending.extend(kept)
+        self._kept += len(kept)
+        self.chunk_start = end
+        for line_number in _iter_statement_line_numbers(tree.body):
+            line_number += offset
+            if self._current is not None:
+                for block in self._add_statement(self._current, line_number - 1):
+                    yield block
+            self._current = line_number
 
-    sys.stdout.write("\n".join(lines) + trailing_newline)
+    def finish(self):
+        """Yield the remaining blocks."""
+        for block in self.add_chunk(len(self._lines) + 1):
+            yield block
+        if self._current is not None:
+            for block in self._add_statement(self._current, self._kept):
+                yield block
+        yield "\n".join(self._pending) + self._trailing_newline
+
+    def _add_statement(self, line_number, end_line_number):
+        current_statement_is_oneline = line_number == end_line_number
+        previous_statement_is_oneline = self._previous_oneline
+        self._previous_oneline = current_statement_is_oneline
+        if previous_statement_is_oneline and current_statement_is_oneline:
+            return
+        if line_number > 1:
+            # Everything up to the blank separator line is a block.
+            count = line_number - self._pending_start
+            yield "\n".join(self._pending[:count]) + "\n\n"
+            del self._pending[:count]
+            self._pending_start = line_number
+
+
+def iter_normalized_blocks(source):
+    """Yield the normalized source (see normalize_source()) in blocks.
+
+    Each block ends with the blank line that separates it from the next
+    top-level statement block, so it can be sent to the REPL (and run)
+    on its own.  The blocks are yielded while the source is still being
+    tokenized, so the first ones are available before the rest of the
+    source is processed.  Joined together they match normalize_source().
+    If the source is invalid then the error is raised once the invalid
+    part is reached.
+    """
+    if _OTHER_LINE_BREAK_RE.search(source):
+        # The tokenizer would not count these as line breaks, unlike
+        # str.splitlines(), so the line numbers would not match up.
+        yield normalize_source(source)
+        return
+    # Ensure to dedent the code (#2837)
+    lines = textwrap.dedent(source).splitlines(False)
+    stream = _BlockStream(lines, _get_trailing_newline(source, lines))
+    at_line_start = True
+    previous_first_token = None
+    for (toknum, tokval, spos, epos, line) in _tokenize(source):
+        if toknum == tokenize.NL:
+            if spos[0] == epos[0] and len(line.strip()) == 0:
+                stream.removed.add(spos[0])
+        elif toknum == tokenize.NEWLINE:
+            at_line_start = True
+        elif toknum in (tokenize.COMMENT, tokenize.INDENT, tokenize.DEDENT):
+            continue
+        elif at_line_start and toknum != tokenize.ENDMARKER:
+            at_line_start = False
+            line_number = spos[0]
+            if lines[line_number - 1][:1].isspace():
+                continue
+            # A top-level logical line starts a new chunk, unless it
+            # continues the previous statement.
+            if (
+                line_number > stream.chunk_start
+                and tokval not in _CONTINUATION_KEYWORDS
+                and previous_first_token != "@"
+            ):
+                for block in stream.add_chunk(line_number):
+                    yield block
+            previous_first_token = tokval
+    for block in stream.finish():
+        yield block
+
+
+def normalize_lines(source):
+    """Normalize blank lines for sending to the terminal.
+
+    Blank lines within a statement block are removed to prevent the REPL
+    from thinking the block is finished. Newlines are added to separate
+    top-level statements so that the REPL does not think there is a syntax
+    error.
+
+    """
+    sys.stdout.write(normalize_source(source))
     sys.stdout.flush()
 
 
-if __name__ == "__main__":
-    contents = sys.argv[1]
+class NormalizationServer(JsonLinesServer):
+    """Serve normalization requests over stdin/stdout until stdin is closed.
+
+    Each request has either the "code" to normalize or a list of "codes"
+    (e.g. several cells), which are normalized separately in one round
+    trip.  For "codes" the results are a list with either the normalized
+    "code" or an "error" for each one.  See JsonLinesServer for the rest
+    of the protocol.
+
+    When a "code" request has "stream" set, each top-level block (see
+    iter_normalized_blocks()) is written as a "partial" response as
+    soon as it is ready.  The final (non-partial) response then has
+    empty results, or the error if the rest of the code is invalid.
+    """
+
+    def _handle_request(self, request):
+        if "codes" in request:
+            return [self._normalize(code) for code in request["codes"]]
+        elif request.get("stream"):
+            for block in iter_normalized_blocks(request["code"]):
+                self._write_partial(request, block)
+            return ""
+        else:
+            return normalize_source(request["code"])
+
+    def _normalize(self, code):
+        try:
+            return {"code": normalize_source(code)}
+        except Exception as exc:
+            return {"error": str(exc)}
+
+
+def _fix_contents(contents):
     try:
         default_encoding = sys.getdefaultencoding()
         encoded_contents = contents.encode(default_encoding, "surrogateescape")
@@ -151,4 +309,12 @@ if __name__ == "__main__":
         pass
     if isinstance(contents, bytes):
         contents = contents.decode("utf8")
-    normalize_lines(contents)
+    return contents
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["--server"]:
+        NormalizationServer().watch()
+        sys.exit(0)
+
+    normalize_lines(_fix_contents(sys.argv[1]))
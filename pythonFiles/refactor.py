@@ -2,13 +2,21 @@
 # 1. Working directory.
 # 2. Rope folder
 
+import atexit
+import contextlib
 import difflib
 import io
 import json
 import os
 import sys
+import time
 import traceback
 
+try:
+    from concurrent import futures
+except ImportError:
+    futures = None
+
 try:
     import rope
     from rope.base import libutils
@@ -28,6 +36,9 @@ except:
 
 WORKSPACE_ROOT = sys.argv[1]
 ROPE_PROJECT_FOLDER = ".vscode/.ropeproject"
+# Change sets smaller than this are diffed in-process; the pool
+# only pays off for large (e.g. project-wide rename) change sets.
+PARALLEL_DIFF_THRESHOLD = 16
 
 
 class RefactorProgress:
@@ -66,6 +77,15 @@ class Change:
 
 def get_diff(changeset):
     """This is a copy of the code form the ChangeSet.get_description method found in Rope."""
+    return _unified_diff(*_get_diff_args(changeset))
+
+
+def _get_diff_args(changeset):
+    """Return (path, old, new) for the given change.
+
+    Reading the resource goes through rope, so this must happen in the
+    main process.  The result is plain data that may be diffed anywhere.
+    """
     new = changeset.new_contents
     old = changeset.old_contents
     if old is None:
@@ -73,7 +93,10 @@ def get_diff(changeset):
             old = changeset.resource.read()
         else:
             old = ""
+    return changeset.resource.path, old, new
 
+
+def _unified_diff(path, old, new):
     # Ensure code has a trailing empty lines, before generating a diff.
     # https://github.com/Microsoft/vscode-python/issues/695.
     old_lines = old.splitlines(True)
@@ -84,12 +107,58 @@ def get_diff(changeset):
     result = difflib.unified_diff(
         old_lines,
         new.splitlines(True),
-        "a/" + changeset.resource.path,
-        "b/" + changeset.resource.path,
+        "a/" + path,
+        "b/" + path,
     )
     return "".join(list(result))
 
 
+_diff_executor = None
+
+
+def _get_diff_executor():
+    """Return the (lazily created) process pool used to build diffs."""
+    global _diff_executor
+    if _diff_executor is None:
+        _diff_executor = futures.ProcessPoolExecutor()
+    return _diff_executor
+
+
+@atexit.register
+def _shutdown_diff_executor():
+    """Stop the pool's worker processes, if there are any."""
+    global _diff_executor
+    if _diff_executor is not None:
+        _diff_executor.shutdown()
+        _diff_executor = None
+
+
+def iter_diffs(changes, ordered=True):
+    """Yield (change, diff) for each of the given rope changes.
+
+    Large change sets are diffed across a process pool.  If "ordered"
+    is False then results are yielded as soon as each file is done,
+    rather than in change set order.
+    """
+    if futures is None or len(changes) < PARALLEL_DIFF_THRESHOLD:
+        for change in changes:
+            yield change, get_diff(change)
+        return
+
+    executor = _get_diff_executor()
+    submitted = [
+        (executor.submit(_unified_diff, *_get_diff_args(change)), change)
+        for change in changes
+    ]
+    if ordered:
+        for future, change in submitted:
+            yield change, future.result()
+    else:
+        pending = dict(submitted)
+        for future in futures.as_completed(pending):
+            yield pending[future], future.result()
+
+
 class BaseRefactoring(object):
     """
     Base class for refactorings
@@ -102,6 +171,9 @@ class BaseRefactoring(object):
         self.project = project
         self.resource = resource
         self.changes = []
+        self._changeCallback = None
+        # Seconds spent in each phase ("analysis", "changes", "diff").
+        self.timings = {}
 
     def _update_progress(self):
         jobset = self._handle.current_jobset()
@@ -123,7 +195,13 @@ class BaseRefactoring(object):
     def stop(self):
         self._handle.stop()
 
-    def refactor(self):
+    def refactor(self, changeCallback=None):
+        """Run the refactoring.
+
+        If "changeCallback" is provided then it is called with each
+        Change as soon as its diff is ready (in no particular order).
+        """
+        self._changeCallback = changeCallback
         try:
             self.onRefactor()
         except rope.base.exceptions.InterruptedTaskError:
@@ -136,6 +214,27 @@ class BaseRefactoring(object):
         """
         pass
 
+    @contextlib.contextmanager
+    def _timed(self, phase):
+        start = time.time()
+        try:
+            yield
+        finally:
+            elapsed = time.time() - start
+            self.timings[phase] = self.timings.get(phase, 0) + elapsed
+
+    def _add_changes(self, changes):
+        for item in changes.changes:
+            if not isinstance(item, rope.base.change.ChangeContents):
+                raise Exception("Unknown Change")
+        ordered = self._changeCallback is None
+        with self._timed("diff"):
+            for item, diff in iter_diffs(changes.changes, ordered=ordered):
+                change = Change(item.resource.real_path, ChangeType.EDIT, diff)
+                self.changes.append(change)
+                if self._changeCallback is not None:
+                    self._changeCallback(change)
+
 
 class RenameRefactor(BaseRefactoring):
     def __init__(
@@ -152,15 +251,11 @@ class RenameRefactor(BaseRefactoring):
         self.startOffset = startOffset
 
     def onRefactor(self):
-        renamed = Rename(self.project, self.resource, self.startOffset)
-        changes = renamed.get_changes(self._newName, task_handle=self._handle)
-        for item in changes.changes:
-            if isinstance(item, rope.base.change.ChangeContents):
-                self.changes.append(
-                    Change(item.resource.real_path, ChangeType.EDIT, get_diff(item))
-                )
-            else:
-                raise Exception("Unknown Change")
+        with self._timed("analysis"):
+            renamed = Rename(self.project, self.resource, self.startOffset)
+        with self._timed("changes"):
+            changes = renamed.get_changes(self._newName, task_handle=self._handle)
+        self._add_changes(changes)
 
 
 class ExtractVariableRefactor(BaseRefactoring):
@@ -184,17 +279,13 @@ class ExtractVariableRefactor(BaseRefactoring):
         self._global = global_
 
     def onRefactor(self):
-        renamed = ExtractVariable(
-            self.project, self.resource, self._startOffset, self._endOffset
-        )
-        changes = renamed.get_changes(self._newName, self._similar, self._global)
-        for item in changes.changes:
-            if isinstance(item, rope.base.change.ChangeContents):
-                self.changes.append(
-                    Change(item.resource.real_path, ChangeType.EDIT, get_diff(item))
-                )
-            else:
-                raise Exception("Unknown Change")
+        with self._timed("analysis"):
+            renamed = ExtractVariable(
+                self.project, self.resource, self._startOffset, self._endOffset
+            )
+        with self._timed("changes"):
+            changes = renamed.get_changes(self._newName, self._similar, self._global)
+        self._add_changes(changes)
 
 
 class ExtractMethodRefactor(ExtractVariableRefactor):
@@ -224,17 +315,13 @@ class ExtractMethodRefactor(ExtractVariableRefactor):
         )
 
     def onRefactor(self):
-        renamed = ExtractMethod(
-            self.project, self.resource, self._startOffset, self._endOffset
-        )
-        changes = renamed.get_changes(self._newName, self._similar, self._global)
-        for item in changes.changes:
-            if isinstance(item, rope.base.change.ChangeContents):
-                self.changes.append(
-                    Change(item.resource.real_path, ChangeType.EDIT, get_diff(item))
-                )
-            else:
-                raise Exception("Unknown Change")
+        with self._timed("analysis"):
+            renamed = ExtractMethod(
+                self.project, self.resource, self._startOffset, self._endOffset
+            )
+        with self._timed("changes"):
+            changes = renamed.get_changes(self._newName, self._similar, self._global)
+        self._add_changes(changes)
 
 
 class RopeRefactoring(object):
@@ -242,10 +329,13 @@ class RopeRefactoring(object):
         self.default_sys_path = sys.path
         self._input = io.open(sys.stdin.fileno(), encoding="utf-8")
 
-    def _rename(self, filePath, start, newName, indent_size):
+    def _rename(
+        self, filePath, start, newName, indent_size, onChange=None, timings=None
+    ):
         """
         Renames a variable
         """
+        began = time.time()
         project = rope.base.project.Project(
             WORKSPACE_ROOT,
             ropefolder=ROPE_PROJECT_FOLDER,
@@ -256,18 +346,25 @@ class RopeRefactoring(object):
         refactor = RenameRefactor(
             project, resourceToRefactor, startOffset=start, newName=newName
         )
-        refactor.refactor()
+        opened = time.time()
+        refactor.refactor(onChange)
         changes = refactor.changes
         project.close()
+        if timings is not None:
+            timings["open"] = opened - began
+            timings.update(refactor.timings)
         valueToReturn = []
         for change in changes:
             valueToReturn.append({"diff": change.diff})
         return valueToReturn
 
-    def _extractVariable(self, filePath, start, end, newName, indent_size):
+    def _extractVariable(
+        self, filePath, start, end, newName, indent_size, onChange=None, timings=None
+    ):
         """
         Extracts a variable
         """
+        began = time.time()
         project = rope.base.project.Project(
             WORKSPACE_ROOT,
             ropefolder=ROPE_PROJECT_FOLDER,
@@ -283,18 +380,25 @@ class RopeRefactoring(object):
             newName=newName,
             similar=True,
         )
-        refactor.refactor()
+        opened = time.time()
+        refactor.refactor(onChange)
         changes = refactor.changes
         project.close()
+        if timings is not None:
+            timings["open"] = opened - began
+            timings.update(refactor.timings)
         valueToReturn = []
         for change in changes:
             valueToReturn.append({"diff": change.diff})
         return valueToReturn
 
-    def _extractMethod(self, filePath, start, end, newName, indent_size):
+    def _extractMethod(
+        self, filePath, start, end, newName, indent_size, onChange=None, timings=None
+    ):
         """
         Extracts a method
         """
+        began = time.time()
         project = rope.base.project.Project(
             WORKSPACE_ROOT,
             ropefolder=ROPE_PROJECT_FOLDER,
@@ -310,19 +414,44 @@ class RopeRefactoring(object):
             newName=newName,
             similar=True,
         )
-        refactor.refactor()
+        opened = time.time()
+        refactor.refactor(onChange)
         changes = refactor.changes
         project.close()
+        if timings is not None:
+            timings["open"] = opened - began
+            timings.update(refactor.timings)
         valueToReturn = []
         for change in changes:
             valueToReturn.append({"diff": change.diff})
         return valueToReturn
 
-    def _serialize(self, identifier, results):
+    def _serialize(self, identifier, results, partial=False, timings=None):
         """
         Serializes the refactor results
         """
-        return json.dumps({"id": identifier, "results": results})
+        response = {"id": identifier, "results": results}
+        if partial:
+            response["partial"] = True
+        if timings is not None:
+            response["timings"] = timings
+        return json.dumps(response)
+
+    def _get_change_writer(self, request):
+        """Return the per-file callback to use for the request, if any.
+
+        When the request has "stream" set, each file's diff is written
+        as a "partial" response as soon as it is ready.  The final
+        (non-partial) response then has no results of its own.
+        """
+        if not request.get("stream"):
+            return None
+
+        def write_change(change):
+            response = self._serialize(request["id"], [{"diff": change.diff}], True)
+            self._write_response(response)
+
+        return write_change
 
     def _deserialize(self, request):
         """Deserialize request from VSCode.
@@ -340,16 +469,18 @@ class RopeRefactoring(object):
         request = self._deserialize(request)
         lookup = request.get("lookup", "")
 
-        if lookup == "":
-            pass
-        elif lookup == "rename":
+        onChange = self._get_change_writer(request)
+        # Per-phase timings are only reported when asked for.
+        timings = {} if request.get("timings") else None
+        if lookup == "rename":
             changes = self._rename(
                 request["file"],
                 int(request["start"]),
                 request["name"],
                 int(request["indent_size"]),
+                onChange,
+                timings,
             )
-            return self._write_response(self._serialize(request["id"], changes))
         elif lookup == "extract_variable":
             changes = self._extractVariable(
                 request["file"],
@@ -357,8 +488,9 @@ class RopeRefactoring(object):
                 int(request["end"]),
                 request["name"],
                 int(request["indent_size"]),
+                onChange,
+                timings,
             )
-            return self._write_response(self._serialize(request["id"], changes))
         elif lookup == "extract_method":
             changes = self._extractMethod(
                 request["file"],
@@ -366,8 +498,18 @@ class RopeRefactoring(object):
                 int(request["end"]),
                 request["name"],
                 int(request["indent_size"]),
+                onChange,
+                timings,
             )
-            return self._write_response(self._serialize(request["id"], changes))
+        else:
+            return
+
+        if onChange is not None:
+            # The results were already written as they came in.
+            changes = []
+        return self._write_response(
+            self._serialize(request["id"], changes, timings=timings)
+        )
 
     def _write_response(self, response):
         sys.stdout.write(response + "\n")
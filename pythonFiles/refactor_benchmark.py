@@ -0,0 +1,292 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""Measure refactor.py against a synthetic project.
+
+A package tree is generated with a configurable number of modules,
+cross-imports and uses of a shared symbol.  refactor.py is then driven
+through its stdin protocol (exactly as the extension does) for a rename,
+an extract variable and an extract method.  For each operation the wall
+time and the per-phase timings reported by refactor.py are printed,
+followed by the peak memory of the refactoring process.
+
+This script is only used for extension development.
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import os.path
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue  # 2.7
+
+try:
+    import resource
+except ImportError:
+    resource = None  # Windows
+
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "refactor.py")
+PHASES = ("open", "analysis", "changes", "diff")
+
+CORE_MODULE = """\
+SHARED_SCALE = 3
+
+
+def shared_symbol(value, offset=0):
+    scaled = value * SHARED_SCALE
+    total = scaled + offset
+    return total
+"""
+
+
+#############################
+# the synthetic project
+
+
+def generate_project(root, modules=100, packages=10, imports=3, uses=5, functions=5):
+    """Write a synthetic package tree under "root".
+
+    Return the path to the module that holds the shared symbol.
+    """
+    pkgdir = os.path.join(root, "pkg")
+    _makedirs(pkgdir)
+    _write(os.path.join(pkgdir, "__init__.py"), "")
+    corefile = os.path.join(pkgdir, "core.py")
+    _write(corefile, CORE_MODULE)
+
+    packages = max(1, min(packages, modules))
+    for pkgindex in range(packages):
+        subdir = os.path.join(pkgdir, "sub{}".format(pkgindex))
+        _makedirs(subdir)
+        _write(os.path.join(subdir, "__init__.py"), "")
+
+    for index in range(modules):
+        source = _generate_module(index, packages, imports, uses, functions)
+        filename = os.path.join(
+            pkgdir, "sub{}".format(index % packages), "mod{}.py".format(index)
+        )
+        _write(filename, source)
+    return corefile
+
+
+def _generate_module(index, packages, imports, uses, functions):
+    lines = ["from pkg.core import shared_symbol, SHARED_SCALE"]
+    # Only import lower-numbered modules so there are no cycles.
+    imported = list(range(max(0, index - imports), index))
+    for other in imported:
+        lines.append(
+            "from pkg.sub{} import mod{}".format(other % packages, other),
+        )
+    lines.append("")
+    for funcindex in range(functions):
+        lines.append("")
+        lines.append("def func_{}_{}(value):".format(index, funcindex))
+        lines.append("    result = value")
+        for _ in range(uses):
+            lines.append("    result += shared_symbol(result, SHARED_SCALE)")
+        for other in imported:
+            lines.append("    result += mod{}.func_{}_0(value)".format(other, other))
+        lines.append("    return result")
+    lines.append("")
+    lines.append("")
+    lines.append("class Class{}(object):".format(index))
+    lines.append("    def method(self, value):")
+    lines.append("        return shared_symbol(value) + func_{}_0(value)".format(index))
+    lines.append("")
+    return "\n".join(lines)
+
+
+def _makedirs(dirname):
+    # The project may already be there, e.g. from an earlier run with
+    # the same --root.  (os.makedirs() has no "exist_ok" on 2.7.)
+    if not os.path.isdir(dirname):
+        os.makedirs(dirname)
+
+
+def _write(filename, text):
+    with open(filename, "w") as outfile:
+        outfile.write(text)
+
+
+#############################
+# driving refactor.py
+
+
+class RefactorProcess(object):
+    """A refactor.py process, talked to the same way the extension does."""
+
+    def __init__(self, root, python=sys.executable):
+        self._proc = subprocess.Popen(
+            [python, SCRIPT, root],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+        self._responses = queue.Queue()
+        for stream, kind in [(self._proc.stdout, "out"), (self._proc.stderr, "err")]:
+            thread = threading.Thread(target=self._read, args=(stream, kind))
+            thread.daemon = True
+            thread.start()
+        kind, line = self._responses.get()
+        if kind != "out" or not line.startswith("STARTED"):
+            self.close()
+            raise RuntimeError("refactor.py failed to start: {}".format(line))
+
+    def _read(self, stream, kind):
+        # refactor.py writes errors to stderr without a trailing newline,
+        # so we cannot rely on readline() there.
+        if kind == "err":
+            while True:
+                data = os.read(stream.fileno(), 65536)
+                if not data:
+                    break
+                self._responses.put((kind, data.decode("utf-8", "replace")))
+        else:
+            for line in iter(stream.readline, ""):
+                self._responses.put((kind, line))
+        self._responses.put((kind, None))
+
+    def request(self, **request):
+        """Send the request and return (response, wall time)."""
+        started = time.time()
+        self._proc.stdin.write(json.dumps(request) + "\n")
+        self._proc.stdin.flush()
+        while True:
+            kind, data = self._responses.get()
+            if data is None:
+                raise RuntimeError("refactor.py exited unexpectedly")
+            if kind == "err":
+                raise RuntimeError("refactor.py failed: {}".format(data))
+            response = json.loads(data)
+            if not response.get("partial"):
+                return response, time.time() - started
+
+    def close(self):
+        """Stop the process and return its peak memory (in KiB), if known."""
+        self._proc.kill()
+        self._proc.wait()
+        if resource is None:
+            return None
+        maxrss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        if sys.platform == "darwin":
+            maxrss //= 1024  # bytes
+        return maxrss
+
+
+def run_benchmark(root, corefile, repeat=1, python=sys.executable):
+    """Return (results, peak memory) for the standard operations."""
+    with open(corefile) as infile:
+        text = infile.read()
+    name = text.index("shared_symbol")
+    expr = text.index("value * SHARED_SCALE")
+    body = text.index("    scaled = ")
+    operations = [
+        ("rename", dict(start=name, name="renamed_symbol")),
+        (
+            "extract_variable",
+            dict(start=expr, end=expr + len("value * SHARED_SCALE"), name="extracted"),
+        ),
+        (
+            "extract_method",
+            dict(start=body, end=text.index("    return total"), name="extracted"),
+        ),
+    ]
+
+    results = []
+    proc = RefactorProcess(root, python)
+    try:
+        for lookup, kwargs in operations:
+            for _ in range(repeat):
+                response, elapsed = proc.request(
+                    id=lookup,
+                    lookup=lookup,
+                    file=corefile,
+                    indent_size=4,
+                    timings=True,
+                    **kwargs
+                )
+                results.append(
+                    {
+                        "lookup": lookup,
+                        "wall": elapsed,
+                        "files": len(response["results"]),
+                        "timings": response.get("timings") or {},
+                    }
+                )
+    finally:
+        peak = proc.close()
+    return results, peak
+
+
+#############################
+# reporting
+
+
+def report(results, peak, _print=print):
+    header = ["operation", "files", "wall"] + list(PHASES)
+    _print(" ".join("{:>16}".format(h) for h in header))
+    for result in results:
+        row = [result["lookup"], result["files"], "{:.3f}".format(result["wall"])]
+        for phase in PHASES:
+            value = result["timings"].get(phase)
+            row.append("-" if value is None else "{:.3f}".format(value))
+        _print(" ".join("{:>16}".format(v) for v in row))
+    if peak is not None:
+        _print()
+        _print("peak memory: {:.1f} MiB".format(peak / 1024.0))
+
+
+def parse_args(argv=sys.argv[1:], prog=sys.argv[0]):
+    parser = argparse.ArgumentParser(prog=prog, description=__doc__.splitlines()[0])
+    parser.add_argument("--modules", type=int, default=100)
+    parser.add_argument("--packages", type=int, default=10)
+    parser.add_argument(
+        "--imports", type=int, default=3, help="cross-imports per module"
+    )
+    parser.add_argument(
+        "--uses", type=int, default=5, help="uses of the shared symbol per function"
+    )
+    parser.add_argument("--functions", type=int, default=5, help="per module")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--python", default=sys.executable)
+    parser.add_argument("--root", help="generate the project here (kept)")
+    parser.add_argument("--json", action="store_true")
+    return parser.parse_args(argv)
+
+
+def main(args):
+    root = args.root or tempfile.mkdtemp(prefix="refactor-benchmark-")
+    try:
+        corefile = generate_project(
+            root,
+            modules=args.modules,
+            packages=args.packages,
+            imports=args.imports,
+            uses=args.uses,
+            functions=args.functions,
+        )
+        results, peak = run_benchmark(root, corefile, args.repeat, args.python)
+    finally:
+        if not args.root:
+            shutil.rmtree(root, ignore_errors=True)
+    if args.json:
+        print(json.dumps({"results": results, "peak_kib": peak}, indent=4))
+    else:
+        report(results, peak)
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,277 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""Build and incrementally refresh a symbol index for a whole workspace.
+
+Files are parsed with symbolProvider across a process pool.  The index
+is persisted (keyed by each file's path, mtime and size) so that only
+files which changed since the last run are parsed again.
+
+Like symbolProvider, this requires Python 3.
+"""
+
+import argparse
+import json
+import os
+import os.path
+import sys
+import zlib
+from concurrent import futures
+
+if __name__ == "__main__":
+    # pyvsc-run-isolated.py leaves this dir out of sys.path.
+    sys.path.insert(1, os.path.dirname(os.path.abspath(__file__)))
+
+import symbolProvider
+
+
+FORMAT_VERSION = 1
+DEFAULT_CACHE = os.path.join(".vscode", ".symbolindex")
+EXCLUDED_DIRS = frozenset(
+    [
+        ".git",
+        ".hg",
+        ".svn",
+        ".tox",
+        ".nox",
+        ".venv",
+        ".vscode",
+        "__pycache__",
+        "node_modules",
+        "site-packages",
+    ]
+)
+# Fewer changed files than this are parsed in-process.
+PARALLEL_THRESHOLD = 32
+
+# The keys of symbolProvider's results, mapped to the symbol kind.
+KINDS = {
+    "classes": "class",
+    "methods": "method",
+    "functions": "function",
+}
+
+
+def iter_python_files(root, excluded=EXCLUDED_DIRS):
+    """Yield the root-relative path of each Python file under "root"."""
+    for dirname, subdirs, filenames in os.walk(root):
+        subdirs[:] = sorted(d for d in subdirs if d not in excluded)
+        reldir = os.path.relpath(dirname, root)
+        for filename in sorted(filenames):
+            if filename.endswith(".py"):
+                yield os.path.normpath(os.path.join(reldir, filename))
+
+
+def _stat(filename):
+    st = os.stat(filename)
+    return getattr(st, "st_mtime_ns", st.st_mtime), st.st_size
+
+
+def _parse_file(filename):
+    """Return the compact symbols for the given file.
+
+    Each symbol is (kind, name, namespace, startline, startcol, endline,
+    endcol).  Files that cannot be read or parsed have no symbols.
+    """
+    try:
+        with open(filename, "rb") as infile:
+            source = infile.read()
+        symbols = symbolProvider.get_symbols(source)
+    except Exception:
+        # Broken files (e.g. syntax errors) must not stop indexing.
+        return []
+    compact = []
+    for key, kind in sorted(KINDS.items()):
+        for symbol in symbols.get(key, ()):
+            start = symbol["range"]["start"]
+            end = symbol["range"]["end"]
+            compact.append(
+                (
+                    kind,
+                    symbol["name"],
+                    symbol["namespace"],
+                    start["line"],
+                    start["character"],
+                    end["line"],
+                    end["character"],
+                )
+            )
+    return compact
+
+
+class SymbolIndex(object):
+    """The symbols of every Python file in a workspace."""
+
+    def __init__(self, root, files=None):
+        self.root = root
+        # {relpath: (mtime, size, [symbol])}
+        self.files = files if files is not None else {}
+
+    @classmethod
+    def load(cls, root, filename):
+        """Return the index stored in the given file.
+
+        If the file is missing, unreadable, from a different format
+        version or for a different root then an empty index is returned.
+        """
+        try:
+            with open(filename, "rb") as infile:
+                data = json.loads(zlib.decompress(infile.read()).decode("utf-8"))
+        except (OSError, ValueError, zlib.error):
+            return cls(root)
+        if data.get("version") != FORMAT_VERSION or data.get("root") != root:
+            return cls(root)
+        files = {
+            relpath: (mtime, size, [tuple(s) for s in symbols])
+            for relpath, (mtime, size, symbols) in data["files"].items()
+        }
+        return cls(root, files)
+
+    def save(self, filename):
+        """Write the index to the given file (atomically)."""
+        data = {
+            "version": FORMAT_VERSION,
+            "root": self.root,
+            "files": self.files,
+        }
+        serialized = json.dumps(data, separators=(",", ":")).encode("utf-8")
+        dirname = os.path.dirname(filename)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        tmpname = filename + ".tmp"
+        with open(tmpname, "wb") as outfile:
+            outfile.write(zlib.compress(serialized))
+        os.replace(tmpname, filename)
+
+    def __len__(self):
+        return sum(len(symbols) for _, _, symbols in self.files.values())
+
+    def update(self, jobs=None, excluded=EXCLUDED_DIRS):
+        """Re-parse every file that changed since it was last indexed.
+
+        Return (number of files parsed, number of files removed).
+        """
+        changed, removed = self.refresh(jobs, excluded)
+        return len(changed), len(removed)
+
+    def refresh(self, jobs=None, excluded=EXCLUDED_DIRS, relpaths=None):
+        """Re-parse the files that changed and drop the ones that are gone.
+
+        If "relpaths" is provided then only those files are checked,
+        rather than walking the whole workspace.  They may also be
+        absolute and are matched up with the indexed files as the walk
+        would find them.
+
+        Return (changed relpaths, removed relpaths).
+        """
+        if relpaths is None:
+            candidates = iter_python_files(self.root, excluded)
+        else:
+            relpaths = self._normalize_relpaths(relpaths)
+            candidates = relpaths
+        current = {}
+        changed = []
+        for relpath in candidates:
+            try:
+                stamp = _stat(os.path.join(self.root, relpath))
+            except OSError:
+                continue
+            current[relpath] = stamp
+            cached = self.files.get(relpath)
+            if cached is None or tuple(cached[:2]) != stamp:
+                changed.append(relpath)
+
+        if relpaths is None:
+            candidates = list(self.files)
+        else:
+            candidates = [relpath for relpath in relpaths if relpath in self.files]
+        removed = [relpath for relpath in candidates if relpath not in current]
+        for relpath in removed:
+            del self.files[relpath]
+
+        filenames = [os.path.join(self.root, relpath) for relpath in changed]
+        for relpath, symbols in zip(changed, self._parse_all(filenames, jobs)):
+            mtime, size = current[relpath]
+            self.files[relpath] = (mtime, size, symbols)
+        return changed, removed
+
+    def _normalize_relpaths(self, relpaths):
+        # {normcased relpath: relpath} for the indexed files
+        known = {os.path.normcase(relpath): relpath for relpath in self.files}
+        normalized = []
+        seen = set()
+        for relpath in relpaths:
+            if os.path.isabs(relpath):
+                relpath = os.path.relpath(relpath, self.root)
+            relpath = os.path.normpath(relpath)
+            relpath = known.get(os.path.normcase(relpath), relpath)
+            if relpath not in seen:
+                seen.add(relpath)
+                normalized.append(relpath)
+        return normalized
+
+    def _parse_all(self, filenames, jobs):
+        if jobs == 1 or len(filenames) < PARALLEL_THRESHOLD:
+            return [_parse_file(filename) for filename in filenames]
+        with futures.ProcessPoolExecutor(jobs) as executor:
+            chunksize = max(1, len(filenames) // ((jobs or os.cpu_count()) * 4))
+            return list(executor.map(_parse_file, filenames, chunksize=chunksize))
+
+    def iter_symbols(self):
+        """Yield (relpath, symbol) for every symbol in the index."""
+        for relpath in sorted(self.files):
+            for symbol in self.files[relpath][2]:
+                yield relpath, symbol
+
+
+def _as_json(root, relpath, symbol):
+    kind, name, namespace, startline, startcol, endline, endcol = symbol
+    return {
+        "file": os.path.join(root, relpath),
+        "kind": kind,
+        "name": name,
+        "namespace": namespace,
+        "range": {
+            "start": {"line": startline, "character": startcol},
+            "end": {"line": endline, "character": endcol},
+        },
+    }
+
+
+def parse_args(argv=sys.argv[1:], prog=sys.argv[0]):
+    parser = argparse.ArgumentParser(prog=prog, description=__doc__.splitlines()[0])
+    parser.add_argument("root")
+    parser.add_argument(
+        "--cache", help="(default: <root>/{})".format(DEFAULT_CACHE.replace("\\", "/"))
+    )
+    parser.add_argument("--jobs", type=int, help="(default: one per CPU)")
+    parser.add_argument(
+        "--dump", action="store_true", help="write all the symbols to stdout"
+    )
+    return parser.parse_args(argv)
+
+
+def main(args):
+    root = os.path.abspath(args.root)
+    cache = args.cache or os.path.join(root, DEFAULT_CACHE)
+    index = SymbolIndex.load(root, cache)
+    parsed, removed = index.update(args.jobs)
+    if parsed or removed:
+        index.save(cache)
+
+    if args.dump:
+        symbols = [_as_json(root, p, s) for p, s in index.iter_symbols()]
+        sys.stdout.write(json.dumps(symbols))
+    else:
+        summary = {
+            "files": len(index.files),
+            "symbols": len(index),
+            "parsed": parsed,
+            "removed": removed,
+        }
+        sys.stdout.write(json.dumps(summary))
+    sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main(parse_args())
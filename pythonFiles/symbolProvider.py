@@ -2,8 +2,45 @@
 # Licensed under the MIT License.
 
 import ast
+import bisect
+import io
 import json
+import os.path
+import re
 import sys
+import token
+import tokenize
+
+if __name__ == "__main__":
+    # pyvsc-run-isolated.py leaves this dir out of sys.path.
+    sys.path.insert(1, os.path.dirname(os.path.abspath(__file__)))
+
+from jsonLinesServer import JsonLinesServer
+
+
+def _get_end_position(node):
+    """Return the (0-based) line and column where the node ends."""
+    end_lineno = getattr(node, "end_lineno", None)
+    if end_lineno is not None:
+        return end_lineno - 1, node.end_col_offset
+    # Before Python 3.8 we can only approximate the end with the start
+    # of the last statement in the body.
+    while getattr(node, "body", None):
+        node = node.body[-1]
+    return node.lineno - 1, node.col_offset
+
+
+def _get_range(node):
+    end_line, end_character = _get_end_position(node)
+    return {
+        "start": {"line": node.lineno - 1, "character": node.col_offset},
+        "end": {"line": end_line, "character": end_character},
+    }
+
+
+_FUNCTION_TYPES = (ast.FunctionDef,)
+if hasattr(ast, "AsyncFunctionDef"):
+    _FUNCTION_TYPES += (ast.AsyncFunctionDef,)
 
 
 class Visitor(ast.NodeVisitor):
@@ -15,23 +52,16 @@ class Visitor(ast.NodeVisitor):
 
     def visitChildren(self, node, namespace=""):
         for child in node.body:
-            if isinstance(child, ast.FunctionDef):
+            if isinstance(child, _FUNCTION_TYPES):
                 self.visitDef(child, namespace)
-            if isinstance(child, ast.ClassDef):
+            elif isinstance(child, ast.ClassDef):
                 self.visitClassDef(child, namespace)
-            try:
-                if isinstance(child, ast.AsyncFunctionDef):
-                    self.visitDef(child, namespace)
-            except Exception:
-                pass
 
     def visitDef(self, node, namespace=""):
-        end_position = self.getEndPosition(node)
         symbol = "functions" if namespace == "" else "methods"
         self.symbols[symbol].append(self.getDataObject(node, namespace))
 
     def visitClassDef(self, node, namespace=""):
-        end_position = self.getEndPosition(node)
         self.symbols["classes"].append(self.getDataObject(node, namespace))
 
         if len(namespace) > 0:
@@ -41,20 +71,382 @@ class Visitor(ast.NodeVisitor):
         self.visitChildren(node, namespace)
 
     def getDataObject(self, node, namespace=""):
-        end_position = self.getEndPosition(node)
         return {
             "namespace": namespace,
             "name": node.name,
-            "range": {
-                "start": {"line": node.lineno - 1, "character": node.col_offset},
-                "end": {"line": end_position[0], "character": end_position[1]},
-            },
+            "range": _get_range(node),
         }
 
     def getEndPosition(self, node):
-        if not hasattr(node, "body") or len(node.body) == 0:
-            return (node.lineno - 1, node.col_offset)
-        return self.getEndPosition(node.body[-1])
+        return _get_end_position(node)
+
+
+#############################
+# the symbol tree
+
+
+def _get_assigned_names(target):
+    if isinstance(target, ast.Name):
+        yield target
+    elif isinstance(target, (ast.Tuple, ast.List)):
+        for elt in target.elts:
+            for name in _get_assigned_names(elt):
+                yield name
+    elif getattr(ast, "Starred", None) and isinstance(target, ast.Starred):
+        for name in _get_assigned_names(target.value):
+            yield name
+
+
+def _make_symbol(name, kind, node, children=None):
+    return {
+        "name": name,
+        "kind": kind,
+        "range": _get_range(node),
+        "children": children if children is not None else [],
+    }
+
+
+def _iter_body_symbols(body, parentkind="module"):
+    """Yield the symbol for each definition in the given statements.
+
+    Every statement is visited at most once.  Compound statements that
+    commonly wrap module-level definitions (e.g. "if TYPE_CHECKING:" or
+    "try: import ... except ImportError:") are looked into, but function
+    bodies only contribute nested functions and classes.
+    """
+    for node in body:
+        if isinstance(node, _FUNCTION_TYPES):
+            kind = "method" if parentkind == "class" else "function"
+            children = list(_iter_body_symbols(node.body, kind))
+            yield _make_symbol(node.name, kind, node, children)
+        elif isinstance(node, ast.ClassDef):
+            children = list(_iter_body_symbols(node.body, "class"))
+            yield _make_symbol(node.name, "class", node, children)
+        elif parentkind in ("function", "method"):
+            # Local variables and imports are not part of the outline.
+            continue
+        elif isinstance(node, (ast.Assign, getattr(ast, "AnnAssign", ast.Assign))):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            for target in targets:
+                for name in _get_assigned_names(target):
+                    kind = "constant" if name.id.isupper() else "variable"
+                    yield _make_symbol(name.id, kind, node)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                if alias.name == "*":
+                    continue
+                yield _make_symbol(alias.asname or alias.name, "import", node)
+        else:
+            for field in ("body", "handlers", "orelse", "finalbody"):
+                nested = getattr(node, field, None)
+                if nested and isinstance(nested, list):
+                    for symbol in _iter_body_symbols(nested, parentkind):
+                        yield symbol
+
+
+def get_symbol_tree(source):
+    """Return the nested symbols found in the provided code.
+
+    Each symbol has a "name", a "kind" ("class", "function", "method",
+    "variable", "constant" or "import"), a "range" and its "children".
+    If the code has syntax errors then only the classes and functions
+    that can be recovered are returned.
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return recover_symbol_tree(source)
+    return list(_iter_body_symbols(tree.body))
+
+
+def get_symbols(source):
+    """Return the symbols found in the provided code.
+
+    If the code has syntax errors then the symbols are recovered as well
+    as possible (see recover_symbol_tree()).
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return _flatten_tree(recover_symbol_tree(source))
+    visitor = Visitor()
+    visitor.visit(tree)
+    return visitor.symbols
+
+
+#############################
+# incremental updates
+
+# Python only recognizes these as line breaks (unlike str.splitlines()).
+_LINE_RE = re.compile(r".*?(?:\r\n|\r|\n)|.+\Z", re.DOTALL)
+
+
+def _split_lines(source):
+    return _LINE_RE.findall(source)
+
+
+def _shift_ranges(symbols, delta):
+    for symbol in symbols:
+        symbol["range"]["start"]["line"] += delta
+        symbol["range"]["end"]["line"] += delta
+        _shift_ranges(symbol.get("children", ()), delta)
+
+
+class _Block(object):
+    """The symbols of one top-level statement and the lines it spans.
+
+    The span runs up to the next top-level statement, so any blank lines
+    and comments in between belong to the preceding block.
+    """
+
+    def __init__(self, start, end, node=None):
+        self.start = start
+        self.end = end
+        if node is None:
+            self.tree = []
+            self.flat = Visitor().symbols
+        else:
+            self.tree = list(_iter_body_symbols([node]))
+            visitor = Visitor()
+            visitor.visitChildren(ast.Module(body=[node]))
+            self.flat = visitor.symbols
+
+    def shift(self, delta):
+        self.start += delta
+        self.end += delta
+        _shift_ranges(self.tree, delta)
+        for symbols in self.flat.values():
+            _shift_ranges(symbols, delta)
+
+
+def _parse_blocks(lines, start, end):
+    """Return the blocks for the given lines, which must parse on their own."""
+    tree = ast.parse("".join(lines[start:end]))
+    if start:
+        ast.increment_lineno(tree, start)
+    starts = []
+    for node in tree.body:
+        decorators = getattr(node, "decorator_list", None) or ()
+        starts.append(min([node.lineno] + [d.lineno for d in decorators]) - 1)
+    if not tree.body:
+        return [_Block(start, end)]
+    # The first block also covers any leading comments.
+    starts[0] = start
+    ends = starts[1:] + [end]
+    return [_Block(*args) for args in zip(starts, ends, tree.body)]
+
+
+class IncrementalSymbols(object):
+    """The symbols of a single document, kept up to date across edits.
+
+    Only the top-level statements touched by an edit are parsed again.
+    Everything after them is shifted rather than re-parsed.
+    """
+
+    def __init__(self):
+        self._lines = []
+        self._blocks = []
+        # The (0-based, end-exclusive) lines parsed by the last update.
+        self.last_parsed = None
+
+    @property
+    def tree(self):
+        return [symbol for block in self._blocks for symbol in block.tree]
+
+    @property
+    def flat(self):
+        symbols = Visitor().symbols
+        for block in self._blocks:
+            for key, values in block.flat.items():
+                symbols[key].extend(values)
+        return symbols
+
+    def update(self, source):
+        """Update the symbols to match the new document text."""
+        lines = _split_lines(source)
+        old = self._lines
+        if not self._blocks or not old:
+            return self._reset(lines)
+
+        size = min(len(old), len(lines))
+        prefix = 0
+        while prefix < size and old[prefix] == lines[prefix]:
+            prefix += 1
+        if prefix == len(old) == len(lines):
+            self.last_parsed = (0, 0)
+            return
+        suffix = 0
+        while (
+            suffix < size - prefix
+            and old[len(old) - 1 - suffix] == lines[len(lines) - 1 - suffix]
+        ):
+            suffix += 1
+
+        # An edit may join a statement with the one before or after it,
+        # so we also re-parse the neighbouring blocks.
+        starts = [block.start for block in self._blocks]
+        first = bisect.bisect_right(starts, max(prefix - 1, 0)) - 1
+        last = bisect.bisect_right(starts, min(len(old) - suffix, len(old) - 1)) - 1
+        delta = len(lines) - len(old)
+        start = self._blocks[first].start
+        end = self._blocks[last].end + delta
+        try:
+            blocks = _parse_blocks(lines, start, end)
+        except SyntaxError:
+            # The edit reaches beyond the blocks (e.g. an unclosed bracket).
+            return self._reset(lines)
+
+        if delta:
+            for block in self._blocks[last + 1 :]:
+                block.shift(delta)
+        self._blocks[first : last + 1] = blocks
+        self._lines = lines
+        self.last_parsed = (start, end)
+
+    def _reset(self, lines):
+        self._blocks = _parse_blocks(lines, 0, len(lines))
+        self._lines = lines
+        self.last_parsed = (0, len(lines))
+
+
+#############################
+# error recovery
+
+_SKIPPED_TOKENS = frozenset(
+    [
+        token.NEWLINE,
+        token.INDENT,
+        token.DEDENT,
+        token.ENDMARKER,
+        tokenize.COMMENT,
+        tokenize.NL,
+    ]
+)
+
+
+def _iter_tokens(source):
+    """Yield (type, string, start, end) for the tokens of the source.
+
+    Unlike tokenize, this keeps going after bad indentation or an
+    unterminated multi-line string, by starting again on the next line.
+    """
+    if isinstance(source, bytes):
+        encoding, _ = tokenize.detect_encoding(io.BytesIO(source).readline)
+        source = source.decode(encoding, "replace")
+    lines = _split_lines(source)
+    offset = 0
+    while offset < len(lines):
+        remaining = iter(lines[offset:])
+        readline = lambda: next(remaining, "")
+        try:
+            for toktype, string, start, end, _ in tokenize.generate_tokens(readline):
+                start = (start[0] + offset, start[1])
+                end = (end[0] + offset, end[1])
+                yield toktype, string, start, end
+            return
+        except tokenize.TokenError as exc:
+            msg, (lineno, _) = exc.args
+            if "string" not in msg:
+                # EOF in a multi-line statement: we already have it all.
+                return
+            offset += lineno
+        except SyntaxError as exc:  # e.g. IndentationError
+            offset += max(exc.lineno or 1, 1)
+
+
+def _close_symbol(symbol, end):
+    symbol["range"]["end"] = {"line": end[0] - 1, "character": end[1]}
+
+
+def recover_symbol_tree(source):
+    """Return the classes and functions found in code that may not parse.
+
+    This is meant for files in the middle of being edited.  Only the
+    tokens are used: a "def" or "class" at the start of a line starts a
+    symbol, which ends before the next line indented no further than it.
+    The result has the same form as get_symbol_tree().
+    """
+    symbols = []
+    # [(symbol, indent)]
+    stack = []
+    # Bracket nesting, so continuation lines do not end a symbol.
+    depth = 0
+    # The keyword (and where it starts) of a symbol waiting for its name.
+    pending = None
+    lastrow = 0
+    prevend = (1, 0)
+    for toktype, string, start, end in _iter_tokens(source):
+        if toktype in _SKIPPED_TOKENS:
+            continue
+        if start[0] > lastrow:
+            # This is the first token on its line.
+            pending = None
+            keyword = toktype == token.NAME and string in ("def", "class", "async")
+            if keyword or string == "@":
+                # A definition inside brackets means they were left open.
+                depth = 0
+            if depth == 0:
+                while stack and stack[-1][1] >= start[1]:
+                    _close_symbol(stack.pop()[0], prevend)
+                if keyword:
+                    pending = (string, start)
+        elif pending is not None:
+            keyword, kwstart = pending
+            pending = None
+            if keyword == "async":
+                if string == "def":
+                    pending = ("def", kwstart)
+            elif toktype == token.NAME:
+                if keyword == "class":
+                    kind = "class"
+                elif stack and stack[-1][0]["kind"] == "class":
+                    kind = "method"
+                else:
+                    kind = "function"
+                symbol = {
+                    "name": string,
+                    "kind": kind,
+                    "range": {
+                        "start": {"line": kwstart[0] - 1, "character": kwstart[1]}
+                    },
+                    "children": [],
+                }
+                (stack[-1][0]["children"] if stack else symbols).append(symbol)
+                stack.append((symbol, kwstart[1]))
+
+        if toktype == token.OP:
+            if string in "([{":
+                depth += 1
+            elif string in ")]}":
+                depth = max(depth - 1, 0)
+        lastrow = end[0]
+        prevend = end
+    while stack:
+        _close_symbol(stack.pop()[0], prevend)
+    return symbols
+
+
+def _flatten_tree(tree, namespace="", symbols=None):
+    """Return the flat symbols (as from Visitor) for the given tree."""
+    if symbols is None:
+        symbols = Visitor().symbols
+    for symbol in tree:
+        data = {
+            "namespace": namespace,
+            "name": symbol["name"],
+            "range": symbol["range"],
+        }
+        if symbol["kind"] == "class":
+            symbols["classes"].append(data)
+            if namespace:
+                nested = "{0}::{1}".format(namespace, symbol["name"])
+            else:
+                nested = symbol["name"]
+            _flatten_tree(symbol["children"], nested, symbols)
+        elif symbol["kind"] in ("function", "method"):
+            key = "functions" if namespace == "" else "methods"
+            symbols[key].append(data)
+    return symbols
 
 
 def provide_symbols(source):
@@ -64,20 +456,16 @@ def provide_symbols(source):
     ending line number and whether the statement is a single line.
 
     """
-    tree = ast.parse(source)
-    visitor = Visitor()
-    visitor.visit(tree)
-    sys.stdout.write(json.dumps(visitor.symbols))
+    sys.stdout.write(json.dumps(get_symbols(source)))
     sys.stdout.flush()
 
 
-if __name__ == "__main__":
-    if len(sys.argv) == 3:
-        contents = sys.argv[2]
-    else:
-        with open(sys.argv[1], "r") as source:
-            contents = source.read()
+def _read_source(filename):
+    with open(filename, "r") as source:
+        return source.read()
 
+
+def _fix_contents(contents):
     try:
         default_encoding = sys.getdefaultencoding()
         encoded_contents = contents.encode(default_encoding, "surrogateescape")
@@ -86,4 +474,75 @@ if __name__ == "__main__":
         pass
     if isinstance(contents, bytes):
         contents = contents.decode("utf8")
-    provide_symbols(contents)
+    return contents
+
+
+class SymbolProviderServer(JsonLinesServer):
+    """Serve symbol requests over stdin/stdout until stdin is closed.
+
+    Each request has a "path" and optionally the file's "text" (e.g.
+    unsaved changes).  Without "text"
+    the file is read from disk.  If "tree" is set then the nested symbol
+    tree is returned instead of the flat lists.  If "incremental" is set
+    then the server keeps the document's symbols and only re-parses the
+    parts that changed since the previous request for the same path
+    (until a request with "close" set).  See JsonLinesServer for the
+    rest of the protocol.
+    """
+
+    def __init__(self, stdin=None, stdout=None):
+        super(SymbolProviderServer, self).__init__(stdin, stdout)
+        # {path: IncrementalSymbols}
+        self._documents = {}
+
+    def _handle_request(self, request):
+        if request.get("close"):
+            self._documents.pop(request["path"], None)
+            return None
+        contents = request.get("text")
+        if contents is None:
+            contents = _read_source(request["path"])
+        contents = _fix_contents(contents)
+        if request.get("incremental"):
+            return self._get_incremental(request, contents)
+        elif request.get("tree"):
+            return get_symbol_tree(contents)
+        else:
+            return get_symbols(contents)
+
+    def _get_incremental(self, request, contents):
+        document = self._documents.get(request["path"])
+        if document is None:
+            document = self._documents[request["path"]] = IncrementalSymbols()
+        try:
+            document.update(contents)
+        except SyntaxError:
+            # Keep the last good state, so the next edit is still cheap.
+            tree = recover_symbol_tree(contents)
+            return tree if request.get("tree") else _flatten_tree(tree)
+        except Exception:
+            # Start from scratch next time.
+            del self._documents[request["path"]]
+            raise
+        return document.tree if request.get("tree") else document.flat
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["--server"]:
+        SymbolProviderServer().watch()
+        sys.exit(0)
+
+    argv = sys.argv[1:]
+    tree = argv[:1] == ["--tree"]
+    if tree:
+        argv = argv[1:]
+    if len(argv) == 2:
+        contents = argv[1]
+    else:
+        contents = _read_source(argv[0])
+    contents = _fix_contents(contents)
+    if tree:
+        sys.stdout.write(json.dumps(get_symbol_tree(contents)))
+        sys.stdout.flush()
+    else:
+        provide_symbols(contents)
@@ -0,0 +1,535 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""Answer workspace symbol queries from an in-memory symbol index.
+
+The symbols come from symbolIndexer.  They are held in flat arrays
+(with names, namespaces and paths interned into tables) and the unique
+names are indexed by trigram, so that exact, prefix, camel-case,
+substring and fuzzy queries can be answered without scanning every
+symbol.  Files can be updated one at a time as they change.
+"""
+
+import argparse
+import bisect
+import heapq
+import itertools
+import json
+import os
+import os.path
+import re
+import sys
+from array import array
+
+if __name__ == "__main__":
+    # pyvsc-run-isolated.py leaves this dir out of sys.path.
+    sys.path.insert(1, os.path.dirname(os.path.abspath(__file__)))
+
+import symbolIndexer
+from jsonLinesServer import JsonLinesServer
+
+
+KINDS = ("class", "method", "function", "variable", "constant", "import")
+_DELETED = 0xFF
+DEFAULT_LIMIT = 100
+# At most this many fuzzy matches (per result) are ranked.
+FUZZY_FACTOR = 10
+# The sorted views are rebuilt once this many names have been added
+# since they were built.  Until then queries check those names directly.
+MAX_RECENT_NAMES = 1000
+
+# The match tiers, best first.
+EXACT, PREFIX, CAMEL, SUBSTRING, FUZZY = range(5)
+
+_WORD_START_RE = re.compile(
+    r"(?:^|(?<=_))_*[^_]|(?<=[a-z0-9])[A-Z]|(?<=[A-Z])[A-Z](?=[a-z])"
+)
+
+
+def _split_words(name):
+    """Return the start index of each "word" in the name.
+
+    Words are separated by underscores and by case changes, so both
+    "getSymbolProvider" and "get_symbol_provider" have three words.
+    """
+    return [m.end() - 1 for m in _WORD_START_RE.finditer(name)]
+
+
+def _get_initials(name):
+    return "".join(name[i] for i in _split_words(name)).lower()
+
+
+def _iter_trigrams(text):
+    for i in range(len(text) - 2):
+        yield text[i : i + 3]
+
+
+def _get_words(name):
+    """Return the lowercased words of the name (see _split_words())."""
+    starts = _split_words(name)
+    lower = name.lower()
+    ends = starts[1:] + [len(name)]
+    return [lower[start:end].rstrip("_") for start, end in zip(starts, ends)]
+
+
+def _camel_match(words, name):
+    """Return True if each word starts the corresponding word of the name.
+
+    So "getSymPro" (and "getSP") match both "getSymbolProvider" and
+    "get_symbol_provider".  The name must have at least as many words.
+    """
+    lower = name.lower()
+    # Most candidates fail on the first word, which is cheap to check.
+    first = len(lower) - len(lower.lstrip("_"))
+    if not lower.startswith(words[0], first):
+        return False
+    starts = _split_words(name)
+    return all(lower.startswith(w, start) for w, start in zip(words, starts))
+
+
+def _get_range(rows, lo, hi):
+    """Return the sorted rows with lo <= row[0] < hi."""
+    start = bisect.bisect_left(rows, (lo,))
+    end = bisect.bisect_left(rows, (hi,), start)
+    return rows[start:end]
+
+
+def _merge_ids(*rows):
+    """Merge the sorted rows, yielding the name ID (last) of each."""
+    for row in heapq.merge(*rows):
+        yield row[-1]
+
+
+class SymbolSearch(object):
+    """A searchable, updatable set of workspace symbols."""
+
+    def __init__(self, root=None):
+        self.root = root
+        # The string tables.
+        self._names = []
+        self._name_ids = {}
+        self._namespaces = [""]
+        self._namespace_ids = {"": 0}
+        self._paths = []
+        self._path_ids = {}
+        # The symbols, one entry per symbol in each array.
+        self._symbol_names = array("I")
+        self._symbol_namespaces = array("I")
+        self._symbol_paths = array("I")
+        self._symbol_kinds = array("B")
+        # (startline, startcol, endline, endcol) for each symbol.
+        self._ranges = array("I")
+        self._free = []
+        # {path ID: array of symbol IDs}
+        self._path_symbols = {}
+        # {name ID: array of symbol IDs}
+        self._name_symbols = {}
+        # {trigram: array of name IDs}
+        self._trigrams = {}
+        # Lazily (re)built views of the names, covering the first
+        # "_indexed" names.  The rest are the recent names.
+        self._indexed = 0
+        self._sorted = None
+        self._sorted_initials = None
+        self._blob = None
+        self._blob_offsets = None
+        self._recent = None
+
+    @classmethod
+    def from_index(cls, index):
+        """Return a SymbolSearch with all the symbols in the SymbolIndex."""
+        search = cls(index.root)
+        for relpath, (_, _, symbols) in index.files.items():
+            search.update_file(relpath, symbols)
+        return search
+
+    def __len__(self):
+        return len(self._symbol_kinds) - len(self._free)
+
+    #############################
+    # updates
+
+    def update_file(self, relpath, symbols):
+        """Replace the symbols of the given file.
+
+        The symbols are in the compact form used by symbolIndexer.
+        """
+        self.remove_file(relpath)
+        if not symbols:
+            return
+        path_id = self._path_ids.get(relpath)
+        if path_id is None:
+            path_id = self._path_ids[relpath] = len(self._paths)
+            self._paths.append(relpath)
+        ids = self._path_symbols[path_id] = array("I")
+        for kind, name, namespace, startline, startcol, endline, endcol in symbols:
+            name_id = self._intern_name(name)
+            namespace_id = self._namespace_ids.get(namespace)
+            if namespace_id is None:
+                namespace_id = self._namespace_ids[namespace] = len(self._namespaces)
+                self._namespaces.append(namespace)
+            row = (startline, startcol, endline, endcol)
+            if self._free:
+                symbol_id = self._free.pop()
+                self._symbol_names[symbol_id] = name_id
+                self._symbol_namespaces[symbol_id] = namespace_id
+                self._symbol_paths[symbol_id] = path_id
+                self._symbol_kinds[symbol_id] = KINDS.index(kind)
+                self._ranges[symbol_id * 4 : symbol_id * 4 + 4] = array("I", row)
+            else:
+                symbol_id = len(self._symbol_kinds)
+                self._symbol_names.append(name_id)
+                self._symbol_namespaces.append(namespace_id)
+                self._symbol_paths.append(path_id)
+                self._symbol_kinds.append(KINDS.index(kind))
+                self._ranges.extend(row)
+            ids.append(symbol_id)
+            self._name_symbols.setdefault(name_id, array("I")).append(symbol_id)
+
+    def remove_file(self, relpath):
+        """Drop all the symbols of the given file."""
+        path_id = self._path_ids.get(relpath)
+        if path_id is None:
+            return
+        for symbol_id in self._path_symbols.pop(path_id, ()):
+            name_id = self._symbol_names[symbol_id]
+            self._name_symbols[name_id].remove(symbol_id)
+            self._symbol_kinds[symbol_id] = _DELETED
+            self._free.append(symbol_id)
+        # Names without symbols stay in the tables; queries skip them.
+
+    def _intern_name(self, name):
+        name_id = self._name_ids.get(name)
+        if name_id is not None:
+            return name_id
+        name_id = self._name_ids[name] = len(self._names)
+        self._names.append(name)
+        for trigram in set(_iter_trigrams(name.lower())):
+            self._trigrams.setdefault(trigram, array("I")).append(name_id)
+        self._recent = None
+        return name_id
+
+    #############################
+    # queries
+
+    def query(self, query, limit=DEFAULT_LIMIT):
+        """Return the IDs of the best matching symbols, best first."""
+        lowered = query.lower()
+        if not lowered or limit <= 0:
+            return []
+        self._sync_views()
+        # An all-lowercase query is only matched against the initials,
+        # so only camel-cased queries need to be checked word by word.
+        words = _get_words(query) if query != lowered else None
+        results = []
+        seen = set()
+        for tier, candidates, ordered in self._iter_candidates(query, lowered, limit):
+            matches = []
+            needed = limit - len(results)
+            for name_id in candidates:
+                symbols = self._name_symbols.get(name_id)
+                if not symbols or name_id in seen:
+                    continue
+                score = self._score(tier, query, lowered, words, name_id)
+                if score is None:
+                    continue
+                seen.add(name_id)
+                matches.append((score, self._names[name_id], name_id))
+                if ordered:
+                    # The rest of the tier can only rank lower.
+                    needed -= len(symbols)
+                    if needed <= 0:
+                        break
+            if not ordered:
+                matches = heapq.nsmallest(needed, matches)
+            for _, _, name_id in matches:
+                results.extend(self._name_symbols[name_id])
+            if len(results) >= limit:
+                return results[:limit]
+        return results
+
+    def _iter_candidates(self, query, lowered, limit):
+        """Yield (tier, name IDs, ordered) for each tier, best first.
+
+        If "ordered" is True then the candidates are already in rank
+        order, so no more of them are needed once there are enough
+        results.
+        """
+        recent_keys, recent_initials = self._get_recent()
+        keys, ids = self._get_sorted()
+        lo = bisect.bisect_left(keys, lowered)
+        exact = bisect.bisect_right(keys, lowered, lo)
+        hi = bisect.bisect_left(keys, lowered + "\uffff", exact)
+        recent = _get_range(recent_keys, lowered, lowered + "\uffff")
+        exact_recent = [i for key, i in recent if key == lowered]
+        yield EXACT, itertools.chain(ids[lo:exact], exact_recent), False
+        # Prefix matches are ranked alphabetically, which also puts
+        # shorter names (e.g. "spam_eggs" before "spammer") first.
+        # Ties are in name ID order, as in the sorted view.
+        rows = ((keys[j], ids[j]) for j in range(exact, hi))
+        yield PREFIX, _merge_ids(rows, recent), True
+
+        # A camel-cased query ("getSP") is matched by its initials, as is
+        # an all-lowercase one ("gsp").
+        initials = _get_initials(query) if query != lowered else lowered
+        keys, ids = self._get_sorted_initials()
+        lo = bisect.bisect_left(keys, initials)
+        hi = bisect.bisect_left(keys, initials + "\uffff", lo)
+        names = self._names
+        rows = ((keys[j], len(names[ids[j]]), ids[j]) for j in range(lo, hi))
+        recent = _get_range(recent_initials, initials, initials + "\uffff")
+        yield CAMEL, _merge_ids(rows, recent), True
+
+        if len(lowered) >= 3:
+            yield SUBSTRING, self._get_trigram_candidates(lowered), False
+
+        fuzzy = self._get_fuzzy_candidates(lowered)
+        yield FUZZY, itertools.islice(fuzzy, limit * FUZZY_FACTOR), False
+
+    def _get_trigram_candidates(self, lowered):
+        postings = []
+        for trigram in set(_iter_trigrams(lowered)):
+            posting = self._trigrams.get(trigram)
+            if posting is None:
+                return []
+            postings.append(posting)
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            if len(candidates) * 8 < len(posting):
+                # Cheaper to just check each candidate when scoring.
+                break
+            candidates.intersection_update(posting)
+        return candidates
+
+    def _get_fuzzy_candidates(self, lowered):
+        # The letters must appear, in order, on the same line of the blob.
+        # Each class excludes the letter after it, so there's no
+        # backtracking and the scan stays linear.
+        rest = "".join("[^{0}\\n]*{0}".format(re.escape(c)) for c in lowered[1:])
+        regex = re.compile("^_*" + re.escape(lowered[0]) + rest, re.MULTILINE)
+        # As with the other tiers, the name must start with the first
+        # letter (ignoring leading underscores), so only the names that
+        # sort under that letter (or "_") need to be scanned.
+        blob, offsets = self._get_blob()
+        keys, ids = self._get_sorted()
+        for first in sorted({"_", lowered[0]}):
+            lo = bisect.bisect_left(keys, first)
+            hi = bisect.bisect_left(keys, first + "\uffff", lo)
+            if lo == hi:
+                continue
+            end = offsets[hi - 1] + len(keys[hi - 1])
+            for match in regex.finditer(blob, offsets[lo], end):
+                yield ids[bisect.bisect_right(offsets, match.start(), lo, hi) - 1]
+        recent_keys, _ = self._get_recent()
+        for key, name_id in recent_keys:
+            if regex.match(key):
+                yield name_id
+
+    def _score(self, tier, query, lowered, words, name_id):
+        """Return the sort key if the name matches in the given tier."""
+        name = self._names[name_id]
+        if tier == EXACT:
+            return (name != query,)
+        elif tier == PREFIX:
+            return ()
+        elif tier == CAMEL:
+            if words and not _camel_match(words, name):
+                return None
+            return ()
+        lower = name.lower()
+        if tier == SUBSTRING:
+            index = lower.find(lowered)
+            if index < 0:
+                return None
+            atword = (
+                index == 0
+                or name[index - 1] == "_"
+                or (name[index].isupper() and not name[index - 1].isupper())
+            )
+            return (not atword, len(name), index)
+        else:
+            # The fuzzy candidates always match; prefer compact matches.
+            first = pos = lower.find(lowered[0])
+            for c in lowered[1:]:
+                pos = lower.find(c, pos + 1)
+            return (pos - first, len(name))
+
+    def _sync_views(self):
+        """Fold the recent names into the sorted views, if it is time to.
+
+        That is when there are too many of them to check one by one, or
+        when there are no views to rebuild yet.
+        """
+        added = len(self._names) - self._indexed
+        if not added:
+            return
+        if added > MAX_RECENT_NAMES or (
+            self._sorted is None and self._sorted_initials is None
+        ):
+            self._indexed = len(self._names)
+            self._sorted = self._sorted_initials = self._blob = None
+            self._recent = None
+
+    def _get_recent(self):
+        """Return the names that the sorted views do not cover yet.
+
+        They are returned as ([(lowercased name, name ID)],
+        [(initials, length, name ID)]), each sorted like the matching view.
+        """
+        if self._recent is None:
+            names = self._names
+            recent = range(self._indexed, len(names))
+            self._recent = (
+                sorted((names[i].lower(), i) for i in recent),
+                sorted((_get_initials(names[i]), len(names[i]), i) for i in recent),
+            )
+        return self._recent
+
+    def _get_sorted(self):
+        """Return (lowercased names, name IDs), sorted by name."""
+        if self._sorted is None:
+            lowered = [name.lower() for name in self._names[: self._indexed]]
+            order = sorted(range(len(lowered)), key=lowered.__getitem__)
+            self._sorted = ([lowered[i] for i in order], array("I", order))
+        return self._sorted
+
+    def _get_sorted_initials(self):
+        """Return (initials, name IDs), sorted by initials then length."""
+        if self._sorted_initials is None:
+            names = self._names[: self._indexed]
+            initials = [_get_initials(name) for name in names]
+            order = sorted(
+                range(len(names)), key=lambda i: (initials[i], len(names[i]))
+            )
+            self._sorted_initials = ([initials[i] for i in order], array("I", order))
+        return self._sorted_initials
+
+    def _get_blob(self):
+        """Return all the sorted lowercased names, one per line.
+
+        The offset of each line is also returned.
+        """
+        if self._blob is None:
+            keys, _ = self._get_sorted()
+            offsets = array("I")
+            pos = 0
+            for lower in keys:
+                offsets.append(pos)
+                pos += len(lower) + 1
+            self._blob = "\n".join(keys)
+            self._blob_offsets = offsets
+        return self._blob, self._blob_offsets
+
+    def prepare(self):
+        """Build the lazily-created indexes ahead of the next query."""
+        self._sync_views()
+        self._get_sorted_initials()
+        self._get_blob()
+        self._get_recent()
+
+    #############################
+    # results
+
+    def get_symbol(self, symbol_id):
+        """Return the symbol (in the same form as symbolIndexer) and its path."""
+        startline, startcol, endline, endcol = self._ranges[
+            symbol_id * 4 : symbol_id * 4 + 4
+        ]
+        symbol = (
+            KINDS[self._symbol_kinds[symbol_id]],
+            self._names[self._symbol_names[symbol_id]],
+            self._namespaces[self._symbol_namespaces[symbol_id]],
+            startline,
+            startcol,
+            endline,
+            endcol,
+        )
+        return self._paths[self._symbol_paths[symbol_id]], symbol
+
+
+class SymbolSearchServer(JsonLinesServer):
+    """Serve symbol queries over stdin/stdout until stdin is closed.
+
+    Each request has one of:
+
+    * "query" (and optionally "limit"): return the matching symbols
+    * "changed": a list of (workspace-relative) files to re-index
+    * "refresh": re-index every file that changed
+
+    See JsonLinesServer for the rest of the protocol.
+    """
+
+    def __init__(self, index, cache=None, jobs=None, stdin=None, stdout=None):
+        super(SymbolSearchServer, self).__init__(stdin, stdout)
+        self._index = index
+        self._cache = cache
+        self._jobs = jobs
+        self._search = SymbolSearch.from_index(index)
+        self._search.prepare()
+
+    def _handle_request(self, request):
+        if "query" in request:
+            limit = request.get("limit", DEFAULT_LIMIT)
+            ids = self._search.query(request["query"], limit)
+            return [
+                symbolIndexer._as_json(self._index.root, *self._search.get_symbol(i))
+                for i in ids
+            ]
+        elif request.get("changed") is not None or request.get("refresh"):
+            return self._refresh(request.get("changed"))
+        else:
+            raise ValueError("unsupported request")
+
+    def _refresh(self, relpaths=None):
+        changed, removed = self._index.refresh(self._jobs, relpaths=relpaths)
+        for relpath in changed:
+            self._search.update_file(relpath, self._index.files[relpath][2])
+        for relpath in removed:
+            self._search.remove_file(relpath)
+        if self._cache and (changed or removed):
+            self._index.save(self._cache)
+        # Any rebuilding happens now, rather than in the next query.
+        self._search.prepare()
+        return {"parsed": len(changed), "removed": len(removed)}
+
+
+def parse_args(argv=sys.argv[1:], prog=sys.argv[0]):
+    parser = argparse.ArgumentParser(prog=prog, description=__doc__.splitlines()[0])
+    parser.add_argument("root")
+    parser.add_argument(
+        "query", nargs="?", help="(if not provided then serve queries from stdin)"
+    )
+    parser.add_argument(
+        "--cache",
+        help="(default: <root>/{})".format(
+            symbolIndexer.DEFAULT_CACHE.replace("\\", "/")
+        ),
+    )
+    parser.add_argument("--jobs", type=int, help="(default: one per CPU)")
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT)
+    args = parser.parse_args(argv)
+    args.server = args.query is None
+    return args
+
+
+def main(args):
+    root = os.path.abspath(args.root)
+    cache = args.cache or os.path.join(root, symbolIndexer.DEFAULT_CACHE)
+    index = symbolIndexer.SymbolIndex.load(root, cache)
+    parsed, removed = index.update(args.jobs)
+    if parsed or removed:
+        index.save(cache)
+
+    if args.server:
+        SymbolSearchServer(index, cache, args.jobs).watch()
+        return
+    search = SymbolSearch.from_index(index)
+    ids = search.query(args.query, args.limit)
+    results = [symbolIndexer._as_json(root, *search.get_symbol(i)) for i in ids]
+    sys.stdout.write(json.dumps(results))
+    sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -6,7 +6,7 @@ from __future__ import absolute_import
 import argparse
 import sys
 
-from . import pytest, report
+from . import pytest, report, unittest
 from .errors import UnsupportedToolError, UnsupportedCommandError
 
 
@@ -14,10 +14,21 @@ TOOLS = {
     "pytest": {
         "_add_subparser": pytest.add_cli_subparser,
         "discover": pytest.discover,
+        "run": pytest.run,
+        "shard": pytest.shard,
+        "select": pytest.select,
+        "_watch": pytest.watch,
+    },
+    "unittest": {
+        "_add_subparser": unittest.add_cli_subparser,
+        "discover": unittest.discover,
     },
 }
 REPORTERS = {
     "discover": report.report_discovered,
+    "run": report.report_run,
+    "shard": report.report_shards,
+    "select": report.report_selected,
 }
 
 
@@ -39,8 +50,8 @@ def parse_args(
     )
     cmdsubs = parser.add_subparsers(dest="cmd")
 
-    # Add "run" and "debug" subcommands when ready.
-    for cmdname in ["discover"]:
+    # Add the "debug" subcommand when ready.
+    for cmdname in ["discover", "run", "shard", "select"]:
         sub = cmdsubs.add_parser(cmdname)
         subsubs = sub.add_subparsers(dest="tool")
         for toolname in sorted(TOOLS):
@@ -48,9 +59,32 @@ def parse_args(
                 add_subparser = TOOLS[toolname]["_add_subparser"]
             except KeyError:
                 continue
-            subsub = add_subparser(cmdname, toolname, subsubs)
+            try:
+                subsub = add_subparser(cmdname, toolname, subsubs)
+            except UnsupportedCommandError:
+                # The tool does not support the command.
+                continue
             if cmdname == "discover":
                 subsub.add_argument("--simple", action="store_true")
+                subsub.add_argument(
+                    "--no-hide-stdio", dest="hidestdio", action="store_false"
+                )
+                subsub.add_argument(
+                    "--full-stdio", dest="fullstdio", action="store_true"
+                )
+                subsub.add_argument("--pretty", action="store_true")
+                subsub.add_argument(
+                    "--format", choices=["json", "ndjson", "compact"], default="json"
+                )
+                subsub.add_argument("--snapshot")
+            elif cmdname == "run":
+                subsub.add_argument(
+                    "--no-hide-stdio", dest="hidestdio", action="store_false"
+                )
+                subsub.add_argument(
+                    "--full-stdio", dest="fullstdio", action="store_true"
+                )
+            elif cmdname in ("shard", "select"):
                 subsub.add_argument(
                     "--no-hide-stdio", dest="hidestdio", action="store_false"
                 )
@@ -97,8 +131,34 @@ def main(
     except KeyError:
         raise UnsupportedCommandError(cmdname)
 
-    parents, result = run(toolargs, **subargs)
-    report_result(result, parents, **subargs)
+    if cmdname == "discover" and subargs.get("watch"):
+        # The tool keeps running and reports the tests after every change,
+        # each time as a single line of JSON.
+        try:
+            watch = tool["_watch"]
+        except KeyError:
+            raise UnsupportedCommandError("discover --watch")
+
+        def report_each(parents, tests):
+            report_result(tests, parents, **dict(subargs, pretty=False))
+            sys.stdout.flush()
+
+        watch(toolargs, report_each, **subargs)
+        return
+
+    if cmdname == "discover" and subargs.get("format") == "ndjson":
+        # The tests are written as they are found.
+        stream = report.DiscoveryStream(subargs.get("simple", False))
+        subargs = dict(subargs, stream=stream)
+    elif cmdname == "run":
+        # The results are sent as the tests run.
+        stream = report.RunStream(subargs.get("port"))
+        subargs = dict(subargs, stream=stream)
+
+    # For "discover" this is (parents, tests) and for "run" it is
+    # (exit code, counts).
+    info, result = run(toolargs, **subargs)
+    report_result(result, info, **subargs)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,303 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""
+The "compact" format for the discovered tests.
+
+Rather than repeating the same roots, IDs and filenames in every record
+(as the "json" format does), each string is written once, in a string
+table, and the records are arrays that refer to the strings by index:
+
+    {
+        "format": "compact",
+        "version": 1,
+        "id": <an ID for this payload>,
+        "strings": [<string>, ...],
+        "roots": [[root, rootid], ...],
+        "parents": [[root, id, kind, name, parentid, relpath], ...],
+        "tests": [[root, parentid, id, name, srcfile, lineno, [marker]], ...]
+    }
+
+Every item is a string index, except for "lineno" (an int) and a parent's
+"relpath", which is -1 if there isn't one.  A test's ID almost always
+starts with the ID of its parent, so only the rest of it is stored (e.g.
+"::test_spam" or "[1]"), which is usually shared with other tests.  If
+it doesn't, the index of the full ID is stored as -(index + 1).
+
+If the payload the client already has is known (kept in a "snapshot"
+file) then only the differences from it are sent:
+
+    {
+        "format": "compact-delta",
+        "version": 1,
+        "base": <the ID of the payload that the client has>,
+        "id": <an ID for the resulting payload>,
+        "strings": [<string>, ...],
+        "roots": [[root, rootid], ...],
+        "parents": [<parent>, ...],
+        "tests": [<test>, ...],
+        "removedParents": [[root, id], ...],
+        "removedTests": [[root, parentid, id], ...]
+    }
+
+The strings are appended to those of the base payload, so the existing
+indices stay valid.  The roots are all sent, while "parents" and "tests"
+hold only the records that are new or changed.  A record is identified
+by the items listed for the removed records.  Applying a delta doesn't
+preserve the order of the tests.
+"""
+
+from __future__ import absolute_import
+
+import hashlib
+import json
+import os
+
+
+FORMAT_VERSION = 1
+
+# Start over (with a full payload) once this share of the strings in
+# the snapshot is no longer used.
+MAX_UNUSED_STRINGS = 0.5
+
+
+class StringTable(object):
+    """The strings of a payload, each with its index."""
+
+    def __init__(self, strings=()):
+        self.strings = list(strings)
+        self._indices = dict((s, i) for i, s in enumerate(self.strings))
+        self.used = set()
+
+    def __len__(self):
+        return len(self.strings)
+
+    def add(self, value):
+        """Return the index of the string, adding it if it's new."""
+        try:
+            index = self._indices[value]
+        except KeyError:
+            index = self._indices[value] = len(self.strings)
+            self.strings.append(value)
+        self.used.add(index)
+        return index
+
+
+def load_snapshot(filename):
+    """Return the payload in the snapshot file, or None if there isn't one."""
+    try:
+        with open(filename) as infile:
+            return json.load(infile)
+    except (EnvironmentError, ValueError):
+        # It's missing or unusable, so we start over.
+        return None
+
+
+def save_snapshot(filename, payload):
+    tmpname = filename + ".tmp"
+    with open(tmpname, "w") as outfile:
+        json.dump(payload, outfile, separators=(",", ":"))
+    # Make sure that a partly written snapshot is never used.
+    if os.path.exists(filename):
+        os.remove(filename)
+    os.rename(tmpname, filename)
+
+
+def encode(
+    tests,
+    parents,
+    # *,
+    strings=None,
+):
+    """Return the compact payload for the discovered tests.
+
+    If a StringTable is given then it is used (and extended).
+    """
+    if strings is None:
+        strings = StringTable()
+    add = strings.add
+    # {root: root ID}
+    rootids = {}
+    parentrecords = []
+    for parent in parents:
+        if parent.root is None:
+            rootids[parent.name] = parent.id
+            continue
+        rootids.setdefault(parent.root, parent.root)
+        parentrecords.append(
+            [
+                add(parent.root),
+                add(parent.id),
+                add(parent.kind),
+                add(parent.name),
+                add(parent.parentid),
+                add(parent.relpath) if parent.relpath is not None else -1,
+            ]
+        )
+    # The test records are tuples, which the GC stops tracking once it
+    # sees they only hold ints, so there are far fewer objects to scan.
+    testrecords = []
+    lastparentid = None
+    for test in tests:
+        # The tests of a parent are next to each other.
+        if test.parentid != lastparentid:
+            lastparentid = test.parentid
+            rootref = add(test.path.root)
+            parentref = add(lastparentid)
+            lastsrcfile = srcref = None
+        if test.id.startswith(lastparentid):
+            testid = add(test.id[len(lastparentid) :])
+        else:
+            testid = -(add(test.id) + 1)
+        srcfile, _, lineno = test.source.rpartition(":")
+        if srcfile != lastsrcfile:
+            lastsrcfile = srcfile
+            srcref = add(srcfile)
+        testrecords.append(
+            (
+                rootref,
+                parentref,
+                testid,
+                add(test.name),
+                srcref,
+                int(lineno),
+                tuple(add(marker) for marker in test.markers) if test.markers else (),
+            )
+        )
+    roots = [[add(root), add(rootids[root])] for root in sorted(rootids)]
+    payload = {
+        "format": "compact",
+        "version": FORMAT_VERSION,
+        "strings": strings.strings,
+        "roots": roots,
+        "parents": parentrecords,
+        "tests": testrecords,
+    }
+    payload["id"] = _get_payload_id(payload)
+    return payload
+
+
+def diff(previous, tests, parents):
+    """Return (delta, full payload) for the discovered tests.
+
+    The delta is against the previous (full) payload.  If there isn't
+    one, or too many of its strings are no longer used, then the full
+    payload is returned in its place.
+    """
+    if not previous or previous.get("version") != FORMAT_VERSION:
+        payload = encode(tests, parents)
+        return payload, payload
+    strings = StringTable(previous["strings"])
+    payload = encode(tests, parents, strings=strings)
+    unused = len(strings) - len(strings.used)
+    if unused > len(strings) * MAX_UNUSED_STRINGS:
+        payload = encode(tests, parents)
+        return payload, payload
+
+    oldparents = dict((_parent_key(p), p) for p in previous["parents"])
+    newparents = dict((_parent_key(p), p) for p in payload["parents"])
+    oldtests = dict((_test_key(t), _as_test_record(t)) for t in previous["tests"])
+    newtests = dict((_test_key(t), t) for t in payload["tests"])
+    delta = {
+        "format": "compact-delta",
+        "version": FORMAT_VERSION,
+        "base": previous["id"],
+        "id": payload["id"],
+        "strings": payload["strings"][len(previous["strings"]) :],
+        "roots": payload["roots"],
+        "parents": [
+            p for p in payload["parents"] if oldparents.get(_parent_key(p)) != p
+        ],
+        "tests": [t for t in payload["tests"] if oldtests.get(_test_key(t)) != t],
+        "removedParents": [list(k) for k in oldparents if k not in newparents],
+        "removedTests": [list(k) for k in oldtests if k not in newtests],
+    }
+    return delta, payload
+
+
+def apply_delta(previous, delta):
+    """Return the full payload that results from applying the delta."""
+    if delta["base"] != previous["id"]:
+        raise ValueError("the delta does not apply to this payload")
+    removedparents = set(tuple(k) for k in delta["removedParents"])
+    removedtests = set(tuple(k) for k in delta["removedTests"])
+    changedparents = set(_parent_key(p) for p in delta["parents"])
+    changedtests = set(_test_key(t) for t in delta["tests"])
+    return {
+        "format": "compact",
+        "version": delta["version"],
+        "id": delta["id"],
+        "strings": previous["strings"] + delta["strings"],
+        "roots": delta["roots"],
+        "parents": [
+            p
+            for p in previous["parents"]
+            if _parent_key(p) not in removedparents
+            and _parent_key(p) not in changedparents
+        ]
+        + delta["parents"],
+        "tests": [
+            t
+            for t in previous["tests"]
+            if _test_key(t) not in removedtests and _test_key(t) not in changedtests
+        ]
+        + delta["tests"],
+    }
+
+
+def decode(payload):
+    """Return the data for the "json" format from the compact payload."""
+    strings = payload["strings"]
+    byroot = {}
+    for root, rootid in payload["roots"]:
+        byroot[strings[root]] = {
+            "rootid": strings[rootid],
+            "root": strings[root],
+            "parents": [],
+            "tests": [],
+        }
+    for root, parentid, kind, name, grandparentid, relpath in payload["parents"]:
+        data = {
+            "id": strings[parentid],
+            "kind": strings[kind],
+            "name": strings[name],
+            "parentid": strings[grandparentid],
+        }
+        if relpath >= 0:
+            data["relpath"] = strings[relpath]
+        byroot[strings[root]]["parents"].append(data)
+    for root, parentid, testid, name, srcfile, lineno, markers in payload["tests"]:
+        if testid >= 0:
+            testid = strings[parentid] + strings[testid]
+        else:
+            testid = strings[-testid - 1]
+        byroot[strings[root]]["tests"].append(
+            {
+                "id": testid,
+                "name": strings[name],
+                "source": "{}:{}".format(strings[srcfile], lineno),
+                "markers": [strings[marker] for marker in markers],
+                "parentid": strings[parentid],
+            }
+        )
+    return [byroot[root] for root in sorted(byroot)]
+
+
+def _parent_key(record):
+    return (record[0], record[1])
+
+
+def _test_key(record):
+    return (record[0], record[1], record[2])
+
+
+def _as_test_record(record):
+    # The records in a loaded payload are lists.
+    return tuple(record[:-1]) + (tuple(record[-1]),)
+
+
+def _get_payload_id(payload):
+    hashed = hashlib.sha1()
+    for name in ("strings", "roots", "parents", "tests"):
+        hashed.update(json.dumps(payload[name]).encode("utf-8"))
+    return hashed.hexdigest()
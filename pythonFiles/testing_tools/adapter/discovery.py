@@ -61,20 +61,43 @@ class DiscoveredTests(object):
 
     @property
     def parents(self):
-        return sorted(
-            self._parents.values(),
-            # Sort by (name, id).
-            key=lambda p: (NORMCASE(p.root or p.name), p.id),
-        )
+        """The parents, sorted by (root, ID).
+
+        The list is kept until the parents change, so it must not be
+        modified.
+        """
+        if self._sorted is None:
+            keys = sorted(self._parents, key=self._sortkeys.__getitem__)
+            self._sorted = [self._parents[key] for key in keys]
+        return self._sorted
 
     def reset(self):
         """Clear out any previously discovered tests."""
         self._parents = {}
+        # {(rootdir, parent ID): (normalized rootdir, parent ID)}
+        self._sortkeys = {}
+        self._sorted = None
+        # {(rootdir, parent ID as given): (fixed ID, its parent ID as given)}
+        self._parentids = {}
         self._tests = []
 
     def add_test(self, test, parents):
-        """Add the given test and its parents."""
-        parentid = self._ensure_parent(test.path, parents)
+        """Add the given test and its parents.
+
+        Return the test (as added) and the parents that were not already
+        added, from the root down.
+        """
+        test, added = self.add_parents(test, parents)
+        self._tests.append(test)
+        return test, added
+
+    def add_parents(self, test, parents):
+        """Add the given test's parents, but not the test itself.
+
+        This is for tests that are streamed rather than kept.  Return
+        the same as add_test().
+        """
+        parentid, added = self._ensure_parent(test.path, parents)
         # Updating the parent ID and the test ID aren't necessary if the
         # provided test and parents (from the test collector) are
         # properly generated.  However, we play it safe here.
@@ -83,7 +106,7 @@ class DiscoveredTests(object):
             id=fix_nodeid(test.id, "test", test.path.root),
             parentid=parentid,
         )
-        self._tests.append(test)
+        return test, added
 
     def _ensure_parent(
         self,
@@ -95,23 +118,61 @@ class DiscoveredTests(object):
         rootdir = path.root
         relpath = path.relfile
 
+        added = []
         _parents = iter(parents)
-        nodeid, name, kind = next(_parents)
-        # As in add_test(), the node ID *should* already be correct.
-        nodeid = fix_nodeid(nodeid, kind, rootdir)
-        _parentid = nodeid
-        for parentid, parentname, parentkind in _parents:
+        rawid, name, kind = next(_parents)
+        nodeid = _parentid = None
+        for rawparentid, parentname, parentkind in _parents:
+            known = self._parentids.get((rootdir, rawid))
+            if known is not None and known[1] == rawparentid:
+                # This parent (and so the rest of the chain) was already
+                # added, so there's nothing left to do.
+                nodeid = known[0]
+                break
+            if nodeid is None:
+                # As in add_test(), the node ID *should* already be correct.
+                nodeid = fix_nodeid(rawid, kind, rootdir)
             # As in add_test(), the parent ID *should* already be correct.
-            parentid = fix_nodeid(parentid, kind, rootdir)
+            parentid = fix_nodeid(rawparentid, kind, rootdir)
             if kind in ("folder", "file"):
                 info = ParentInfo(nodeid, kind, name, rootdir, relpath, parentid)
                 relpath = _dirname(relpath)
             else:
                 info = ParentInfo(nodeid, kind, name, rootdir, None, parentid)
-            self._parents[(rootdir, nodeid)] = info
-            nodeid, name, kind = parentid, parentname, parentkind
-        assert nodeid == "."
-        info = ParentInfo(nodeid, kind, name=rootdir)
-        self._parents[(rootdir, nodeid)] = info
-
-        return _parentid
+            if self._add_parent(rootdir, nodeid, info):
+                added.append(info)
+            self._parentids[(rootdir, rawid)] = (nodeid, rawparentid)
+            if _parentid is None:
+                _parentid = nodeid
+            rawid, nodeid, name, kind = rawparentid, parentid, parentname, parentkind
+        else:
+            if nodeid is None:
+                nodeid = fix_nodeid(rawid, kind, rootdir)
+            assert nodeid == "."
+            if (rootdir, nodeid) not in self._parents:
+                info = ParentInfo(nodeid, kind, name=rootdir)
+                self._add_parent(rootdir, nodeid, info)
+                added.append(info)
+        if _parentid is None:
+            _parentid = nodeid
+
+        added.reverse()
+        return _parentid, added
+
+    def _add_parent(
+        self,
+        rootdir,
+        nodeid,
+        info,
+        # *,
+        _normcase=NORMCASE,
+    ):
+        """Store the parent info and return True if the parent is new."""
+        key = (rootdir, nodeid)
+        old = self._parents.get(key)
+        if old != info:
+            self._parents[key] = info
+            self._sorted = None
+            if old is None:
+                self._sortkeys[key] = (_normcase(rootdir), nodeid)
+        return old is None
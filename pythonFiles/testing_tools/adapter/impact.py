@@ -0,0 +1,205 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""
+Selecting the tests that a change may affect, based on the lines that
+each test ran the last time it was run ("test impact analysis").
+
+While the tests run, the lines that each one runs in the files under the
+test root are recorded in a local SQLite database.  Given the changed
+files (and optionally the changed lines), the tests that ran any of
+those lines are then selected.  Some changes can't be tied to a test
+this way, e.g. a changed import or a new function, since those lines only
+run when the module is imported (or never ran).  So if none of the
+recorded tests ran the changed lines of a file, every test that ran
+any line of that file is selected instead.  Tests that were never
+recorded (e.g. new ones) are always selected.
+
+The line numbers are those of the files as they were when the tests
+were recorded, i.e. the "before" side of a diff.
+"""
+
+from __future__ import absolute_import
+
+import sqlite3
+import sys
+
+from .util import NORMCASE, PATH_SEP, fix_fileid
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS test (
+    id INTEGER PRIMARY KEY,
+    testid TEXT UNIQUE NOT NULL
+);
+CREATE TABLE IF NOT EXISTS file (
+    id INTEGER PRIMARY KEY,
+    fileid TEXT UNIQUE NOT NULL
+);
+CREATE TABLE IF NOT EXISTS line (
+    file INTEGER NOT NULL,
+    lineno INTEGER NOT NULL,
+    test INTEGER NOT NULL,
+    PRIMARY KEY (file, lineno, test)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS line_test ON line (test);
+"""
+
+
+def parse_change(change):
+    """Return (filename, [(first line, last line)]) for the given arg.
+
+    The arg is a filename, optionally followed by a colon and the
+    changed lines, e.g. "spam.py:10-12,20".  If no lines are given then
+    the list is None (i.e. the whole file).
+    """
+    filename, sep, lines = change.rpartition(":")
+    if not sep or not lines or not all(c.isdigit() or c in "-," for c in lines):
+        return change, None
+    ranges = []
+    for part in lines.split(","):
+        first, _, last = part.partition("-")
+        ranges.append((int(first), int(last or first)))
+    return filename, ranges
+
+
+class LineTracer(object):
+    """Records the lines that run in the files under the given root.
+
+    This uses sys.settrace(), so it only sees the current thread.  Any
+    trace function that was already set (e.g. by coverage.py or by a
+    debugger) keeps getting every event while the lines are recorded.
+    """
+
+    def __init__(self, root):
+        self._root = root
+        self._prefix = NORMCASE(root).rstrip(PATH_SEP) + PATH_SEP
+        # {co_filename: file ID (or None if not under the root)}
+        self._fileids = {}
+        # {file ID: {line number}}
+        self.lines = {}
+        self._previous = None
+
+    def start(self):
+        self.lines = {}
+        self._previous = sys.gettrace()
+        sys.settrace(self._trace)
+
+    def stop(self):
+        """Stop tracing and return {file ID: {line number}}."""
+        sys.settrace(self._previous)
+        self._previous = None
+        return self.lines
+
+    def _trace(self, frame, event, arg):
+        # This is only called for the "call" events.
+        local = None
+        if self._previous is not None:
+            local = self._previous(frame, event, arg)
+        filename = frame.f_code.co_filename
+        try:
+            fileid = self._fileids[filename]
+        except KeyError:
+            fileid = None
+            if NORMCASE(filename).startswith(self._prefix):
+                fileid = fix_fileid(filename, self._root)
+            self._fileids[filename] = fileid
+        if fileid is None:
+            return local
+        try:
+            lines = self.lines[fileid]
+        except KeyError:
+            lines = self.lines[fileid] = set()
+        return _trace_lines(lines, local)
+
+
+def _trace_lines(lines, local):
+    """Return a local trace function that adds each line to "lines".
+
+    The events are passed on to the given local trace function (if any),
+    which is replaced by whatever it returns, as Python would do.
+    """
+    # A list, since 2.7 has no "nonlocal".
+    previous = [local]
+
+    def trace(frame, event, arg):
+        if event == "line":
+            lines.add(frame.f_lineno)
+        if previous[0] is not None:
+            previous[0] = previous[0](frame, event, arg)
+        return trace
+
+    return trace
+
+
+class CoverageStore(object):
+    """The recorded lines of each test, in a SQLite database."""
+
+    def __init__(
+        self,
+        filename,
+        # *,
+        _connect=sqlite3.connect,
+    ):
+        self._db = _connect(filename)
+        self._db.executescript(SCHEMA)
+        # {file ID: key}
+        self._filekeys = {}
+
+    def close(self):
+        self._db.commit()
+        self._db.close()
+
+    def record(self, testid, lines):
+        """Replace the lines ({file ID: {line number}}) for the test."""
+        cursor = self._db.cursor()
+        cursor.execute("INSERT OR IGNORE INTO test (testid) VALUES (?)", (testid,))
+        cursor.execute("SELECT id FROM test WHERE testid = ?", (testid,))
+        testkey = cursor.fetchone()[0]
+        cursor.execute("DELETE FROM line WHERE test = ?", (testkey,))
+        for fileid, linenos in lines.items():
+            filekey = self._get_filekey(cursor, fileid)
+            cursor.executemany(
+                "INSERT INTO line (file, lineno, test) VALUES (?, ?, ?)",
+                [(filekey, lineno, testkey) for lineno in linenos],
+            )
+
+    def get_testids(self):
+        """Return the IDs of the recorded tests."""
+        cursor = self._db.execute("SELECT testid FROM test")
+        return set(row[0] for row in cursor)
+
+    def select(self, fileid, ranges=None):
+        """Return the IDs of the tests affected by the changed lines.
+
+        If "ranges" ([(first line, last line)]) is None then any change
+        to the file is assumed.
+        """
+        query = """
+            SELECT DISTINCT test.testid
+            FROM line
+            JOIN file ON line.file = file.id
+            JOIN test ON line.test = test.id
+            WHERE file.fileid = ?
+        """
+        selected = set()
+        for first, last in ranges or ():
+            cursor = self._db.execute(
+                query + " AND line.lineno BETWEEN ? AND ?", (fileid, first, last)
+            )
+            selected.update(row[0] for row in cursor)
+        if not selected:
+            # The change can't be tied to any of the tests that ran the file.
+            cursor = self._db.execute(query, (fileid,))
+            selected.update(row[0] for row in cursor)
+        return selected
+
+    def _get_filekey(self, cursor, fileid):
+        try:
+            return self._filekeys[fileid]
+        except KeyError:
+            pass
+        cursor.execute("INSERT OR IGNORE INTO file (fileid) VALUES (?)", (fileid,))
+        cursor.execute("SELECT id FROM file WHERE fileid = ?", (fileid,))
+        filekey = self._filekeys[fileid] = cursor.fetchone()[0]
+        return filekey
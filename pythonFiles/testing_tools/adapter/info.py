@@ -3,21 +3,40 @@
 
 from collections import namedtuple
 
+try:
+    from sys import intern
+except ImportError:
+    pass  # 2.7 (a builtin)
+
+
+# The info classes are namedtuples with no per-instance __dict__, since
+# there may be hundreds of thousands of them.  The paths (and functions)
+# are interned so that the tests from the same file share them.  Calling
+# the class normalizes and validates the values, while _make() and
+# _replace() take them as-is, which is only meant for values that were
+# already checked (e.g. by the pytest collector or when read back from
+# the discovery cache).
+
 
 class TestPath(namedtuple("TestPath", "root relfile func sub")):
     """Where to find a single test."""
 
+    __slots__ = ()
+
     def __new__(cls, root, relfile, func, sub=None):
-        self = super(TestPath, cls).__new__(
+        self = tuple.__new__(
             cls,
-            str(root) if root else None,
-            str(relfile) if relfile else None,
-            str(func) if func else None,
-            [str(s) for s in sub] if sub else None,
+            (
+                intern(str(root)) if root else None,
+                intern(str(relfile)) if relfile else None,
+                intern(str(func)) if func else None,
+                [str(s) for s in sub] if sub else None,
+            ),
         )
+        self._validate()
         return self
 
-    def __init__(self, *args, **kwargs):
+    def _validate(self):
         if self.root is None:
             raise TypeError("missing id")
         if self.relfile is None:
@@ -28,21 +47,26 @@ class TestPath(namedtuple("TestPath", "root relfile func sub")):
 
 class ParentInfo(namedtuple("ParentInfo", "id kind name root relpath parentid")):
 
+    __slots__ = ()
+
     KINDS = ("folder", "file", "suite", "function", "subtest")
 
     def __new__(cls, id, kind, name, root=None, relpath=None, parentid=None):
-        self = super(ParentInfo, cls).__new__(
+        self = tuple.__new__(
             cls,
-            id=str(id) if id else None,
-            kind=str(kind) if kind else None,
-            name=str(name) if name else None,
-            root=str(root) if root else None,
-            relpath=str(relpath) if relpath else None,
-            parentid=str(parentid) if parentid else None,
+            (
+                str(id) if id else None,
+                intern(str(kind)) if kind else None,
+                str(name) if name else None,
+                intern(str(root)) if root else None,
+                str(relpath) if relpath else None,
+                str(parentid) if parentid else None,
+            ),
         )
+        self._validate()
         return self
 
-    def __init__(self, *args, **kwargs):
+    def _validate(self):
         if self.id is None:
             raise TypeError("missing id")
         if self.kind is None:
@@ -65,23 +89,28 @@ class ParentInfo(namedtuple("ParentInfo", "id kind name root relpath parentid"))
 class TestInfo(namedtuple("TestInfo", "id name path source markers parentid kind")):
     """Info for a single test."""
 
+    __slots__ = ()
+
     MARKERS = ("skip", "skip-if", "expected-failure")
     KINDS = ("function", "doctest")
 
     def __new__(cls, id, name, path, source, markers, parentid, kind="function"):
-        self = super(TestInfo, cls).__new__(
+        self = tuple.__new__(
             cls,
-            str(id) if id else None,
-            str(name) if name else None,
-            path or None,
-            str(source) if source else None,
-            [str(marker) for marker in markers or ()],
-            str(parentid) if parentid else None,
-            str(kind) if kind else None,
+            (
+                str(id) if id else None,
+                str(name) if name else None,
+                path or None,
+                str(source) if source else None,
+                [str(marker) for marker in markers] if markers else [],
+                str(parentid) if parentid else None,
+                intern(str(kind)) if kind else None,
+            ),
         )
+        self._validate()
         return self
 
-    def __init__(self, *args, **kwargs):
+    def _validate(self):
         if self.id is None:
             raise TypeError("missing id")
         if self.name is None:
@@ -5,3 +5,7 @@ from __future__ import absolute_import
 
 from ._cli import add_subparser as add_cli_subparser
 from ._discovery import discover
+from ._run import run
+from ._select import select
+from ._shard import shard
+from ._watch import watch
@@ -0,0 +1,207 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""
+For incremental discovery, the tests found in each file are stored in
+pytest's cache, keyed by a hash of the file and of every conftest.py
+that applies to it.  On the next run, pytest is told to ignore each file
+whose key still matches, so the file is neither imported nor collected,
+and the cached tests are used instead.  Files that changed (or are new)
+are collected as usual.  Any change to the pytest args, the ini file or
+the versions involved throws away the whole cache.
+"""
+
+from __future__ import absolute_import
+
+import collections
+import hashlib
+import sys
+
+import pytest
+
+from ..info import TestInfo, TestPath
+from ..util import BASENAME, DIRNAME, NORMCASE, PATH_JOIN
+from ._order import CollectionOrder, get_filename
+
+
+CACHE_KEY = "vscode/discovery"
+FORMAT_VERSION = 1
+
+# Files that must always be collected by pytest.
+_NEVER_CACHED = ("__init__.py", "conftest.py")
+
+if int(pytest.__version__.split(".")[0]) >= 7:
+    _PATH_ARG = "collection_path"
+else:
+    _PATH_ARG = "path"
+
+
+def _hash_file(filename):
+    with open(filename, "rb") as infile:
+        return hashlib.sha1(infile.read()).hexdigest()
+
+
+def _encode(test, parents):
+    return [list(test[:2]) + [list(test.path)] + list(test[3:]), parents]
+
+
+def _decode(entry):
+    (testid, name, path, source, markers, parentid, kind), parents = entry
+    # The cached tests were checked when they were first collected.
+    path = TestPath(*path)
+    test = TestInfo._make((testid, name, path, source, markers, parentid, kind))
+    return test, [tuple(parent) for parent in parents]
+
+
+class DiscoveryCache(object):
+    """A pytest plugin that skips (and caches) the unchanged test files."""
+
+    def __init__(self, pytestargs, reuse=True):
+        self._pytestargs = list(pytestargs)
+        # If False then every file is collected (and cached) again.
+        self._reuse = reuse
+        self._cache = None
+        # {filename: {"key": ..., "tests": [...]}}
+        self._files = {}
+        self._order = CollectionOrder()
+        self._reused = set()
+        # {nodeid: filename} for each file pytest collected.
+        self._collected = {}
+        self._failed = set()
+        # {dirname: [conftest hash]}
+        self._conftests = {}
+
+    # Relevant plugin hooks:
+    #  https://docs.pytest.org/en/latest/reference.html#collection-hooks
+
+    def pytest_configure(self, config):
+        config.pluginmanager.register(self._order)
+        self._cache = getattr(config, "cache", None)
+        if self._cache is None:
+            # The cacheprovider plugin is disabled.
+            return
+        self._key = self._get_config_key(config)
+        data = self._cache.get(CACHE_KEY, None)
+        if data and data.get("key") == self._key:
+            self._files = data["files"]
+
+    def pytest_collectstart(self, collector):
+        if isinstance(collector, pytest.File):
+            filename = get_filename(collector)
+            if BASENAME(filename) not in _NEVER_CACHED:
+                self._collected[collector.nodeid] = filename
+
+    def pytest_collectreport(self, report):
+        if report.failed and report.nodeid in self._collected:
+            self._failed.add(self._collected[report.nodeid])
+
+    def _ignore_collect(self, path):
+        filename = NORMCASE(str(path))
+        cached = self._files.get(filename)
+        skipped = (
+            self._reuse
+            and cached is not None
+            and cached["key"] == self._get_file_key(filename)
+        )
+        self._order.visit(filename, skipped)
+        if not skipped:
+            return None
+        self._reused.add(filename)
+        return True
+
+    if _PATH_ARG == "collection_path":
+
+        def pytest_ignore_collect(self, collection_path):
+            return self._ignore_collect(collection_path)
+
+    else:
+
+        def pytest_ignore_collect(self, path):
+            return self._ignore_collect(path)
+
+    # The rest
+
+    def merge(self, parsed):
+        """Return (test, parents) for the collected and the cached tests.
+
+        "parsed" is (item filename, test, parents) for each collected
+        item.  The collected files keep the order pytest gave them and
+        each cached file is put back where pytest skipped it.  The cache
+        is updated to match.
+        """
+        collected = collections.OrderedDict(
+            (filename, []) for filename in self._collected.values()
+        )
+        for filename, test, parents in parsed:
+            collected.setdefault(NORMCASE(filename), []).append(_encode(test, parents))
+
+        # {collected filename: [the cached filenames skipped just before it]}
+        skipped = {}
+        pending = []
+        for filename in self._order.iter_filenames():
+            if filename in self._reused:
+                pending.append(filename)
+            elif filename in collected and pending:
+                skipped[filename] = pending
+                pending = []
+        filenames = []
+        for filename in collected:
+            filenames.extend(skipped.pop(filename, ()))
+            filenames.append(filename)
+        filenames.extend(pending)
+        # Anything else that was skipped goes at the end.
+        filenames.extend(sorted(self._reused.difference(filenames)))
+
+        files = {}
+        merged = []
+        for filename in filenames:
+            if filename in files:
+                continue
+            if filename in self._reused:
+                files[filename] = self._files[filename]
+            elif filename in collected and filename not in self._failed:
+                try:
+                    key = self._get_file_key(filename)
+                except EnvironmentError:
+                    key = None
+                files[filename] = {"key": key, "tests": collected[filename]}
+            else:
+                continue
+            merged.extend(_decode(entry) for entry in files[filename]["tests"])
+
+        self._files = files
+        if self._cache is not None:
+            self._cache.set(CACHE_KEY, {"key": self._key, "files": files})
+        return merged
+
+    def _get_config_key(self, config):
+        inifile = getattr(config, "inipath", None) or getattr(config, "inifile", None)
+        return {
+            "version": FORMAT_VERSION,
+            "args": self._pytestargs,
+            "inifile": _hash_file(str(inifile)) if inifile else None,
+            "pytest": pytest.__version__,
+            "python": sys.version,
+        }
+
+    def _get_file_key(self, filename):
+        hashed = hashlib.sha1(_hash_file(filename).encode("ascii"))
+        for conftest in self._get_conftests(DIRNAME(filename)):
+            hashed.update(conftest.encode("ascii"))
+        return hashed.hexdigest()
+
+    def _get_conftests(self, dirname):
+        """Return the hashes of the conftest.py files that apply to the dir."""
+        try:
+            return self._conftests[dirname]
+        except KeyError:
+            pass
+        parent = DIRNAME(dirname)
+        conftests = list(self._get_conftests(parent)) if parent != dirname else []
+        try:
+            conftests.append(_hash_file(PATH_JOIN(dirname, "conftest.py")))
+        except EnvironmentError:
+            # There is no conftest.py in the directory.
+            pass
+        self._conftests[dirname] = conftests
+        return conftests
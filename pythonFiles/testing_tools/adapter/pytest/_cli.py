@@ -10,8 +10,72 @@ def add_subparser(cmd, name, parent):
     """Add a new subparser to the given parent and add args to it."""
     parser = parent.add_parser(name)
     if cmd == "discover":
-        # For now we don't have any tool-specific CLI options to add.
-        pass
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="only collect the files that changed since the last run",
+        )
+        parser.add_argument(
+            "--jobs",
+            type=int,
+            default=1,
+            help="the number of processes to collect the tests with",
+        )
+        parser.add_argument(
+            "--timings",
+            action="store_true",
+            help="write the slowest collectors (and conftest.py imports) to stderr",
+        )
+        parser.add_argument(
+            "--watch",
+            action="store_true",
+            help="keep running and report the tests again whenever files change",
+        )
+    elif cmd == "run":
+        parser.add_argument(
+            "--port",
+            type=int,
+            help="send the results to this local port instead of stdout",
+        )
+        parser.add_argument(
+            "--durations-file",
+            dest="durationsfile",
+            help="record the duration of each test in this file",
+        )
+        parser.add_argument(
+            "--coverage-db",
+            dest="coveragedb",
+            help="record the lines that each test runs in this SQLite file",
+        )
+    elif cmd == "shard":
+        parser.add_argument(
+            "--shards",
+            type=int,
+            default=1,
+            help="the number of shards to split the tests into",
+        )
+        parser.add_argument(
+            "--index",
+            type=int,
+            help="only write the pytest args for this shard (0-based)",
+        )
+        parser.add_argument(
+            "--durations-file",
+            dest="durationsfile",
+            help="the durations recorded by the runner",
+        )
+    elif cmd == "select":
+        parser.add_argument(
+            "--coverage-db",
+            dest="coveragedb",
+            required=True,
+            help="the lines recorded by the runner",
+        )
+        parser.add_argument(
+            "--changed",
+            action="append",
+            help="a changed file, optionally with the lines (e.g. spam.py:10-12,20)",
+        )
     else:
         raise UnsupportedCommandError(cmd)
     return parser
@@ -3,31 +3,79 @@
 
 from __future__ import absolute_import, print_function
 
+import collections
 import sys
 
 import pytest
 
 from .. import util, discovery
+from ._cache import DiscoveryCache
 from ._pytest_item import parse_item
+from ._timings import CollectionTimer
 
 
 def discover(
     pytestargs=None,
     hidestdio=False,
+    fullstdio=False,
+    incremental=False,
+    refresh=False,
+    jobs=1,
+    timings=False,
+    stream=None,
     # *,
     _pytest_main=pytest.main,
     _plugin=None,
     **_ignored
 ):
-    """Return the results of test discovery."""
-    if _plugin is None:
-        _plugin = TestCollector()
+    """Return the results of test discovery.
+
+    If "incremental" is True then the unchanged test files are not
+    collected again (see _cache.py), unless "refresh" is True, in which
+    case every file is collected and the cache is rewritten.  If "jobs"
+    is more than 1 then the tests are collected by that many worker
+    processes (see _parallel.py).  If "timings" is True then a table of
+    the slowest collectors is written to stderr (see _timings.py).  If a
+    "stream" is given then each test is added to it as soon as it is
+    collected (see report.DiscoveryStream), rather than kept.  If
+    discovery fails then the end of the hidden output is written to
+    stderr, or all of it if "fullstdio" is True.
+    """
+    if jobs > 1 and _plugin is None:
+        if incremental:
+            raise ValueError("incremental discovery does not support jobs")
+        if timings:
+            raise ValueError("collection timings do not support jobs")
+        from ._parallel import discover as discover_parallel
+
+        return discover_parallel(pytestargs, hidestdio, jobs, stream, fullstdio)
 
     pytestargs = _adjust_pytest_args(pytestargs)
+    plugins = []
+    if incremental:
+        plugins.append(DiscoveryCache(pytestargs, reuse=not refresh))
+    if _plugin is None:
+        _plugin = TestCollector(
+            cache=plugins[0] if plugins else None,
+            stream=stream,
+        )
+    plugins.insert(0, _plugin)
+    timer = None
+    if timings:
+        timer = CollectionTimer()
+        plugins.append(timer)
+
     # We use this helper rather than "-pno:terminal" due to possible
     # platform-dependent issues.
-    with (util.hide_stdio() if hidestdio else util.noop_cm()) as stdio:
-        ec = _pytest_main(pytestargs, [_plugin])
+    output = None
+    with (util.hide_stdio(util.STDIO_TAIL) if hidestdio else util.noop_cm()) as stdio:
+        ec = _pytest_main(pytestargs, plugins)
+        # The output is only read back if discovery failed.
+        if hidestdio and (ec not in (0, 5) or not _plugin._started):
+            output = stdio.getvalue(full=fullstdio)
+    if timer is not None:
+        for line in timer.format_table():
+            print(line, file=sys.stderr)
     # See: https://docs.pytest.org/en/latest/usage.html#possible-exit-codes
     if ec == 5:
         # No tests were discovered.
@@ -38,8 +86,8 @@ def discover(
                 sys.executable, util.shlex_unsplit(pytestargs)
             )
         )
-        if hidestdio:
-            print(stdio.getvalue(), file=sys.stderr)
+        if output is not None:
+            print(output, file=sys.stderr)
             sys.stdout.flush()
         raise Exception("pytest discovery failed (exit code {})".format(ec))
     if not _plugin._started:
@@ -48,8 +96,8 @@ def discover(
                 sys.executable, util.shlex_unsplit(pytestargs)
             )
         )
-        if hidestdio:
-            print(stdio.getvalue(), file=sys.stderr)
+        if output is not None:
+            print(output, file=sys.stderr)
             sys.stdout.flush()
         raise Exception("pytest discovery did not start")
     return (
@@ -76,22 +124,33 @@ class TestCollector(object):
     def parse_item(cls, item):
         return parse_item(item)
 
-    def __init__(self, tests=None):
+    def __init__(self, tests=None, cache=None, stream=None):
         if tests is None:
             tests = discovery.DiscoveredTests()
         self._tests = tests
+        self._cache = cache
+        self._stream = stream
         self._started = False
+        # {item node ID: test} for the tests that were streamed
+        self._streamed = collections.OrderedDict()
 
     # Relevant plugin hooks:
     #  https://docs.pytest.org/en/latest/reference.html#collection-hooks
 
+    def pytest_itemcollected(self, item):
+        if self._stream is None:
+            return
+        # Each file's tests are written as soon as pytest collects it.
+        test, parents = self.parse_item(item)
+        if test is not None:
+            test, added = self._tests.add_parents(test, parents)
+            self._stream.add(test, added)
+            self._streamed[item.nodeid] = test
+
     def pytest_collection_modifyitems(self, session, config, items):
         self._started = True
-        self._tests.reset()
-        for item in items:
-            test, parents = self.parse_item(item)
-            if test is not None:
-                self._tests.add_test(test, parents)
+        if self._stream is None:
+            self._add_items(items)
 
     # This hook is not specified in the docs, so we also provide
     # the "modifyitems" hook just in case.
@@ -102,8 +161,45 @@ class TestCollector(object):
         except AttributeError:
             # TODO: Is there an alternative?
             return
+        if self._stream is None:
+            self._add_items(items)
+        else:
+            self._finish_stream(items)
+
+    # The rest
+
+    def _add_items(self, items):
         self._tests.reset()
+        for test, parents in self._parse_items(items):
+            self._tests.add_test(test, parents)
+
+    def _finish_stream(self, items):
+        # The items are final at this point, e.g. after deselection.
+        final = set(item.nodeid for item in items)
+        for nodeid, test in self._streamed.items():
+            if nodeid not in final:
+                self._stream.remove(test)
+        if self._cache is None:
+            return
+        # The tests from the files that were skipped come from the cache.
+        streamed = set((test.path.root, test.id) for test in self._streamed.values())
+        for test, parents in self._parse_items(items):
+            test, added = self._tests.add_parents(test, parents)
+            if (test.path.root, test.id) not in streamed:
+                self._stream.add(test, added)
+
+    def _parse_items(self, items):
+        if self._cache is None:
+            for item in items:
+                test, parents = self.parse_item(item)
+                if test is not None:
+                    yield test, parents
+            return
+        # The cache supplies the tests from the files that were skipped.
+        parsed = []
         for item in items:
             test, parents = self.parse_item(item)
             if test is not None:
-                self._tests.add_test(test, parents)
+                parsed.append((str(item.fspath), test, parents))
+        for test, parents in self._cache.merge(parsed):
+            yield test, parents
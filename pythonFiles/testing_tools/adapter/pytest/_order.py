@@ -0,0 +1,90 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+from __future__ import absolute_import
+
+import pytest
+
+from ..util import NORMCASE
+
+
+def get_filename(node):
+    # "fspath" is deprecated (and not always there) since pytest 7.
+    path = getattr(node, "path", None)
+    if path is None:
+        path = node.fspath
+    return NORMCASE(str(path))
+
+
+def _is_file(node):
+    # Before pytest 8 a package is a module (of its __init__.py).
+    return isinstance(node, pytest.File) and not isinstance(node, pytest.Package)
+
+
+class CollectionOrder(object):
+    """A pytest plugin that tracks where pytest skipped each path.
+
+    Depending on the version, pytest considers the entries of a
+    directory either as it collects each of them or all of them up
+    front, and it may collect a directory's files before or after its
+    subdirectories.  So rather than guessing, the paths that a collector
+    considered (see visit()) are matched up with the nodes it returned.
+    """
+
+    def __init__(self):
+        self._session = None
+        # The collectors that are currently collecting.
+        self._collecting = []
+        # {collector: [(path, skipped)]} for each path pytest considered
+        self._visits = {}
+        # {collector: [child node]}
+        self._children = {}
+
+    # Relevant plugin hooks:
+    #  https://docs.pytest.org/en/latest/reference.html#collection-hooks
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_make_collect_report(self, collector):
+        if isinstance(collector, pytest.Session):
+            self._session = collector
+        self._collecting.append(collector)
+        outcome = yield
+        self._collecting.pop()
+        if not _is_file(collector):
+            report = outcome.get_result()
+            self._children[collector] = list(report.result or ())
+
+    # The rest
+
+    def visit(self, filename, skipped=False):
+        """Record that pytest considered the (normcased) path.
+
+        This must be called from pytest_ignore_collect().
+        """
+        collector = self._collecting[-1] if self._collecting else None
+        self._visits.setdefault(collector, []).append((filename, skipped))
+
+    def iter_filenames(self, collector=None):
+        """Yield the collected files and the skipped paths in order.
+
+        Each skipped path is placed among the nodes that its collector
+        returned, by the order in which their paths were considered.
+        """
+        if collector is None:
+            collector = self._session
+        visits = self._visits.get(collector, ())
+        positions = dict((path, i) for i, (path, _) in enumerate(visits))
+        skipped = [path for path, isskipped in visits if isskipped]
+        for child in self._children.get(collector, ()):
+            filename = get_filename(child)
+            position = positions.get(filename)
+            if position is not None:
+                while skipped and positions[skipped[0]] < position:
+                    yield skipped.pop(0)
+            if _is_file(child):
+                yield filename
+            else:
+                for filename in self.iter_filenames(child):
+                    yield filename
+        for filename in skipped:
+            yield filename
@@ -0,0 +1,184 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""
+For parallel discovery, the test roots given to pytest are split up by
+their top-level entries ("units") and each worker process collects only
+the units assigned to it, skipping the test files of the rest.  The units are assigned
+round-robin in the order pytest considers them, which is the same for
+every worker.  Every worker runs pytest with the same args, so the
+rootdir, the ini file and the conftest.py files all match those of a
+serial run.  Each worker reports its tests in collection order, along
+with the order of all the units (see _order.py), and the tests are then
+merged in that order into a single DiscoveredTests, so the result is the
+same as for a serial run.
+"""
+
+from __future__ import absolute_import
+
+import multiprocessing
+import os
+
+import pytest
+
+from .. import discovery
+from ..util import ABS_PATH, BASENAME, DIRNAME, NORMCASE
+from ._cache import _NEVER_CACHED, _PATH_ARG
+from ._discovery import TestCollector, discover as _discover
+from ._order import CollectionOrder, get_filename
+
+
+def discover(
+    pytestargs,
+    hidestdio,
+    jobs,
+    stream=None,
+    fullstdio=False,
+    # *,
+    _pool=multiprocessing.Pool,
+):
+    """Return the results of test discovery, using "jobs" processes."""
+    # Only the first worker may clear pytest's cache, or the workers
+    # would race to remove and re-create the cache dir.
+    otherargs = [arg for arg in pytestargs or () if arg != "--cache-clear"]
+    pool = _pool(jobs)
+    try:
+        results = pool.map(
+            _discover_partition,
+            [
+                (
+                    pytestargs if index == 0 else otherargs,
+                    hidestdio,
+                    fullstdio,
+                    jobs,
+                    index,
+                )
+                for index in range(jobs)
+            ],
+        )
+    finally:
+        pool.close()
+        pool.join()
+
+    # {unit: position}
+    positions = {}
+    for units, _ in results:
+        for unit in units:
+            positions.setdefault(unit, len(positions))
+    merged = []
+    for _, collected in results:
+        merged.extend(collected)
+    # Each unit is collected by a single worker, so this keeps the order
+    # of the tests within each unit.
+    merged.sort(key=lambda result: positions.get(result[0], len(positions)))
+
+    tests = discovery.DiscoveredTests()
+    for _, test, parents in merged:
+        added = tests.add_test(test, parents)
+        if stream is not None:
+            stream.add(*added)
+    return tests.parents, list(tests)
+
+
+def _discover_partition(args):
+    pytestargs, hidestdio, fullstdio, jobs, index = args
+    collector = PartitionCollector(jobs, index)
+    _discover(pytestargs, hidestdio, fullstdio, _plugin=collector)
+    return collector.get_units(), collector.results
+
+
+class PartitionCollector(TestCollector):
+    """A pytest plugin that collects the tests of a single partition."""
+
+    def __init__(self, jobs, index):
+        super(PartitionCollector, self).__init__()
+        self._jobs = jobs
+        self._index = index
+        # The dirs given to pytest.
+        self._roots = set()
+        # {unit: index of the partition it belongs to}
+        self._units = {}
+        self._order = CollectionOrder()
+        # [(unit, test, parents)], in collection order
+        self.results = []
+
+    # Relevant plugin hooks:
+    #  https://docs.pytest.org/en/latest/reference.html#collection-hooks
+
+    def pytest_configure(self, config):
+        config.pluginmanager.register(self._order)
+        for arg in config.args:
+            path = NORMCASE(ABS_PATH(arg.partition("::")[0]))
+            if os.path.isdir(path):
+                self._roots.add(path)
+            else:
+                # pytest never asks whether to skip the files it was
+                # given, so every worker collects them.
+                self._add_unit(path)
+
+    def _ignore_collect(self, path):
+        path = NORMCASE(str(path))
+        name = BASENAME(path)
+        if path not in self._units and DIRNAME(path) in self._roots:
+            if name not in _NEVER_CACHED:
+                self._add_unit(path)
+        # Only files are skipped, so every worker goes through the same
+        # dirs and each file is skipped where pytest would collect it.
+        skipped = (
+            name not in _NEVER_CACHED
+            and self._units.get(self._get_unit(path), self._index) != self._index
+            and not os.path.isdir(path)
+        )
+        self._order.visit(path, skipped)
+        return True if skipped else None
+
+    # This must run before any other plugin can skip the path, so that
+    # every worker sees the units in the same order.
+    if _PATH_ARG == "collection_path":
+
+        @pytest.hookimpl(tryfirst=True)
+        def pytest_ignore_collect(self, collection_path):
+            return self._ignore_collect(collection_path)
+
+    else:
+
+        @pytest.hookimpl(tryfirst=True)
+        def pytest_ignore_collect(self, path):
+            return self._ignore_collect(path)
+
+    # The rest
+
+    def _add_items(self, items):
+        self.results = []
+        for item in items:
+            unit = self._get_unit(get_filename(item))
+            # Every worker collects the files that are not in a unit,
+            # so those tests are only kept by the first one.
+            if self._units.get(unit, 0) != self._index:
+                continue
+            test, parents = self.parse_item(item)
+            if test is not None:
+                self.results.append((unit, test, parents))
+
+    def get_units(self):
+        """Return every unit (and any other file), in collection order."""
+        units = []
+        seen = set()
+        for filename in self._order.iter_filenames():
+            unit = self._get_unit(filename)
+            if unit not in seen:
+                seen.add(unit)
+                units.append(unit)
+        return units
+
+    def _add_unit(self, unit):
+        self._units[unit] = len(self._units) % self._jobs
+
+    def _get_unit(self, filename):
+        dirname = filename
+        while dirname not in self._units:
+            parent = DIRNAME(dirname)
+            if parent == dirname:
+                return filename
+            dirname = parent
+        return dirname
@@ -207,18 +207,24 @@ def parse_item(
             markers.add("expected-failure")
         # We can add support for other markers as we need them?
 
-    test = TestInfo(
-        id=nodeid,
-        name=item.name,
-        path=TestPath(
-            root=testroot,
-            relfile=relfile,
-            func=testfunc,
-            sub=[parameterized] if parameterized else None,
-        ),
-        source=location,
-        markers=sorted(markers) if markers else None,
-        parentid=parentid,
+    # The values were all checked above, so the test is built as-is (see
+    # info.py).
+    path = TestPath(
+        root=testroot,
+        relfile=relfile,
+        func=testfunc,
+        sub=[parameterized] if parameterized else None,
+    )
+    test = TestInfo._make(
+        (
+            nodeid,
+            item.name,
+            path,
+            location,
+            sorted(markers) if markers else [],
+            parentid,
+            "function",
+        )
     )
     if parents and parents[-1] == (".", None, "folder"):  # This should always be true?
         parents[-1] = (".", testroot, "folder")
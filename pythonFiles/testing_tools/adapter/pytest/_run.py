@@ -0,0 +1,195 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+from __future__ import absolute_import, print_function
+
+import sys
+
+import pytest
+
+from .. import util
+from ..discovery import fix_nodeid
+from ..impact import CoverageStore, LineTracer
+from ..shard import update_durations
+from ._pytest_item import parse_item
+
+
+def run(
+    pytestargs=None,
+    hidestdio=True,
+    fullstdio=False,
+    durationsfile=None,
+    coveragedb=None,
+    stream=None,
+    # *,
+    _pytest_main=pytest.main,
+    _plugin=None,
+    **_ignored
+):
+    """Run the tests and send each result to the stream as it happens.
+
+    Return (exit code, {outcome: count}).  If a "durationsfile" is
+    given then the duration of each test that ran is recorded there
+    (see shard.py).  Likewise, if a "coveragedb" is given then the lines
+    that each test ran are recorded there (see impact.py).
+    """
+    if _plugin is None:
+        _plugin = TestReporter(stream.send)
+    plugins = [_plugin]
+    store = None
+    if coveragedb:
+        store = CoverageStore(coveragedb)
+        plugins.append(CoverageRecorder(store, _plugin.get_testid))
+
+    pytestargs = list(pytestargs) if pytestargs else []
+    output = None
+    with (util.hide_stdio(util.STDIO_TAIL) if hidestdio else util.noop_cm()) as stdio:
+        try:
+            ec = _pytest_main(pytestargs, plugins)
+        finally:
+            # Keep whatever was recorded, even if pytest blew up.
+            if store is not None:
+                store.close()
+        # The output is only read back if pytest itself failed.
+        if hidestdio and ec not in (0, 1, 5):
+            output = stdio.getvalue(full=fullstdio)
+    # See: https://docs.pytest.org/en/latest/usage.html#possible-exit-codes
+    if ec not in (0, 1, 5):
+        # stdout is reserved for the results.
+        print(
+            "equivalent command: {} -m pytest {}".format(
+                sys.executable, util.shlex_unsplit(pytestargs)
+            ),
+            file=sys.stderr,
+        )
+        if output is not None:
+            print(output, file=sys.stderr)
+    if durationsfile:
+        update_durations(durationsfile, _plugin.durations)
+    return int(ec), _plugin.counts
+
+
+def _get_outcome(report):
+    """Return the test's outcome for the given report, if it has one."""
+    wasxfail = hasattr(report, "wasxfail")
+    if report.failed:
+        return "failed" if report.when == "call" else "error"
+    elif report.skipped:
+        return "xfailed" if wasxfail else "skipped"
+    elif report.when == "call":
+        return "xpassed" if wasxfail else "passed"
+    else:
+        return None
+
+
+def _get_message(report, outcome):
+    if outcome in ("failed", "error"):
+        return report.longreprtext
+    elif outcome == "skipped" and isinstance(report.longrepr, tuple):
+        # (filename, lineno, reason)
+        return report.longrepr[2]
+    elif outcome in ("xfailed", "xpassed"):
+        return report.wasxfail or None
+    else:
+        return None
+
+
+class TestReporter(object):
+    """A pytest plugin that sends the test results as they happen.
+
+    For each test, a "start" event is sent when it starts and a "result"
+    event (with the outcome, the duration and any message) once it is
+    torn down.  The test IDs match the ones from discovery.
+    """
+
+    def __init__(self, send):
+        self._send = send
+        self._rootdir = None
+        # {nodeid: item}
+        self._items = {}
+        # {nodeid: test ID}
+        self._testids = {}
+        # {nodeid: result}
+        self._results = {}
+        self.counts = {}
+        # {test ID: seconds}
+        self.durations = {}
+
+    # Relevant plugin hooks:
+    #  https://docs.pytest.org/en/latest/reference.html#reporting-hooks
+
+    def pytest_configure(self, config):
+        self._rootdir = str(getattr(config, "rootpath", None) or config.rootdir)
+
+    def pytest_collection_finish(self, session):
+        for item in session.items:
+            self._items[item.nodeid] = item
+
+    def pytest_runtest_logstart(self, nodeid, location):
+        self._send({"type": "start", "id": self.get_testid(nodeid)})
+
+    def pytest_runtest_logreport(self, report):
+        try:
+            result = self._results[report.nodeid]
+        except KeyError:
+            result = self._results[report.nodeid] = {
+                "type": "result",
+                "id": self.get_testid(report.nodeid),
+                "outcome": None,
+                "duration": 0.0,
+                "message": None,
+            }
+        result["duration"] += report.duration
+        outcome = _get_outcome(report)
+        # An error during teardown overrides the outcome of the test.
+        if outcome is not None and (result["outcome"] is None or outcome == "error"):
+            result["outcome"] = outcome
+            result["message"] = _get_message(report, outcome)
+        if report.when == "teardown":
+            del self._results[report.nodeid]
+            self.counts[result["outcome"]] = self.counts.get(result["outcome"], 0) + 1
+            self.durations[result["id"]] = result["duration"]
+            self._send(result)
+
+    # The rest
+
+    def get_testid(self, nodeid):
+        try:
+            return self._testids[nodeid]
+        except KeyError:
+            pass
+        item = self._items.get(nodeid)
+        test = parse_item(item)[0] if item is not None else None
+        if test is not None:
+            # This matches DiscoveredTests.add_test().
+            testid = fix_nodeid(test.id, "test", test.path.root)
+        else:
+            # The item was not collected here (e.g. with pytest-xdist).
+            testid = fix_nodeid(nodeid, "test", self._rootdir)
+        self._testids[nodeid] = testid
+        return testid
+
+
+class CoverageRecorder(object):
+    """A pytest plugin that records the lines that each test runs.
+
+    Only the lines in the files under the rootdir are recorded.
+    """
+
+    def __init__(self, store, get_testid):
+        self._store = store
+        self._get_testid = get_testid
+        self._tracer = None
+
+    def pytest_configure(self, config):
+        rootdir = str(getattr(config, "rootpath", None) or config.rootdir)
+        self._tracer = LineTracer(rootdir)
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_protocol(self, item, nextitem):
+        self._tracer.start()
+        try:
+            yield
+        finally:
+            lines = self._tracer.stop()
+        self._store.record(self._get_testid(item.nodeid), lines)
@@ -0,0 +1,66 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+from __future__ import absolute_import
+
+from ..impact import CoverageStore, parse_change
+from ..util import ABS_PATH, PATH_JOIN, fix_fileid
+from ._discovery import discover
+from ._shard import _get_arg
+
+
+def select(
+    pytestargs=None,
+    hidestdio=False,
+    coveragedb=None,
+    changed=None,
+    # *,
+    _discover=discover,
+    _store=CoverageStore,
+    **_ignored
+):
+    """Return (the discovered tests, the selection) for the changes.
+
+    Each change is a filename, optionally with the changed lines (see
+    impact.parse_change()).  The selection is a dict with the IDs of
+    the discovered tests that the changes may affect, the matching
+    pytest args, and how many of them were never recorded (see
+    impact.py).  Tests in a changed file are always selected, since a
+    test that ran no lines (e.g. a skipped one) is recorded with none.
+    """
+    if not coveragedb:
+        raise ValueError("missing coverage database")
+    # {filename: [(first line, last line)] or None}
+    changed_lines = {}
+    for change in changed or ():
+        filename, ranges = parse_change(change)
+        filename = ABS_PATH(filename)
+        if ranges is None or changed_lines.get(filename, ()) is None:
+            changed_lines[filename] = None
+        else:
+            changed_lines.setdefault(filename, []).extend(ranges)
+    _, tests = _discover(pytestargs, hidestdio)
+
+    store = _store(coveragedb)
+    try:
+        recorded = store.get_testids()
+        affected = set()
+        for root in set(test.path.root for test in tests):
+            for filename, ranges in changed_lines.items():
+                fileid = fix_fileid(filename, root)
+                affected.update(store.select(fileid, ranges))
+    finally:
+        store.close()
+
+    selected = [
+        test
+        for test in tests
+        if test.id in affected
+        or test.id not in recorded
+        or ABS_PATH(PATH_JOIN(test.path.root, test.path.relfile)) in changed_lines
+    ]
+    return tests, {
+        "tests": [test.id for test in selected],
+        "args": [_get_arg(test) for test in selected],
+        "unrecorded": sum(1 for test in selected if test.id not in recorded),
+    }
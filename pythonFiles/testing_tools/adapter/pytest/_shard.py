@@ -0,0 +1,51 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+from __future__ import absolute_import
+
+from ..shard import load_durations, split_tests
+from ..util import PATH_JOIN
+from ._discovery import discover
+
+
+def shard(
+    pytestargs=None,
+    hidestdio=False,
+    shards=1,
+    index=None,
+    durationsfile=None,
+    # *,
+    _discover=discover,
+    **_ignored
+):
+    """Return (the discovered tests, [shard]), splitting up the tests.
+
+    Each shard is a dict with the test IDs, the matching pytest args and
+    the expected duration (see shard.py).  If an "index" is given then
+    only that shard is returned.
+    """
+    if index is not None and not 0 <= index < shards:
+        raise ValueError("shard index {} out of range".format(index))
+    _, tests = _discover(pytestargs, hidestdio)
+    result = []
+    split = split_tests(tests, shards, load_durations(durationsfile))
+    for shardindex, (duration, shardtests, estimated) in enumerate(split):
+        result.append(
+            {
+                "index": shardindex,
+                "duration": round(duration, 3),
+                "estimated": estimated,
+                "tests": [test.id for test in shardtests],
+                "args": [_get_arg(test) for test in shardtests],
+            }
+        )
+    if index is not None:
+        result = [result[index]]
+    return tests, result
+
+
+def _get_arg(test):
+    """Return the pytest arg that selects the given test."""
+    # The test ID is relative to the root, so the arg works
+    # regardless of the current working directory.
+    return PATH_JOIN(test.path.root, test.id[2:])
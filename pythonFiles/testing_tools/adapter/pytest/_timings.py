@@ -0,0 +1,144 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""
+For "discover --timings", the time pytest spends in each collector is
+recorded, along with the time spent importing each conftest.py file.
+A collector's time covers only its own work (e.g. importing a test
+module and finding the tests in it).  Newer versions of pytest collect
+the directories on the way to a test file while collecting their parent,
+so the time of any collector (or conftest.py import) that happens in the
+meantime is taken out.  Once collection is done the slowest ones are
+written as a table, with the number of tests under each one.
+"""
+
+from __future__ import absolute_import
+
+import time
+
+from .. import util
+from ..util import DIRNAME, NORMCASE, PATH_SEP
+
+
+# The number of rows in the table.
+TIMINGS_LIMIT = 20
+
+
+class CollectionTimer(object):
+    """A pytest plugin that times the collectors and conftest imports."""
+
+    def __init__(
+        self,
+        # *,
+        _time=time.time,
+    ):
+        self._time = _time
+        self._rootdir = None
+        # [[nodeid, kind, start, time spent in nested ones]]
+        self._stack = []
+        # [(seconds, kind, id)]
+        self._timings = []
+        # {nodeid: number of items}
+        self._counts = {}
+        # {conftest filename: number of items}
+        self._conftests = {}
+        self._wrapped = False
+
+    # Relevant plugin hooks:
+    #  https://docs.pytest.org/en/latest/reference.html#collection-hooks
+
+    def pytest_plugin_registered(self, plugin, manager):
+        # There is no hook around importing a conftest.py file, so the
+        # (private) method that does it is wrapped, if it is there.
+        if self._wrapped:
+            return
+        self._wrapped = True
+        importconftest = getattr(manager, "_importconftest", None)
+        if importconftest is None:
+            return
+
+        def _importconftest(conftestpath, *args, **kwargs):
+            filename = str(conftestpath)
+            self._start(filename, "conftest")
+            try:
+                return importconftest(conftestpath, *args, **kwargs)
+            finally:
+                self._stop(filename, record=filename not in self._conftests)
+                self._conftests.setdefault(filename, 0)
+
+        manager._importconftest = _importconftest
+
+    def pytest_configure(self, config):
+        self._rootdir = str(config.rootdir)
+
+    def pytest_collectstart(self, collector):
+        self._start(collector.nodeid or ".", type(collector).__name__.lower())
+
+    def pytest_collectreport(self, report):
+        self._stop(report.nodeid or ".")
+
+    def pytest_collection_finish(self, session):
+        conftestdirs = [
+            (NORMCASE(DIRNAME(filename)) + PATH_SEP, filename)
+            for filename in self._conftests
+        ]
+        for item in getattr(session, "items", ()):
+            # The session and the root directory share the same id.
+            for nodeid in set(node.nodeid or "." for node in item.listchain()[:-1]):
+                self._counts[nodeid] = self._counts.get(nodeid, 0) + 1
+            filename = NORMCASE(str(item.fspath))
+            for dirname, conftest in conftestdirs:
+                if filename.startswith(dirname):
+                    self._conftests[conftest] += 1
+
+    # The rest
+
+    def _start(self, nodeid, kind):
+        self._stack.append([nodeid, kind, self._time(), 0.0])
+
+    def _stop(self, nodeid, record=True):
+        for index in range(len(self._stack) - 1, -1, -1):
+            if self._stack[index][0] == nodeid:
+                break
+        else:
+            return
+        # Anything above it was not reported (e.g. it failed).
+        _, kind, started, nested = self._stack[index]
+        del self._stack[index:]
+        elapsed = self._time() - started
+        if self._stack:
+            self._stack[-1][3] += elapsed
+        if record:
+            self._timings.append((elapsed - nested, kind, nodeid))
+
+    def get_timings(self):
+        """Return (seconds, kind, id, items) for each one, slowest first."""
+        rows = []
+        for seconds, kind, nodeid in self._timings:
+            if kind == "conftest":
+                items = self._conftests[nodeid]
+                if self._rootdir:
+                    nodeid = util.fix_fileid(nodeid, self._rootdir)
+            else:
+                items = self._counts.get(nodeid, 0)
+                if nodeid != ".":
+                    nodeid = "./" + nodeid
+            rows.append((seconds, kind, nodeid, items))
+        rows.sort(key=lambda row: row[0], reverse=True)
+        return rows
+
+    def format_table(self, limit=TIMINGS_LIMIT):
+        """Return the lines of the table of the slowest ones."""
+        rows = self.get_timings()
+        collecting = sum(row[0] for row in rows if row[1] != "conftest")
+        importing = sum(row[0] for row in rows if row[1] == "conftest")
+        lines = [
+            "slowest collectors ({:.3f}s collecting, {:.3f}s importing"
+            " conftest.py files):".format(collecting, importing),
+            "{:>9} {:>7}  {:<10} {}".format("seconds", "items", "kind", "id"),
+        ]
+        for seconds, kind, nodeid, items in rows[:limit]:
+            lines.append(
+                "{:>9.3f} {:>7}  {:<10} {}".format(seconds, items, kind, nodeid)
+            )
+        return lines
@@ -0,0 +1,91 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+from __future__ import absolute_import, print_function
+
+import os
+import traceback
+
+from .. import util
+from ..util import ABS_PATH, BASENAME, NORMCASE, PATH_JOIN
+from ..watch import CONFIG_FILES, forget_modules, get_watcher
+from ._discovery import discover
+
+
+def watch(
+    pytestargs=None,
+    report=None,
+    hidestdio=False,
+    jobs=1,
+    format="json",
+    # *,
+    _discover=discover,
+    _get_watcher=get_watcher,
+    _forget_modules=forget_modules,
+    _cwd=os.getcwd,
+    **_ignored
+):
+    """Report the discovered tests, then again each time files change.
+
+    This keeps running (until the process is stopped), so pytest, the
+    conftest.py files and the test modules stay imported.  After each
+    change only the changed modules are dropped from sys.modules, and
+    (using incremental discovery) only the changed files are collected
+    again.  However, if any other module changed (e.g. a helper that
+    the tests import) then every file is collected again, since the
+    cache can't tell which test files depend on it.  The current
+    working directory is watched.
+    """
+    if jobs > 1:
+        raise ValueError("watch mode does not support jobs")
+    if format != "json":
+        raise ValueError("watch mode only supports the json format")
+
+    pytestargs = list(pytestargs) if pytestargs else []
+    watcher = _get_watcher(_cwd())
+    testfiles = set()
+    refresh = False
+    try:
+        while True:
+            try:
+                # stdout is reserved for the results.
+                with util.stdout_to_stderr():
+                    parents, tests = _discover(
+                        pytestargs, hidestdio, incremental=True, refresh=refresh
+                    )
+            except Exception:
+                # The tests are reported again once the problem is fixed.
+                traceback.print_exc()
+            else:
+                report(parents, tests)
+                testfiles = set(
+                    NORMCASE(ABS_PATH(PATH_JOIN(test.path.root, test.path.relfile)))
+                    for test in tests
+                )
+            changed = set()
+            while not changed:
+                changed = watcher.wait()
+            refresh = _affects_cached_files(changed, testfiles)
+            if refresh:
+                # The test modules must be imported again too.
+                changed.update(testfiles)
+            _forget_modules(changed)
+    finally:
+        watcher.close()
+
+
+def _affects_cached_files(changed, testfiles):
+    """Return True if a cached test file may depend on a changed path.
+
+    A change to a test file or a conftest.py (which is part of the cache
+    key), or to a config file (which throws the cache away), is handled
+    by the cache itself.  Anything else may be imported by the tests.
+    """
+    for filename in changed:
+        filename = NORMCASE(filename)
+        if filename in testfiles:
+            continue
+        if BASENAME(filename) in ("conftest.py",) + CONFIG_FILES:
+            continue
+        return True
+    return False
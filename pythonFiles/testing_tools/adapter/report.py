@@ -4,6 +4,11 @@
 from __future__ import print_function
 
 import json
+import os
+import socket
+import sys
+
+from . import compact
 
 
 def report_discovered(
@@ -12,24 +17,38 @@ def report_discovered(
     # *,
     pretty=False,
     simple=False,
+    format="json",
+    snapshot=None,
+    stream=None,
     _send=print,
     **_ignored
 ):
-    """Serialize the discovered tests and write to stdout."""
-    if simple:
-        data = [
-            {
-                "id": test.id,
-                "name": test.name,
-                "testroot": test.path.root,
-                "relfile": test.path.relfile,
-                "lineno": test.lineno,
-                "testfunc": test.path.func,
-                "subtest": test.path.sub or None,
-                "markers": test.markers or [],
-            }
-            for test in tests
-        ]
+    """Serialize the discovered tests and write to stdout.
+
+    For the "compact" format, if a "snapshot" file is given then only
+    the differences from the tests in it are written, and the file is
+    updated (see compact.py).
+    """
+    if format == "ndjson":
+        if stream is None:
+            stream = DiscoveryStream(simple, _send=_send)
+        stream.finish(tests, parents)
+        stream.close()
+        return
+
+    kwargs = {}
+    if format == "compact":
+        if simple:
+            raise ValueError("the compact format does not support simple")
+        if snapshot:
+            previous = compact.load_snapshot(snapshot)
+            data, payload = compact.diff(previous, tests, parents)
+            compact.save_snapshot(snapshot, payload)
+        else:
+            data = compact.encode(tests, parents)
+        kwargs["separators"] = (",", ":")
+    elif simple:
+        data = [_simple_test_data(test) for test in tests]
     else:
         byroot = {}
         for parent in parents:
@@ -45,31 +64,11 @@ def report_discovered(
             if not parent.root:
                 root["id"] = parent.id
                 continue
-            root["parents"].append(
-                {
-                    # "id" must match what the testing framework recognizes.
-                    "id": parent.id,
-                    "kind": parent.kind,
-                    "name": parent.name,
-                    "parentid": parent.parentid,
-                }
-            )
-            if parent.relpath is not None:
-                root["parents"][-1]["relpath"] = parent.relpath
+            root["parents"].append(_parent_data(parent))
         for test in tests:
             # We are guaranteed that the parent was added.
             root = byroot[test.path.root]
-            testdata = {
-                # "id" must match what the testing framework recognizes.
-                "id": test.id,
-                "name": test.name,
-                # TODO: Add a "kind" field
-                #  (e.g. "unittest", "function", "doctest")
-                "source": test.source,
-                "markers": test.markers or [],
-                "parentid": test.parentid,
-            }
-            root["tests"].append(testdata)
+            root["tests"].append(_test_data(test))
         data = [
             {
                 "rootid": byroot[root]["id"],
@@ -80,7 +79,6 @@ def report_discovered(
             for root in sorted(byroot)
         ]
 
-    kwargs = {}
     if pretty:
         # human-formatted
         kwargs = dict(
@@ -92,3 +90,251 @@ def report_discovered(
     serialized = json.dumps(data, **kwargs)
 
     _send(serialized)
+
+
+def report_run(
+    counts,
+    exitcode,
+    # *,
+    stream=None,
+    port=None,
+    _send=print,
+    **_ignored
+):
+    """Send the final event of a test run and close the stream."""
+    if stream is None:
+        stream = RunStream(port, _send=_send)
+    stream.send({"type": "finished", "exitcode": exitcode, "counts": counts})
+    stream.close()
+
+
+def report_shards(
+    split,
+    tests,
+    # *,
+    index=None,
+    pretty=False,
+    _send=print,
+    **_ignored
+):
+    """Serialize the shards and write to stdout.
+
+    If a shard "index" was given then only that shard's pytest args are
+    written, one per line.
+    """
+    if index is not None:
+        for shard in split:
+            for arg in shard["args"]:
+                _send(arg)
+        return
+
+    data = {"tests": len(tests), "shards": split}
+    kwargs = {}
+    if pretty:
+        # human-formatted
+        kwargs = dict(
+            sort_keys=True,
+            indent=4,
+            separators=(",", ": "),
+        )
+    _send(json.dumps(data, **kwargs))
+
+
+def report_selected(
+    selection,
+    tests,
+    # *,
+    pretty=False,
+    _send=print,
+    **_ignored
+):
+    """Serialize the selected tests and write to stdout."""
+    data = dict(selection, discovered=len(tests))
+    kwargs = {}
+    if pretty:
+        # human-formatted
+        kwargs = dict(
+            sort_keys=True,
+            indent=4,
+            separators=(",", ": "),
+        )
+    _send(json.dumps(data, **kwargs))
+
+
+def _simple_test_data(test):
+    return {
+        "id": test.id,
+        "name": test.name,
+        "testroot": test.path.root,
+        "relfile": test.path.relfile,
+        "lineno": test.lineno,
+        "testfunc": test.path.func,
+        "subtest": test.path.sub or None,
+        "markers": test.markers or [],
+    }
+
+
+def _parent_data(parent):
+    data = {
+        # "id" must match what the testing framework recognizes.
+        "id": parent.id,
+        "kind": parent.kind,
+        "name": parent.name,
+        "parentid": parent.parentid,
+    }
+    if parent.relpath is not None:
+        data["relpath"] = parent.relpath
+    return data
+
+
+def _test_data(test):
+    return {
+        # "id" must match what the testing framework recognizes.
+        "id": test.id,
+        "name": test.name,
+        # TODO: Add a "kind" field
+        #  (e.g. "unittest", "function", "doctest")
+        "source": test.source,
+        "markers": test.markers or [],
+        "parentid": test.parentid,
+    }
+
+
+def _open_stdout():
+    """Return (file, close) for writing to stdout."""
+    # While the tool runs, hide_stdio() points the stdout
+    # file descriptor elsewhere, so we write to a copy of it.
+    try:
+        fd = os.dup(sys.stdout.fileno())
+    except (AttributeError, EnvironmentError):
+        # sys.stdout has been replaced (e.g. in tests).
+        return sys.stdout, sys.stdout.flush
+    outfile = os.fdopen(fd, "w")
+    return outfile, outfile.close
+
+
+def _open_socket(port):
+    sock = socket.create_connection(("localhost", port))
+    return sock.makefile("w")
+
+
+class DiscoveryStream(object):
+    """Write the discovered tests as newline-delimited JSON.
+
+    Each root, parent and test is a separate record, with a "type" of
+    "root", "parent" or "test", and each record is written as soon as
+    it is added.  Every parent is written before its children.  A test
+    that turns out not to be one of the discovered tests after all (e.g.
+    it was deselected once everything was collected) gets a "removed"
+    record, with its "id" and "root".  If "simple" is True then only the
+    tests are written, as for the "simple" JSON format.
+    """
+
+    def __init__(
+        self,
+        simple=False,
+        # *,
+        _send=None,
+    ):
+        if _send is None:
+            stdout, self._close = _open_stdout()
+            _send = lambda line: stdout.write(line + "\n")
+            self._flush = stdout.flush
+        else:
+            self._flush = self._close = lambda: None
+        self._simple = simple
+        self._send = _send
+        self._sent = False
+
+    def add(self, test, parents):
+        """Write the given test, after any of its new parents.
+
+        "parents" must be the parents that were not added before, from
+        the root down (as returned by DiscoveredTests.add_test()).
+        """
+        self._sent = True
+        if self._simple:
+            self._send(json.dumps(_simple_test_data(test)))
+            return
+        for parent in parents:
+            if parent.root is None:
+                record = {"type": "root", "id": parent.id, "root": parent.name}
+            else:
+                record = _parent_data(parent)
+                record["type"] = "parent"
+                record["root"] = parent.root
+            self._send(json.dumps(record))
+        record = _test_data(test)
+        record["type"] = "test"
+        record["root"] = test.path.root
+        self._send(json.dumps(record))
+
+    def remove(self, test):
+        """Write that the given test (already added) was removed."""
+        record = {"type": "removed", "id": test.id, "root": test.path.root}
+        self._send(json.dumps(record))
+
+    def finish(self, tests, parents):
+        """Write any tests that were not added yet, and flush."""
+        if not self._sent:
+            # The tool did not stream the tests as it found them.
+            self._add_all(tests, parents)
+        self._flush()
+
+    def close(self):
+        self._close()
+
+    def _add_all(self, tests, parents):
+        byid = {}
+        for parent in parents:
+            rootdir = parent.name if parent.root is None else parent.root
+            byid[(rootdir, parent.id)] = parent
+        added = set()
+        for test in tests:
+            rootdir = test.path.root
+            new = []
+            parentid = test.parentid
+            while (rootdir, parentid) not in added:
+                added.add((rootdir, parentid))
+                parent = byid[(rootdir, parentid)]
+                new.append(parent)
+                if parent.root is None:
+                    break
+                parentid = parent.parentid
+            new.reverse()
+            self.add(test, new)
+
+
+class RunStream(object):
+    """Send the events of a test run as newline-delimited JSON.
+
+    The events are written to stdout, or to the local socket on the
+    given port, and each one is flushed right away.
+    """
+
+    def __init__(
+        self,
+        port=None,
+        # *,
+        _send=None,
+    ):
+        if _send is None:
+            if port is None:
+                outfile, self._close = _open_stdout()
+            else:
+                outfile = _open_socket(port)
+                self._close = outfile.close
+
+            def _send(line):
+                outfile.write(line + "\n")
+                outfile.flush()
+
+        else:
+            self._close = lambda: None
+        self._send = _send
+
+    def send(self, event):
+        self._send(json.dumps(event))
+
+    def close(self):
+        self._close()
@@ -0,0 +1,116 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""
+Splitting the discovered tests into shards that take about as long to
+run as each other, for running them on several CI workers (or cores).
+
+The durations of past runs are kept in a JSON file ({test ID: seconds}),
+which the runner updates after each run.  A test with no recorded
+duration is expected to take the median of the other tests in its file,
+or of all the tests if none in its file have one.  The tests are then
+assigned with the "longest processing time" rule: from the longest to
+the shortest, each test goes to the shard that is expected to finish
+first.  Each shard keeps the tests in the order in which they were
+discovered.
+"""
+
+from __future__ import absolute_import
+
+import heapq
+import json
+
+
+# The expected duration of every test if there are no durations at all.
+DEFAULT_DURATION = 1.0
+
+
+def load_durations(filename):
+    """Return the recorded durations, or {} if there aren't any yet."""
+    if not filename:
+        return {}
+    try:
+        with open(filename) as infile:
+            data = json.load(infile)
+    except EnvironmentError:
+        # It hasn't been recorded yet.
+        return {}
+    if not isinstance(data, dict):
+        raise ValueError("bad durations file {!r}".format(filename))
+    return data
+
+
+def update_durations(filename, durations):
+    """Add the given durations to the file (replacing older ones)."""
+    recorded = load_durations(filename)
+    recorded.update(durations)
+    with open(filename, "w") as outfile:
+        json.dump(recorded, outfile, indent=4, sort_keys=True)
+
+
+def _median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2.0
+
+
+def estimate_durations(tests, durations):
+    """Return [(seconds, estimated)] for the given tests, in order."""
+    byfile = {}
+    for test in tests:
+        if test.id in durations:
+            byfile.setdefault(test.path.relfile, []).append(durations[test.id])
+    known = [d for fileknown in byfile.values() for d in fileknown]
+    default = _median(known) if known else DEFAULT_DURATION
+
+    estimates = []
+    medians = {}
+    for test in tests:
+        try:
+            estimates.append((durations[test.id], False))
+            continue
+        except KeyError:
+            pass
+        relfile = test.path.relfile
+        if relfile not in medians:
+            fileknown = byfile.get(relfile)
+            medians[relfile] = _median(fileknown) if fileknown else default
+        estimates.append((medians[relfile], True))
+    return estimates
+
+
+def split_tests(tests, count, durations=None):
+    """Return [(expected seconds, [test], estimated)] for each shard.
+
+    "estimated" is the number of tests in the shard that have no
+    recorded duration.
+    """
+    if count < 1:
+        raise ValueError("the number of shards must be at least 1")
+    tests = list(tests)
+    estimates = estimate_durations(tests, durations or {})
+    order = sorted(
+        range(len(tests)), key=lambda index: (-estimates[index][0], tests[index].id)
+    )
+
+    # [(expected seconds, shard index)]
+    loads = [(0.0, index) for index in range(count)]
+    assigned = [[] for _ in range(count)]
+    for index in order:
+        load, shard = heapq.heappop(loads)
+        assigned[shard].append(index)
+        heapq.heappush(loads, (load + estimates[index][0], shard))
+
+    shards = []
+    for indices in assigned:
+        indices.sort()
+        shards.append(
+            (
+                sum(estimates[index][0] for index in indices),
+                [tests[index] for index in indices],
+                sum(1 for index in indices if estimates[index][1]),
+            )
+        )
+    return shards
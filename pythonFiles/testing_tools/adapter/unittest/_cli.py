@@ -0,0 +1,15 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+from __future__ import absolute_import
+
+from ..errors import UnsupportedCommandError
+
+
+def add_subparser(cmd, name, parent):
+    """Add a new subparser to the given parent and add args to it."""
+    if cmd != "discover":
+        raise UnsupportedCommandError(cmd)
+    parser = parent.add_parser(name)
+    # For now we don't have any tool-specific CLI options to add.
+    return parser
@@ -0,0 +1,233 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+from __future__ import absolute_import, print_function
+
+import argparse
+import sys
+import unittest
+
+from .. import util, discovery
+from ..info import TestInfo, TestPath
+from ..util import ABS_PATH
+
+
+def discover(
+    unittestargs=None,
+    hidestdio=False,
+    fullstdio=False,
+    stream=None,
+    # *,
+    _loader=None,
+    **_ignored
+):
+    """Return the results of test discovery.
+
+    The args are the same as for "python -m unittest discover".  If a
+    "stream" is given then each test is added to it as soon as it is
+    found (see report.DiscoveryStream), rather than kept.
+    """
+    unittestargs = list(unittestargs) if unittestargs else []
+    args = _parse_args(unittestargs)
+    if _loader is None:
+        _loader = unittest.TestLoader()
+    if args.patterns:
+        _loader.testNamePatterns = args.patterns
+
+    output = None
+    with (util.hide_stdio(util.STDIO_TAIL) if hidestdio else util.noop_cm()) as stdio:
+        suite = _loader.discover(args.start, args.pattern, args.top)
+        # Modules that fail to import are reported as errors by the loader
+        # (rather than raised), along with a placeholder test.
+        errors = getattr(_loader, "errors", None)
+        # The output is only read back if discovery failed.
+        if hidestdio and errors:
+            output = stdio.getvalue(full=fullstdio)
+    if errors:
+        print(
+            "equivalent command: {} -m unittest discover {}".format(
+                sys.executable, util.shlex_unsplit(unittestargs)
+            )
+        )
+        if output is not None:
+            print(output, file=sys.stderr)
+        for error in errors:
+            print(error, file=sys.stderr)
+        sys.stdout.flush()
+        raise Exception("unittest discovery failed")
+
+    testroot = ABS_PATH(args.top if args.top is not None else args.start)
+    collector = TestCollector(testroot, stream=stream)
+    collector.add_suite(suite)
+    return (
+        collector._tests.parents,
+        list(collector._tests),
+    )
+
+
+def _parse_args(unittestargs):
+    """Return the discovery args, parsed like "unittest discover" does."""
+    parser = argparse.ArgumentParser(prog="unittest discover", add_help=False)
+    parser.add_argument("-s", "--start-directory", dest="start")
+    parser.add_argument("-p", "--pattern", dest="pattern")
+    parser.add_argument("-t", "--top-level-directory", dest="top")
+    parser.add_argument("-k", dest="patterns", action="append")
+    for flag in ("-v", "-q", "-f", "-c", "-b", "--locals"):
+        # These only matter when running the tests.
+        parser.add_argument(flag, action="count")
+    parser.add_argument("positional", nargs="*")
+    args = parser.parse_args(unittestargs)
+
+    positional = list(args.positional)
+    if len(positional) > 3:
+        parser.error("too many arguments")
+    for name in ("start", "pattern", "top"):
+        if positional and getattr(args, name) is None:
+            setattr(args, name, positional.pop(0))
+    if args.start is None:
+        args.start = "."
+    if args.pattern is None:
+        args.pattern = "test*.py"
+    if args.patterns:
+        # See unittest.main._convert_select_pattern().
+        args.patterns = [p if "*" in p else "*{}*".format(p) for p in args.patterns]
+    return args
+
+
+def _iter_tests(suite):
+    """Yield each test case in the given suite, in order."""
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            for subtest in _iter_tests(test):
+                yield subtest
+        else:
+            yield test
+
+
+def _unwrap(func):
+    """Return the function that the given (decorated) function wraps."""
+    func = getattr(func, "__func__", func)  # 2.7 unbound methods
+    while getattr(func, "__wrapped__", None) is not None:
+        func = func.__wrapped__
+    return func
+
+
+class TestCollector(object):
+    """Collects the tests from the suites that unittest discovered."""
+
+    def __init__(self, testroot, tests=None, stream=None):
+        if tests is None:
+            tests = discovery.DiscoveredTests()
+        self._testroot = testroot
+        self._tests = tests
+        self._stream = stream
+        # {module name: (relfile, [parent])}
+        self._modules = {}
+        # {filename: relfile (or None if not under the root)}
+        self._srcfiles = {}
+
+    def add_suite(self, suite):
+        """Add the tests from the given suite (and its parents)."""
+        for case in _iter_tests(suite):
+            test, parents = self.parse_test(case)
+            if test is None:
+                continue
+            if self._stream is None:
+                self._tests.add_test(test, parents)
+            else:
+                # Streamed tests are not kept.
+                self._stream.add(*self._tests.add_parents(test, parents))
+
+    def parse_test(self, case):
+        """Return (TestInfo, [parent]) for the given test case.
+
+        As with the pytest items, the parents start with the test's
+        direct parent and end with the test root.  (None, None) is
+        returned for tests that aren't a method on a TestCase class
+        from a file under the test root (e.g. doctests).
+        """
+        cls = type(case)
+        methodname = getattr(case, "_testMethodName", None)
+        func = getattr(cls, methodname, None) if methodname else None
+        if func is None:
+            return None, None
+        module = self._get_module(cls.__module__)
+        if module is None:
+            return None, None
+        relfile, fileparents = module
+
+        fileid = fileparents[0][0]
+        suiteid = fileid + "::" + cls.__name__
+        markers = set()
+        if getattr(cls, "__unittest_skip__", False):
+            markers.add("skip")
+        if getattr(func, "__unittest_skip__", False):
+            markers.add("skip")
+        if getattr(func, "__unittest_expecting_failure__", False):
+            markers.add("expected-failure")
+
+        test = TestInfo(
+            id=suiteid + "::" + methodname,
+            name=methodname,
+            path=TestPath(
+                root=self._testroot,
+                relfile=relfile,
+                func=cls.__name__ + "." + methodname,
+            ),
+            source=self._get_source(_unwrap(func), relfile),
+            markers=sorted(markers) if markers else None,
+            parentid=suiteid,
+        )
+        parents = [(suiteid, cls.__name__, "suite")] + fileparents
+        return test, parents
+
+    def _get_module(self, modname):
+        """Return (relfile, [parent]) for the module, if under the root."""
+        try:
+            return self._modules[modname]
+        except KeyError:
+            pass
+        module = sys.modules.get(modname)
+        filename = getattr(module, "__file__", None)
+        fileid = self._get_fileid(filename) if filename else None
+        if fileid is None:
+            result = None
+        else:
+            result = (util.fix_relpath(fileid), list(self._iter_parents(fileid)))
+        self._modules[modname] = result
+        return result
+
+    def _get_fileid(self, filename):
+        if filename.endswith((".pyc", ".pyo")):
+            filename = filename[:-1]
+        fileid = util.fix_fileid(ABS_PATH(filename), self._testroot)
+        if not fileid.startswith("./"):
+            # The module is not under the test root.
+            return None
+        return fileid
+
+    def _iter_parents(self, fileid):
+        """Yield the file's parent for each of the file and its folders."""
+        parentid, _, name = fileid.rpartition("/")
+        yield (fileid, name, "file")
+        while parentid != ".":
+            folderid = parentid
+            parentid, _, name = folderid.rpartition("/")
+            yield (folderid, name, "folder")
+        yield (".", self._testroot, "folder")
+
+    def _get_source(self, func, relfile):
+        code = getattr(func, "__code__", None)
+        if code is None:
+            # "somewhere in relfile"
+            return "{}:{}".format(relfile, 0)
+        try:
+            srcfile = self._srcfiles[code.co_filename]
+        except KeyError:
+            fileid = self._get_fileid(code.co_filename)
+            srcfile = util.fix_relpath(fileid) if fileid else None
+            self._srcfiles[code.co_filename] = srcfile
+        if srcfile is None:
+            # The test was inherited from outside the test root.
+            return "{}:{}".format(relfile, 0)
+        return "{}:{}".format(srcfile, code.co_firstlineno)
@@ -2,11 +2,6 @@
 # Licensed under the MIT License.
 
 import contextlib
-
-try:
-    from io import StringIO
-except ImportError:
-    from StringIO import StringIO  # 2.7
 import os
 import os.path
 import sys
@@ -61,6 +56,7 @@ NORMCASE = _os_path.normcase
 DIRNAME = _os_path.dirname
 BASENAME = _os_path.basename
 IS_ABS_PATH = _os_path.isabs
+ABS_PATH = _os_path.abspath
 PATH_JOIN = _os_path.join
 
 
@@ -171,6 +167,9 @@ def fix_fileid(
 #############################
 # stdio
 
+# How much of the hidden output to show after a failure (in bytes).
+STDIO_TAIL = 64 * 1024
+
 
 @contextlib.contextmanager
 def _replace_fd(file, target):
@@ -221,33 +220,71 @@ def _replace_stderr(target):
         sys.stderr = orig
 
 
-if sys.version_info < (3,):
-    _coerce_unicode = lambda s: unicode(s)
-else:
-    _coerce_unicode = lambda s: s
+class CapturedOutput(object):
+    """The stdout and stderr output captured by hide_stdio().
 
+    The output is kept in a temporary file rather than in memory and is
+    only read back when getvalue() is called.  If a "tail" size is given
+    then at most that many bytes (the last ones) are read back, unless
+    the full output is asked for.  Once closed (i.e. when hide_stdio()
+    exits), the file is gone, so any output that is needed must be read
+    back before then.
+    """
 
-@contextlib.contextmanager
-def _temp_io():
-    sio = StringIO()
-    with tempfile.TemporaryFile("r+") as tmp:
-        try:
-            yield sio, tmp
-        finally:
-            tmp.seek(0)
-            buff = tmp.read()
-            sio.write(_coerce_unicode(buff))
+    def __init__(self, fileobj, tail=None):
+        self._file = fileobj
+        self._tail = tail
+
+    def getvalue(self, full=False):
+        """Return the captured output (or just the tail of it)."""
+        self._file.flush()
+        fd = self._file.fileno()
+        size = os.fstat(fd).st_size
+        start = 0
+        if self._tail is not None and not full:
+            start = max(0, size - self._tail)
+        os.lseek(fd, start, os.SEEK_SET)
+        chunks = []
+        while True:
+            chunk = os.read(fd, 64 * 1024)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        encoding = getattr(self._file, "encoding", None) or "utf-8"
+        value = b"".join(chunks).decode(encoding, "replace")
+        if start:
+            value = "[{} bytes of earlier output omitted]\n".format(start) + value
+        return value
+
+    def close(self):
+        """Close the file, discarding the output."""
+        self._file.close()
 
 
 @contextlib.contextmanager
-def hide_stdio():
-    """Swallow stdout and stderr."""
-    with _temp_io() as (sio, fileobj):
+def hide_stdio(tail=None):
+    """Swallow stdout and stderr.
+
+    The yielded CapturedOutput holds what was written, until exit.
+    """
+    fileobj = tempfile.TemporaryFile("r+")
+    captured = CapturedOutput(fileobj, tail)
+    try:
         with _replace_fd(sys.stdout, fileobj):
             with _replace_stdout(fileobj):
                 with _replace_fd(sys.stderr, fileobj):
                     with _replace_stderr(fileobj):
-                        yield sio
+                        yield captured
+    finally:
+        captured.close()
+
+
+@contextlib.contextmanager
+def stdout_to_stderr():
+    """Send anything written to stdout to stderr instead."""
+    with _replace_fd(sys.stdout, sys.stderr):
+        with _replace_stdout(sys.stderr):
+            yield
 
 
 #############################
@@ -0,0 +1,335 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""
+Watching the workspace for changes, for the adapter's "--watch" mode.
+
+On Linux the kernel tells us about changes (inotify).  Everywhere else
+(or if inotify can't be used) the files are stat'ed periodically.  Either
+way only the files that may affect discovery are considered: Python
+files and the config files that test frameworks read.
+"""
+
+from __future__ import absolute_import
+
+import errno
+import os
+import select
+import struct
+import sys
+import time
+
+from .util import ABS_PATH, BASENAME, DIRNAME, NORMCASE, PATH_JOIN, PATH_SEP
+
+
+CONFIG_FILES = ("pytest.ini", "tox.ini", "setup.cfg", "pyproject.toml")
+# Directories that never hold anything we care about (or that the tools
+# write to themselves, like .pytest_cache).
+IGNORED_DIRS = ("__pycache__", "node_modules")
+
+# How long to wait for more changes once a change shows up (in seconds).
+# Editors often write a file more than once when saving it.
+SETTLE_DELAY = 0.1
+
+
+def is_watched(filename):
+    """Return True if a change to the file may affect discovery."""
+    basename = BASENAME(filename)
+    return basename.endswith(".py") or basename in CONFIG_FILES
+
+
+def _is_ignored_dir(dirname):
+    basename = BASENAME(dirname)
+    return basename.startswith(".") or basename in IGNORED_DIRS
+
+
+def _iter_dirs(root):
+    for dirname, subdirs, _ in os.walk(root):
+        subdirs[:] = [d for d in subdirs if not _is_ignored_dir(d)]
+        yield dirname
+
+
+def forget_modules(
+    changed,
+    # *,
+    _modules=sys.modules,
+):
+    """Remove the modules for the changed files (or dirs) from sys.modules.
+
+    That way they are imported again, rather than reused, the next time
+    the tests are collected.  Return the names of the removed modules.
+    """
+    prefixes = set()
+    for filename in changed:
+        filename = NORMCASE(filename)
+        prefixes.add(filename)
+        if filename.endswith(".py"):
+            prefixes.add(filename + "c")
+    forgotten = []
+    for name, module in list(_modules.items()):
+        filename = getattr(module, "__file__", None)
+        if not filename:
+            continue
+        filename = NORMCASE(ABS_PATH(filename))
+        current = filename
+        while True:
+            if current in prefixes:
+                forgotten.append(name)
+                del _modules[name]
+                break
+            parent = DIRNAME(current)
+            if parent == current:
+                break
+            current = parent
+    return forgotten
+
+
+def get_watcher(root, **kwargs):
+    """Return the best available watcher for the given directory."""
+    try:
+        return InotifyWatcher(root, **kwargs)
+    except (EnvironmentError, ImportError, AttributeError):
+        # inotify isn't supported here.
+        return PollingWatcher(root, **kwargs)
+
+
+class _Watcher(object):
+    def __init__(self, root, delay=SETTLE_DELAY):
+        self.root = ABS_PATH(root)
+        self._delay = delay
+
+    def wait(self, timeout=None):
+        """Return the paths that changed, once some did.
+
+        The paths are files, or directories if everything under them may
+        have changed (e.g. when a directory was moved).  An empty set is
+        returned if nothing changed before the timeout.
+        """
+        changed = self._poll(timeout)
+        while changed:
+            # Wait for the changes to settle down.
+            more = self._poll(self._delay)
+            if not more:
+                break
+            changed.update(more)
+        return changed
+
+    def close(self):
+        pass
+
+    def _poll(self, timeout):
+        """Return the paths that changed within the timeout."""
+        raise NotImplementedError
+
+
+class PollingWatcher(_Watcher):
+    """A watcher that finds the changes by stat'ing every file."""
+
+    def __init__(
+        self,
+        root,
+        delay=SETTLE_DELAY,
+        interval=0.5,
+        # *,
+        _time=time.time,
+        _sleep=time.sleep,
+    ):
+        super(PollingWatcher, self).__init__(root, delay)
+        self._interval = interval
+        self._time = _time
+        self._sleep = _sleep
+        self._stats = self._snapshot()
+
+    def _poll(self, timeout):
+        deadline = None if timeout is None else self._time() + timeout
+        while True:
+            stats = self._snapshot()
+            changed = set(
+                filename
+                for filename in set(stats) | set(self._stats)
+                if stats.get(filename) != self._stats.get(filename)
+            )
+            self._stats = stats
+            if changed:
+                return changed
+            if deadline is not None:
+                remaining = deadline - self._time()
+                if remaining <= 0:
+                    return changed
+                self._sleep(min(self._interval, remaining))
+            else:
+                self._sleep(self._interval)
+
+    def _snapshot(self):
+        """Return {filename: (mtime, size)} for each watched file."""
+        stats = {}
+        for dirname in _iter_dirs(self.root):
+            try:
+                basenames = os.listdir(dirname)
+            except EnvironmentError:
+                # The directory went away.
+                continue
+            for basename in basenames:
+                filename = PATH_JOIN(dirname, basename)
+                if not is_watched(filename):
+                    continue
+                try:
+                    st = os.stat(filename)
+                except EnvironmentError:
+                    continue
+                stats[filename] = (st.st_mtime, st.st_size)
+        return stats
+
+
+# See "man 7 inotify".
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0x00000800
+IN_CLOEXEC = 0x00080000
+
+_WATCH_MASK = (
+    IN_MODIFY
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+)
+_EVENT = struct.Struct("iIII")
+
+
+def _load_inotify():
+    import ctypes
+    import ctypes.util
+
+    if not sys.platform.startswith("linux"):
+        raise ImportError("inotify is only available on Linux")
+    libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    # These raise AttributeError if libc doesn't have them.
+    libc.inotify_init1.argtypes = [ctypes.c_int]
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    return libc, ctypes.get_errno
+
+
+class InotifyWatcher(_Watcher):
+    """A watcher that is told about the changes by the Linux kernel."""
+
+    def __init__(
+        self,
+        root,
+        delay=SETTLE_DELAY,
+        # *,
+        _load=_load_inotify,
+    ):
+        super(InotifyWatcher, self).__init__(root, delay)
+        self._libc, self._get_errno = _load()
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            self._raise()
+        # {watch descriptor: dirname}
+        self._dirs = {}
+        try:
+            self._add_tree(self.root)
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _raise(self):
+        err = self._get_errno()
+        raise OSError(err, os.strerror(err))
+
+    def _add_tree(self, root):
+        """Watch the directory and its subdirectories.
+
+        Return the watched files that are already there.
+        """
+        found = set()
+        for dirname in _iter_dirs(root):
+            encoded = dirname
+            if not isinstance(encoded, bytes):
+                encoded = encoded.encode(sys.getfilesystemencoding())
+            wd = self._libc.inotify_add_watch(self._fd, encoded, _WATCH_MASK)
+            if wd < 0:
+                if self._get_errno() in (errno.ENOENT, errno.ENOTDIR):
+                    # It went away in the meantime.
+                    continue
+                self._raise()
+            self._dirs[wd] = dirname
+            try:
+                basenames = os.listdir(dirname)
+            except EnvironmentError:
+                continue
+            for basename in basenames:
+                filename = PATH_JOIN(dirname, basename)
+                if is_watched(filename):
+                    found.add(filename)
+        return found
+
+    def _poll(self, timeout):
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        changed = set()
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except EnvironmentError as exc:
+                if exc.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    break
+                raise
+            if not data:
+                break
+            self._handle_events(data, changed)
+        return changed
+
+    def _handle_events(self, data, changed):
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, size = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset : offset + size].rstrip(b"\0")
+            offset += size
+            if mask & IN_Q_OVERFLOW:
+                # Some events were lost, so anything may have changed.
+                changed.add(self.root)
+                continue
+            dirname = self._dirs.get(wd)
+            if dirname is None:
+                continue
+            if mask & IN_IGNORED:
+                # The directory is gone.
+                del self._dirs[wd]
+                continue
+            if not name:
+                # The event is for the directory itself.
+                if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                    changed.add(dirname)
+                continue
+            if not isinstance(dirname, bytes):
+                name = name.decode(sys.getfilesystemencoding())
+            path = dirname + PATH_SEP + name
+            if mask & IN_ISDIR:
+                if _is_ignored_dir(path):
+                    continue
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    changed.update(self._add_tree(path))
+                changed.add(path)
+            elif is_watched(path):
+                changed.add(path)
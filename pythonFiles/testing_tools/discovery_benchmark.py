@@ -0,0 +1,208 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""Measure the adapter's handling of a large number of discovered tests.
+
+Synthetic collector output (the same shape that parse_item() produces)
+is generated for a configurable number of files, classes, functions and
+parametrized cases.  Each test is then built, added to a DiscoveredTests,
+and reported as JSON, exactly as "discover" does after the test framework
+is done collecting.  The time for each phase is printed, followed by the
+memory held by the discovered tests and the peak memory of the run.
+
+The number of parents (files, classes, parametrized functions, etc.)
+is printed too, since adding the tests should scale with it rather
+than with the number of tests times the depth of the tree.
+
+This script is only used for extension development.
+"""
+
+from __future__ import absolute_import, print_function
+
+import argparse
+import gc
+import json
+import os.path
+import sys
+import time
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None  # 2.7
+
+sys.path.insert(
+    1,
+    os.path.dirname(  # pythonFiles
+        os.path.dirname(  # pythonFiles/testing_tools
+            os.path.abspath(__file__)  # this file
+        )
+    ),
+)
+
+from testing_tools.adapter.discovery import DiscoveredTests
+from testing_tools.adapter.info import TestInfo, TestPath
+from testing_tools.adapter.report import report_discovered
+
+
+TESTROOT = "/tmp/discovery-benchmark"
+PHASES = ("collect", "add", "parents", "report")
+
+
+#############################
+# the synthetic collector output
+
+
+def iter_collected(files=2000, folders=2, classes=2, functions=10, params=5):
+    """Yield (test, parents) for each synthetic test.
+
+    The strings are built separately for each test, as they are when
+    the real items are parsed.
+    """
+    for fileindex in range(files):
+        for classindex in range(classes):
+            for funcindex in range(functions):
+                for paramindex in range(params):
+                    yield _make_test(
+                        fileindex, folders, classindex, funcindex, paramindex
+                    )
+
+
+def _make_test(fileindex, folders, classindex, funcindex, paramindex):
+    dirnames = [
+        "pkg{}".format((fileindex // 10**depth) % 10) for depth in range(folders)
+    ]
+    fileid = "./" + "/".join(dirnames + ["test_mod{}.py".format(fileindex)])
+    suiteid = "{}::TestClass{}".format(fileid, classindex)
+    funcname = "test_func{}".format(funcindex)
+    param = "[{}]".format(paramindex)
+    funcid = "{}::{}".format(suiteid, funcname)
+
+    parents = [
+        (funcid, funcname, "function"),
+        (suiteid, "TestClass{}".format(classindex), "suite"),
+        (fileid, fileid.rpartition("/")[2], "file"),
+    ]
+    folderid = fileid.rpartition("/")[0]
+    while folderid != ".":
+        parents.append((folderid, folderid.rpartition("/")[2], "folder"))
+        folderid = folderid.rpartition("/")[0]
+    parents.append((".", TESTROOT, "folder"))
+
+    test = TestInfo(
+        id=funcid + param,
+        name=funcname + param,
+        path=TestPath(
+            root=TESTROOT,
+            relfile=fileid,
+            func="TestClass{}.{}".format(classindex, funcname),
+            sub=[param],
+        ),
+        source="{}:{}".format(fileid, 10 * funcindex + 3),
+        markers=["skip"] if paramindex == 0 else None,
+        parentid=funcid,
+    )
+    return test, parents
+
+
+#############################
+# the benchmark
+
+
+def run_benchmark(options):
+    """Return ({phase: seconds}, DiscoveredTests) for one run."""
+    timings = {}
+    started = time.time()
+    collected = list(iter_collected(**options))
+    timings["collect"] = time.time() - started
+
+    started = time.time()
+    discovered = DiscoveredTests()
+    for test, parents in collected:
+        discovered.add_test(test, parents)
+    del collected
+    timings["add"] = time.time() - started
+
+    started = time.time()
+    parents = discovered.parents
+    timings["parents"] = time.time() - started
+
+    started = time.time()
+    report_discovered(list(discovered), parents, _send=lambda data: None)
+    timings["report"] = time.time() - started
+    return timings, discovered
+
+
+def measure_memory(options):
+    """Return (retained, peak) in bytes, or None if it can't be measured."""
+    if tracemalloc is None:
+        return None
+    gc.collect()
+    tracemalloc.start()
+    try:
+        _, discovered = run_benchmark(options)
+        gc.collect()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return retained, peak
+
+
+#############################
+# reporting
+
+
+def report(count, parents, runs, memory, _print=print):
+    _print("tests: {}".format(count))
+    _print("parents: {}".format(parents))
+    _print(" ".join("{:>10}".format(h) for h in ("run",) + PHASES + ("total",)))
+    for index, timings in enumerate(runs):
+        row = [index + 1] + ["{:.3f}".format(timings[phase]) for phase in PHASES]
+        row.append("{:.3f}".format(sum(timings.values())))
+        _print(" ".join("{:>10}".format(v) for v in row))
+    if memory is not None:
+        retained, peak = memory
+        _print()
+        _print("retained memory: {:.1f} MiB".format(retained / 1024.0 / 1024.0))
+        _print("peak memory: {:.1f} MiB".format(peak / 1024.0 / 1024.0))
+
+
+def parse_args(argv=sys.argv[1:], prog=sys.argv[0]):
+    parser = argparse.ArgumentParser(prog=prog, description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--folders", type=int, default=2, help="folder depth")
+    parser.add_argument("--classes", type=int, default=2, help="per file")
+    parser.add_argument("--functions", type=int, default=10, help="per class")
+    parser.add_argument("--params", type=int, default=5, help="per function")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--no-memory", dest="memory", action="store_false")
+    parser.add_argument("--json", action="store_true")
+    return parser.parse_args(argv)
+
+
+def main(args):
+    options = dict(
+        files=args.files,
+        folders=args.folders,
+        classes=args.classes,
+        functions=args.functions,
+        params=args.params,
+    )
+    runs = []
+    for _ in range(args.repeat):
+        timings, discovered = run_benchmark(options)
+        runs.append(timings)
+    count = len(discovered)
+    parents = len(discovered.parents)
+    del discovered
+    # Tracing slows everything down, so it gets a separate run.
+    memory = measure_memory(options) if args.memory else None
+    if args.json:
+        data = {"tests": count, "parents": parents, "runs": runs, "memory": memory}
+        print(json.dumps(data, indent=4))
+    else:
+        report(count, parents, runs, memory)
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,62 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import io
+import json
+
+import jsonLinesServer
+
+
+class EchoServer(jsonLinesServer.JsonLinesServer):
+    def _handle_request(self, request):
+        if "fail" in request:
+            raise ValueError(request["fail"])
+        for part in request.get("parts", ()):
+            self._write_partial(request, part)
+        return request.get("echo")
+
+
+def _run(*lines):
+    stdin = io.StringIO("".join(line + "\n" for line in lines))
+    stdout = io.StringIO()
+    EchoServer(stdin, stdout).watch()
+    return [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+
+class TestJsonLinesServer(object):
+    def test_results(self):
+        responses = _run(
+            json.dumps({"id": 1, "echo": "spam"}),
+            json.dumps({"id": 2, "echo": [1, 2]}),
+        )
+
+        assert responses == [
+            {"id": 1, "results": "spam"},
+            {"id": 2, "results": [1, 2]},
+        ]
+
+    def test_error(self):
+        responses = _run(json.dumps({"id": 1, "fail": "spam"}))
+
+        assert responses == [{"id": 1, "error": "spam"}]
+
+    def test_bad_request(self):
+        responses = _run("{not json", json.dumps({"id": 2, "echo": "eggs"}))
+
+        assert responses[0]["id"] is None
+        assert list(responses[0]) == ["id", "error"]
+        assert responses[1] == {"id": 2, "results": "eggs"}
+
+    def test_blank_lines_skipped(self):
+        responses = _run("", "   ", json.dumps({"id": 1, "echo": "spam"}))
+
+        assert responses == [{"id": 1, "results": "spam"}]
+
+    def test_partial(self):
+        responses = _run(json.dumps({"id": 1, "parts": ["a", "b"], "echo": ""}))
+
+        assert responses == [
+            {"id": 1, "results": "a", "partial": True},
+            {"id": 1, "results": "b", "partial": True},
+            {"id": 1, "results": ""},
+        ]
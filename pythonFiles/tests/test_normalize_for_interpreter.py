@@ -1,9 +1,13 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License.
 
+import ast
+import io
+import json
 import pytest
 import sys
 import textwrap
+import time
 
 import normalizeForInterpreter
 
@@ -120,3 +124,183 @@ class TestNormalizationScript(object):
         normalizeForInterpreter.normalize_lines(src)
         result = capsys.readouterr()
         assert result.out == expectedResult
+
+    @pytest.mark.skipif(
+        sys.version_info.major == 2,
+        reason="normalizeForInterpreter not working for 2.7, see GH #4805",
+    )
+    def test_benchmark_10k_lines(self, capsys):
+        chunk = textwrap.dedent(
+            """\
+            value_{0} = {0}
+
+            def func_{0}(x):
+                y = x + 1
+
+                return y
+
+
+            if value_{0}:
+                print(func_{0}(value_{0}))
+            """
+        )
+        expected_chunk = textwrap.dedent(
+            """\
+            value_{0} = {0}
+
+            def func_{0}(x):
+                y = x + 1
+                return y
+
+            if value_{0}:
+                print(func_{0}(value_{0}))
+            """
+        )
+        src = "".join(chunk.format(i) for i in range(1000))
+        expectedResult = "\n".join(expected_chunk.format(i) for i in range(1000))
+
+        start = time.time()
+        normalizeForInterpreter.normalize_lines(src)
+        elapsed = time.time() - start
+
+        result = capsys.readouterr()
+        assert result.out == expectedResult
+        assert elapsed < 5
+
+
+@pytest.mark.skipif(
+    sys.version_info.major == 2,
+    reason="normalizeForInterpreter not working for 2.7, see GH #4805",
+)
+class TestNormalizedBlocks(object):
+    def test_blocks(self):
+        src = textwrap.dedent(
+            """\
+            import os
+            import sys
+
+            # Some rando comment
+            @decorator
+            def show_something():
+
+                print("Something")
+            if True:
+                x = 22
+            else:
+                x = 30
+
+            print(x)
+            """
+        )
+
+        blocks = list(normalizeForInterpreter.iter_normalized_blocks(src))
+
+        assert blocks == [
+            "import os\n\n",
+            "import sys\n# Some rando comment\n\n",
+            '@decorator\ndef show_something():\n    print("Something")\n\n',
+            "if True:\n    x = 22\nelse:\n    x = 30\n\n",
+            "print(x)\n",
+        ]
+        assert "".join(blocks) == normalizeForInterpreter.normalize_source(src)
+
+    def test_try_except_else(self):
+        # Each nested statement starts a line (after a line continuation).
+        src = (
+            "try: \\\n"
+            "x = 1\n"
+            "except Exception: \\\n"
+            "x = 2\n"
+            "else: \\\n"
+            "x = 3\n"
+            "finally: \\\n"
+            "x = 4\n"
+            "print(x)\n"
+        )
+        tree = ast.parse(src)
+
+        line_numbers = list(
+            normalizeForInterpreter._iter_statement_line_numbers(tree.body)
+        )
+        blocks = list(normalizeForInterpreter.iter_normalized_blocks(src))
+
+        assert line_numbers == [1, 2, 4, 6, 8, 9]
+        assert "".join(blocks) == normalizeForInterpreter.normalize_source(src)
+
+    def test_matches_normalize_source(self):
+        chunk = textwrap.dedent(
+            """\
+            value_{0} = {0}
+
+            def func_{0}(x):
+                y = x + 1
+
+                return y
+            if value_{0}:
+                print(func_{0}(value_{0}))
+            """
+        )
+        src = "".join(chunk.format(i) for i in range(100)) + "\n"
+
+        blocks = list(normalizeForInterpreter.iter_normalized_blocks(src))
+
+        assert len(blocks) == 300
+        assert "".join(blocks) == normalizeForInterpreter.normalize_source(src)
+
+    def test_blocks_before_error(self):
+        src = "x = 1\n\nif x:\n    y = 2\n\nz = 3\nprint(\n"
+        blocks = normalizeForInterpreter.iter_normalized_blocks(src)
+
+        assert next(blocks) == "x = 1\n\n"
+        with pytest.raises(Exception):
+            next(blocks)
+
+
+@pytest.mark.skipif(
+    sys.version_info.major == 2,
+    reason="normalizeForInterpreter not working for 2.7, see GH #4805",
+)
+class TestNormalizationServer(object):
+    def _run(self, *requests):
+        stdin = io.StringIO("".join(json.dumps(r) + "\n" for r in requests))
+        stdout = io.StringIO()
+        server = normalizeForInterpreter.NormalizationServer(stdin, stdout)
+        server.watch()
+        return [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+    def test_code(self):
+        src = "x = 1\n\nif x:\n\n    y = 2\nz = 3\n"
+
+        responses = self._run({"id": 1, "code": src}, {"id": 2, "code": src})
+
+        assert responses == [
+            {"id": 1, "results": "x = 1\n\nif x:\n    y = 2\n\nz = 3\n"},
+            {"id": 2, "results": "x = 1\n\nif x:\n    y = 2\n\nz = 3\n"},
+        ]
+
+    def test_batch(self):
+        codes = ["a = 1\n\nb = 2\n", "def spam(:\n", 'print("ham")']
+
+        (response,) = self._run({"id": 1, "codes": codes})
+
+        assert response["id"] == 1
+        assert response["results"][0] == {"code": "a = 1\nb = 2\n"}
+        assert list(response["results"][1]) == ["error"]
+        assert response["results"][2] == {"code": 'print("ham")'}
+
+    def test_error(self):
+        responses = self._run({"id": 1, "code": "def spam(:\n"}, {"id": 2})
+
+        assert [list(r) for r in responses] == [["id", "error"], ["id", "error"]]
+
+    def test_stream(self):
+        src = "x = 1\n\nif x:\n\n    y = 2\nz = 3\n"
+
+        responses = self._run({"id": 1, "code": src, "stream": True})
+
+        assert responses == [
+            {"id": 1, "results": "x = 1\n\n", "partial": True},
+            {"id": 1, "results": "if x:\n    y = 2\n\n", "partial": True},
+            {"id": 1, "results": "z = 3\n", "partial": True},
+            {"id": 1, "results": ""},
+        ]
@@ -0,0 +1,137 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import json
+import os
+import sys
+
+# refactor.py takes the workspace root from the command line when it is
+# imported.
+_argv = sys.argv
+sys.argv = [_argv[0], os.getcwd()]
+try:
+    import refactor
+finally:
+    sys.argv = _argv
+
+
+class FakeResource(object):
+    def __init__(self, path, contents=None):
+        self.path = path
+        self.real_path = os.path.join("/workspace", path)
+        self._contents = contents
+
+    def exists(self):
+        return self._contents is not None
+
+    def read(self):
+        return self._contents
+
+
+class FakeChange(object):
+    def __init__(self, path, old, new, stored=True):
+        self.resource = FakeResource(path, old if stored else None)
+        self.old_contents = None if stored else old
+        self.new_contents = new
+
+
+def _changes(count):
+    return [
+        FakeChange(
+            "spam{}.py".format(i),
+            "x = {}\ny = x\n".format(i),
+            "z = {}\ny = z\n".format(i),
+            stored=i % 2 == 0,
+        )
+        for i in range(count)
+    ]
+
+
+class TestIterDiffs(object):
+    def test_serial(self):
+        changes = _changes(refactor.PARALLEL_DIFF_THRESHOLD - 1)
+
+        results = list(refactor.iter_diffs(changes))
+
+        assert refactor._diff_executor is None
+        assert results == [(change, refactor.get_diff(change)) for change in changes]
+
+    def test_parallel(self):
+        changes = _changes(refactor.PARALLEL_DIFF_THRESHOLD + 4)
+        try:
+            ordered = list(refactor.iter_diffs(changes))
+            executor = refactor._diff_executor
+            unordered = list(refactor.iter_diffs(changes, ordered=False))
+        finally:
+            refactor._shutdown_diff_executor()
+
+        expected = [(change, refactor.get_diff(change)) for change in changes]
+        assert executor is not None
+        assert ordered == expected
+        assert sorted(unordered, key=lambda r: r[0].resource.path) == sorted(
+            expected, key=lambda r: r[0].resource.path
+        )
+        assert "-x = 1\n-y = x\n+z = 1\n+y = z\n" in expected[1][1]
+        assert refactor._diff_executor is None
+
+    def test_shutdown_without_pool(self):
+        refactor._shutdown_diff_executor()
+
+        assert refactor._diff_executor is None
+
+
+class TestRopeRefactoring(object):
+    def _process(self, request):
+        # Skip __init__(), which reads from the real stdin.
+        server = refactor.RopeRefactoring.__new__(refactor.RopeRefactoring)
+        responses = []
+        server._write_response = lambda response: responses.append(json.loads(response))
+
+        def rename(filePath, start, newName, indent_size, onChange, timings):
+            changes = [
+                refactor.Change(filePath, diff="spam diff"),
+                refactor.Change(filePath, diff="eggs diff"),
+            ]
+            for change in changes:
+                if onChange is not None:
+                    onChange(change)
+            return [{"diff": change.diff} for change in changes]
+
+        server._rename = rename
+        server._process_request(json.dumps(request))
+        return responses
+
+    def test_not_streamed(self):
+        request = {
+            "id": 1,
+            "lookup": "rename",
+            "file": "spam.py",
+            "start": "10",
+            "name": "ham",
+            "indent_size": "4",
+        }
+
+        responses = self._process(request)
+
+        assert responses == [
+            {"id": 1, "results": [{"diff": "spam diff"}, {"diff": "eggs diff"}]},
+        ]
+
+    def test_streamed(self):
+        request = {
+            "id": 1,
+            "lookup": "rename",
+            "file": "spam.py",
+            "start": "10",
+            "name": "ham",
+            "indent_size": "4",
+            "stream": True,
+        }
+
+        responses = self._process(request)
+
+        assert responses == [
+            {"id": 1, "results": [{"diff": "spam diff"}], "partial": True},
+            {"id": 1, "results": [{"diff": "eggs diff"}], "partial": True},
+            {"id": 1, "results": []},
+        ]
@@ -0,0 +1,114 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import os
+
+import symbolIndexer
+
+
+def _write(tmpdir, relpath, text):
+    filename = tmpdir.join(*relpath.split("/"))
+    filename.write(text, ensure=True)
+    return filename
+
+
+def _names(index):
+    return sorted((relpath, symbol[1]) for relpath, symbol in index.iter_symbols())
+
+
+class TestSymbolIndex(object):
+    def test_update(self, tmpdir):
+        _write(tmpdir, "spam.py", "class Spam(object):\n    def eggs(self): pass\n")
+        _write(tmpdir, "pkg/ham.py", "def ham():\n    pass\n")
+        _write(tmpdir, "pkg/__pycache__/ham.py", "def ignored(): pass\n")
+        _write(tmpdir, "broken.py", "def (\n")
+        index = symbolIndexer.SymbolIndex(str(tmpdir))
+
+        parsed, removed = index.update(jobs=1)
+
+        assert (parsed, removed) == (3, 0)
+        assert _names(index) == [
+            (os.path.join("pkg", "ham.py"), "ham"),
+            ("spam.py", "Spam"),
+            ("spam.py", "eggs"),
+        ]
+        assert len(index) == 3
+
+    def test_only_changed_files_reparsed(self, tmpdir):
+        _write(tmpdir, "spam.py", "def spam(): pass\n")
+        _write(tmpdir, "ham.py", "def ham(): pass\n")
+        eggs = _write(tmpdir, "eggs.py", "def eggs(): pass\n")
+        cache = str(tmpdir.join(".vscode", ".symbolindex"))
+        index = symbolIndexer.SymbolIndex(str(tmpdir))
+        index.update(jobs=1)
+        index.save(cache)
+
+        _write(tmpdir, "spam.py", "def spam(): pass\ndef spam2(): pass\n")
+        eggs.remove()
+        index = symbolIndexer.SymbolIndex.load(str(tmpdir), cache)
+        parsed, removed = index.update(jobs=1)
+
+        assert (parsed, removed) == (1, 1)
+        assert _names(index) == [
+            ("ham.py", "ham"),
+            ("spam.py", "spam"),
+            ("spam.py", "spam2"),
+        ]
+
+    def test_refresh_relpaths_normalized(self, tmpdir):
+        _write(tmpdir, "spam.py", "def spam(): pass\n")
+        _write(tmpdir, "pkg/ham.py", "def ham(): pass\n")
+        eggs = _write(tmpdir, "eggs.py", "def eggs(): pass\n")
+        index = symbolIndexer.SymbolIndex(str(tmpdir))
+        index.update(jobs=1)
+
+        _write(tmpdir, "pkg/ham.py", "def ham(): pass\ndef ham2(): pass\n")
+        eggs.remove()
+        changed, removed = index.refresh(
+            jobs=1,
+            relpaths=[
+                os.path.join(".", "pkg", "..", "pkg", "ham.py"),
+                os.path.join("pkg", "ham.py"),
+                str(eggs),
+            ],
+        )
+
+        assert changed == [os.path.join("pkg", "ham.py")]
+        assert removed == ["eggs.py"]
+        assert sorted(index.files) == [os.path.join("pkg", "ham.py"), "spam.py"]
+        assert _names(index) == [
+            (os.path.join("pkg", "ham.py"), "ham"),
+            (os.path.join("pkg", "ham.py"), "ham2"),
+            ("spam.py", "spam"),
+        ]
+
+    def test_load_bad_cache(self, tmpdir):
+        cache = tmpdir.join("cache")
+        cache.write("not an index")
+
+        index = symbolIndexer.SymbolIndex.load(str(tmpdir), str(cache))
+
+        assert index.files == {}
+
+    def test_load_other_root(self, tmpdir):
+        _write(tmpdir, "spam.py", "def spam(): pass\n")
+        cache = str(tmpdir.join("cache"))
+        index = symbolIndexer.SymbolIndex(str(tmpdir))
+        index.update(jobs=1)
+        index.save(cache)
+
+        index = symbolIndexer.SymbolIndex.load(str(tmpdir.join("other")), cache)
+
+        assert index.files == {}
+
+    def test_parallel(self, tmpdir, monkeypatch):
+        monkeypatch.setattr(symbolIndexer, "PARALLEL_THRESHOLD", 2)
+        for i in range(4):
+            _write(tmpdir, "mod{}.py".format(i), "def func{}(): pass\n".format(i))
+        index = symbolIndexer.SymbolIndex(str(tmpdir))
+
+        index.update(jobs=2)
+
+        assert _names(index) == [
+            ("mod{}.py".format(i), "func{}".format(i)) for i in range(4)
+        ]
@@ -0,0 +1,462 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import io
+import json
+import sys
+import textwrap
+import time
+
+import pytest
+
+import symbolProvider
+
+
+SOURCE = textwrap.dedent(
+    """\
+    class Spam(object):
+        def eggs(self):
+            return 1
+
+    def ham():
+        pass
+    """
+)
+
+
+def _generate_source(lines):
+    chunks = []
+    count = 0
+    index = 0
+    while count < lines:
+        chunk = textwrap.dedent(
+            """\
+            CONSTANT_{0} = {0}
+
+
+            class Spam{0}(object):
+                attr = None
+
+                def eggs(self, value):
+                    if value:
+                        return [
+                            value,
+                        ]
+                    return None
+
+
+            def ham{0}():
+                for i in range(10):
+                    pass
+
+            """
+        ).format(index)
+        chunks.append(chunk)
+        count += chunk.count("\n")
+        index += 1
+    return "".join(chunks), index
+
+
+class TestSymbolProvider(object):
+    def test_flat(self):
+        symbols = symbolProvider.get_symbols(SOURCE)
+
+        assert symbols == {
+            "classes": [
+                {
+                    "namespace": "",
+                    "name": "Spam",
+                    "range": {
+                        "start": {"line": 0, "character": 0},
+                        "end": {"line": 2, "character": 16},
+                    },
+                }
+            ],
+            "methods": [
+                {
+                    "namespace": "Spam",
+                    "name": "eggs",
+                    "range": {
+                        "start": {"line": 1, "character": 4},
+                        "end": {"line": 2, "character": 16},
+                    },
+                }
+            ],
+            "functions": [
+                {
+                    "namespace": "",
+                    "name": "ham",
+                    "range": {
+                        "start": {"line": 4, "character": 0},
+                        "end": {"line": 5, "character": 8},
+                    },
+                }
+            ],
+        }
+
+    @pytest.mark.skipif(
+        sys.version_info < (3, 8), reason="end positions require Python 3.8+"
+    )
+    def test_exact_end_position(self):
+        src = textwrap.dedent(
+            """\
+            def spam():
+                return [
+                    1,
+                ]
+            """
+        )
+        symbols = symbolProvider.get_symbols(src)
+
+        end = symbols["functions"][0]["range"]["end"]
+        assert end == {"line": 3, "character": 5}
+
+    def test_tree(self):
+        src = textwrap.dedent(
+            """\
+            import os.path, sys as _sys
+            from spam import *
+            from eggs import ham
+
+            MAX = 10
+            a, (b, c) = 1, (2, 3)
+
+            try:
+                import json
+            except ImportError:
+                json = None
+
+            class Spam(object):
+                LIMIT = 5
+                name = "spam"
+
+                def eggs(self):
+                    local = 1
+
+                    def nested():
+                        pass
+
+            async def ham():
+                pass
+            """
+        )
+        tree = symbolProvider.get_symbol_tree(src)
+
+        def summarize(symbols):
+            return [(s["name"], s["kind"], summarize(s["children"])) for s in symbols]
+
+        assert summarize(tree) == [
+            ("os.path", "import", []),
+            ("_sys", "import", []),
+            ("ham", "import", []),
+            ("MAX", "constant", []),
+            ("a", "variable", []),
+            ("b", "variable", []),
+            ("c", "variable", []),
+            ("json", "import", []),
+            ("json", "variable", []),
+            (
+                "Spam",
+                "class",
+                [
+                    ("LIMIT", "constant", []),
+                    ("name", "variable", []),
+                    ("eggs", "method", [("nested", "function", [])]),
+                ],
+            ),
+            ("ham", "function", []),
+        ]
+        assert tree[0]["range"] == {
+            "start": {"line": 0, "character": 0},
+            "end": {"line": 0, "character": 27},
+        }
+
+    def test_benchmark_10k_lines(self):
+        src, count = _generate_source(10000)
+
+        start = time.time()
+        symbols = symbolProvider.get_symbols(src)
+        flat = time.time() - start
+        start = time.time()
+        tree = symbolProvider.get_symbol_tree(src)
+        nested = time.time() - start
+
+        assert len(symbols["classes"]) == count
+        assert len(symbols["methods"]) == count
+        assert len(symbols["functions"]) == count
+        assert len(tree) == count * 3
+        # Both are a single pass over the module, so even slow machines
+        # should be well within this.
+        assert flat < 5
+        assert nested < 5
+
+
+class TestIncrementalSymbols(object):
+    def _check(self, document, src):
+        document.update(src)
+        assert document.tree == symbolProvider.get_symbol_tree(src)
+        assert document.flat == symbolProvider.get_symbols(src)
+
+    def test_initial(self):
+        document = symbolProvider.IncrementalSymbols()
+
+        self._check(document, SOURCE)
+
+        assert document.last_parsed == (0, 6)
+
+    def test_edit_reparses_only_touched_block(self):
+        src, _ = _generate_source(1000)
+        lines = src.splitlines(True)
+        document = symbolProvider.IncrementalSymbols()
+        document.update(src)
+        index = lines.index("def ham10():\n")
+        lines.insert(index + 1, "    extra = 1\n")
+
+        self._check(document, "".join(lines))
+
+        start, end = document.last_parsed
+        assert start <= index < index + 2 <= end
+        assert end - start < 20
+
+    def test_insert_and_delete_blocks(self):
+        src, _ = _generate_source(200)
+        lines = src.splitlines(True)
+        document = symbolProvider.IncrementalSymbols()
+        document.update(src)
+
+        lines[20:20] = ["@decorator\n", "def added():\n", "    pass\n", "\n"]
+        self._check(document, "".join(lines))
+        del lines[0 : lines.index("class Spam1(object):\n")]
+        self._check(document, "".join(lines))
+        lines.append("NEW = 1\n")
+        self._check(document, "".join(lines))
+
+    def test_edit_joining_blocks(self):
+        document = symbolProvider.IncrementalSymbols()
+        self._check(document, "x = 1\ndef spam():\n    pass\ny = 2\n")
+
+        # "spam" now spans the line that used to be a separate statement.
+        self._check(document, "x = 1\ndef spam():\n    pass\n    y = 2\n")
+
+    def test_edit_joining_next_block(self):
+        document = symbolProvider.IncrementalSymbols()
+        self._check(document, "x = 1\ny = 2\ndef spam():\n    pass\n")
+
+        # Only the first line changed but "y" is no longer a statement.
+        self._check(document, "x = 1 + \\\ny == 2\ndef spam():\n    pass\n")
+
+    def test_syntax_error(self):
+        document = symbolProvider.IncrementalSymbols()
+        self._check(document, SOURCE)
+
+        with pytest.raises(SyntaxError):
+            document.update(SOURCE + "def (\n")
+        self._check(document, SOURCE + "def spam():\n    pass\n")
+
+    def test_unchanged(self):
+        document = symbolProvider.IncrementalSymbols()
+        self._check(document, SOURCE)
+
+        self._check(document, SOURCE)
+
+        assert document.last_parsed == (0, 0)
+
+
+def _summarize(symbols):
+    return [
+        (s["name"], s["kind"], s["range"]["start"]["line"], s["range"]["end"]["line"])
+        + ((_summarize(s["children"]),) if s["children"] else ())
+        for s in symbols
+    ]
+
+
+class TestRecoverSymbols(object):
+    def test_valid_code_matches_ast(self):
+        src, _ = _generate_source(500)
+
+        recovered = symbolProvider._flatten_tree(
+            symbolProvider.recover_symbol_tree(src)
+        )
+
+        assert recovered == symbolProvider.get_symbols(src)
+
+    def test_unclosed_bracket(self):
+        src = textwrap.dedent(
+            """\
+            class Spam(object):
+                def eggs(self):
+                    return foo(
+
+                def ham(self):
+                    pass
+
+            def bacon():
+                pass
+            """
+        )
+
+        tree = symbolProvider.get_symbol_tree(src)
+
+        assert _summarize(tree) == [
+            (
+                "Spam",
+                "class",
+                0,
+                5,
+                [("eggs", "method", 1, 2), ("ham", "method", 4, 5)],
+            ),
+            ("bacon", "function", 7, 8),
+        ]
+
+    def test_unterminated_string(self):
+        src = textwrap.dedent(
+            '''\
+            def spam():
+                """
+                return 1
+
+            def eggs():
+                pass
+            '''
+        )
+
+        tree = symbolProvider.get_symbol_tree(src)
+
+        assert [s["name"] for s in tree] == ["spam", "eggs"]
+
+    def test_bad_indentation(self):
+        src = textwrap.dedent(
+            """\
+            class Spam(object):
+                    def eggs(self):
+                        pass
+                  x = 1
+                def ham(self):
+                    pass
+            """
+        )
+
+        tree = symbolProvider.get_symbol_tree(src)
+
+        assert _summarize(tree) == [
+            (
+                "Spam",
+                "class",
+                0,
+                5,
+                [("eggs", "method", 1, 2), ("ham", "method", 4, 5)],
+            ),
+        ]
+
+    def test_incomplete_definitions(self):
+        src = "async def spam(\nclass \ndef eggs\n"
+
+        symbols = symbolProvider.get_symbols(src)
+
+        assert [s["name"] for s in symbols["functions"]] == ["spam", "eggs"]
+        assert symbols["classes"] == []
+
+    def test_benchmark_10k_lines(self):
+        src, count = _generate_source(10000)
+        src = src.replace("class Spam5(object):", "class Spam5(object:")
+
+        start = time.time()
+        symbols = symbolProvider.get_symbols(src)
+        elapsed = time.time() - start
+
+        assert len(symbols["classes"]) == count
+        assert len(symbols["functions"]) == count
+        assert elapsed < 5
+
+
+class TestSymbolProviderServer(object):
+    """Tests for the persistent (--server) mode."""
+
+    def _run(self, *requests):
+        stdin = io.StringIO("".join(json.dumps(r) + "\n" for r in requests))
+        stdout = io.StringIO()
+        symbolProvider.SymbolProviderServer(stdin, stdout).watch()
+        return [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+    def test_text(self):
+        responses = self._run({"id": 1, "path": "spam.py", "text": SOURCE})
+
+        assert responses == [{"id": 1, "results": symbolProvider.get_symbols(SOURCE)}]
+        results = responses[0]["results"]
+        assert [s["name"] for s in results["classes"]] == ["Spam"]
+        assert [s["name"] for s in results["methods"]] == ["eggs"]
+        assert [s["name"] for s in results["functions"]] == ["ham"]
+
+    def test_path_only(self, tmpdir):
+        filename = tmpdir.join("spam.py")
+        filename.write(SOURCE)
+
+        responses = self._run({"id": 1, "path": str(filename)})
+
+        assert responses == [{"id": 1, "results": symbolProvider.get_symbols(SOURCE)}]
+
+    def test_tree(self):
+        responses = self._run(
+            {"id": 1, "path": "spam.py", "text": SOURCE, "tree": True}
+        )
+
+        assert responses == [
+            {"id": 1, "results": symbolProvider.get_symbol_tree(SOURCE)}
+        ]
+
+    def test_incremental(self):
+        edited = SOURCE.replace("pass", "return 2")
+
+        responses = self._run(
+            {"id": 1, "path": "spam.py", "text": SOURCE, "incremental": True},
+            {"id": 2, "path": "spam.py", "text": edited, "incremental": True},
+            {
+                "id": 3,
+                "path": "spam.py",
+                "text": edited,
+                "incremental": True,
+                "tree": True,
+            },
+            {"id": 4, "path": "spam.py", "close": True},
+        )
+
+        assert responses == [
+            {"id": 1, "results": symbolProvider.get_symbols(SOURCE)},
+            {"id": 2, "results": symbolProvider.get_symbols(edited)},
+            {"id": 3, "results": symbolProvider.get_symbol_tree(edited)},
+            {"id": 4, "results": None},
+        ]
+
+    def test_syntax_error(self):
+        broken = SOURCE.replace("return 1", "return (")
+
+        responses = self._run(
+            {"id": 1, "path": "spam.py", "text": SOURCE, "incremental": True},
+            {"id": 2, "path": "spam.py", "text": broken, "incremental": True},
+            {"id": 3, "path": "spam.py", "text": broken},
+        )
+
+        assert responses[0] == {"id": 1, "results": symbolProvider.get_symbols(SOURCE)}
+        assert responses[1] == {"id": 2, "results": symbolProvider.get_symbols(broken)}
+        assert responses[2] == {"id": 3, "results": symbolProvider.get_symbols(broken)}
+        assert [s["name"] for s in responses[1]["results"]["methods"]] == ["eggs"]
+        assert [s["name"] for s in responses[1]["results"]["functions"]] == ["ham"]
+
+    def test_multiple_requests(self):
+        responses = self._run(
+            {"id": 1, "path": "spam.py", "text": SOURCE},
+            {"id": 2, "path": "eggs.py", "text": "def eggs():\n    pass\n"},
+        )
+
+        assert [r["id"] for r in responses] == [1, 2]
+        assert [s["name"] for s in responses[1]["results"]["functions"]] == ["eggs"]
+
+    def test_error_does_not_stop_server(self):
+        responses = self._run(
+            {"id": 1, "path": "missing.py"},
+            {"id": 2, "path": "spam.py", "text": SOURCE},
+        )
+
+        assert responses[0]["id"] == 1
+        assert "error" in responses[0]
+        assert responses[1] == {"id": 2, "results": symbolProvider.get_symbols(SOURCE)}
@@ -0,0 +1,238 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import io
+import json
+import random
+import time
+
+import symbolIndexer
+import symbolSearch
+
+
+def _symbol(name, kind="function", line=0):
+    return (kind, name, "", line, 0, line + 1, 8)
+
+
+def _build(files):
+    search = symbolSearch.SymbolSearch()
+    for relpath, names in files.items():
+        search.update_file(relpath, [_symbol(n, line=i) for i, n in enumerate(names)])
+    return search
+
+
+def _query(search, query, limit=symbolSearch.DEFAULT_LIMIT):
+    return [search.get_symbol(i)[1][1] for i in search.query(query, limit)]
+
+
+class TestSymbolSearch(object):
+    def test_ranking(self):
+        search = _build(
+            {
+                "spam.py": [
+                    "get_symbols",
+                    "getSymbolProvider",
+                    "symbol",
+                    "Symbol",
+                    "symbols_for_file",
+                    "parse_symbol",
+                    "system",
+                ]
+            }
+        )
+
+        names = _query(search, "symbol")
+
+        assert names == [
+            "symbol",
+            "Symbol",
+            "symbols_for_file",
+            "get_symbols",
+            "parse_symbol",
+            "getSymbolProvider",
+        ]
+
+    def test_camel_case(self):
+        search = _build(
+            {"spam.py": ["getSymbolProvider", "get_symbol_provider", "gsp_eggs"]}
+        )
+
+        assert _query(search, "getSP") == ["getSymbolProvider", "get_symbol_provider"]
+        assert _query(search, "gsp") == [
+            "gsp_eggs",
+            "getSymbolProvider",
+            "get_symbol_provider",
+        ]
+        assert _query(search, "getSymPro") == [
+            "getSymbolProvider",
+            "get_symbol_provider",
+        ]
+
+    def test_fuzzy(self):
+        search = _build({"spam.py": ["normalize_lines", "nomatch", "get_lines"]})
+
+        assert _query(search, "nrmlns") == ["normalize_lines"]
+        assert _query(search, "xyz") == []
+
+    def test_limit(self):
+        search = _build({"spam.py": ["spam{}".format(i) for i in range(50)]})
+
+        assert len(search.query("spam", 10)) == 10
+
+    def test_update_file(self):
+        search = _build({"spam.py": ["spam", "eggs"], "ham.py": ["ham"]})
+
+        search.update_file("spam.py", [_symbol("spam2"), _symbol("bacon")])
+        search.remove_file("ham.py")
+
+        assert len(search) == 2
+        assert _query(search, "spam") == ["spam2"]
+        assert _query(search, "eggs") == []
+        assert _query(search, "ham") == []
+        assert search.get_symbol(search.query("bacon")[0]) == (
+            "spam.py",
+            _symbol("bacon"),
+        )
+
+    def test_update_after_prepare(self):
+        search = _build({"spam.py": ["spam_eggs", "getSymbolProvider", "spammer"]})
+        search.prepare()
+
+        search.update_file(
+            "ham.py", [_symbol("spam"), _symbol("get_spam_provider"), _symbol("spa")]
+        )
+
+        assert search._indexed == 3
+        assert _query(search, "spa") == [
+            "spa",
+            "spam",
+            "spam_eggs",
+            "spammer",
+            "get_spam_provider",
+        ]
+        assert _query(search, "gsp") == ["getSymbolProvider", "get_spam_provider"]
+        assert _query(search, "gtspmpr") == ["get_spam_provider"]
+
+    def test_recent_names_merged(self, monkeypatch):
+        monkeypatch.setattr(symbolSearch, "MAX_RECENT_NAMES", 2)
+        search = _build({"spam.py": ["spam"]})
+        search.prepare()
+
+        search.update_file("eggs.py", [_symbol("eggs"), _symbol("ham")])
+        search.prepare()
+        indexed = search._indexed
+        search.update_file("bacon.py", [_symbol("bacon")])
+        search.prepare()
+
+        assert indexed == 1
+        assert search._indexed == 4
+        assert _query(search, "bacon") == ["bacon"]
+
+    def test_from_index(self, tmpdir):
+        tmpdir.join("spam.py").write("class Spam(object):\n    def eggs(self): pass\n")
+        index = symbolIndexer.SymbolIndex(str(tmpdir))
+        index.update(jobs=1)
+
+        search = symbolSearch.SymbolSearch.from_index(index)
+
+        assert search.get_symbol(search.query("eggs")[0]) == (
+            "spam.py",
+            ("method", "eggs", "Spam", 1, 4, 1, 24),
+        )
+
+    def test_benchmark_1m_symbols(self):
+        rand = random.Random(0)
+        letters = "abcdefghijklmnopqrstuvwxyz"
+        vocab = [
+            "".join(rand.choice(letters) for _ in range(rand.randint(3, 8)))
+            for _ in range(500)
+        ]
+        names = set()
+        while len(names) < 200000:
+            words = rand.sample(vocab, rand.randint(2, 3))
+            if rand.random() < 0.5:
+                names.add("_".join(words))
+            else:
+                names.add(words[0] + "".join(w.title() for w in words[1:]))
+        names = sorted(names)
+        search = symbolSearch.SymbolSearch()
+        for i in range(1000):
+            symbols = [
+                _symbol(names[(i * 1000 + j) % len(names)], line=j) for j in range(1000)
+            ]
+            search.update_file("mod{}.py".format(i), symbols)
+        search.prepare()
+        queries = [
+            names[100],
+            names[5][:4],
+            vocab[1] + vocab[2].title(),
+            vocab[3][:2] + vocab[7][:1],
+            vocab[9][1:5],
+            vocab[4][:2] + "zq",
+            "x",
+        ]
+
+        start = time.time()
+        for query in queries:
+            search.query(query)
+        elapsed = (time.time() - start) / len(queries)
+
+        # A query right after an edit adds new names must not have to
+        # rebuild the sorted views.
+        search.update_file(
+            "new.py", [_symbol("{}NewName{}".format(vocab[1], i)) for i in range(50)]
+        )
+        start = time.time()
+        found = _query(search, vocab[1] + "NewName7")
+        after_update = time.time() - start
+
+        assert len(search) == 1000050
+        assert elapsed < 0.5
+        assert found[0] == vocab[1] + "NewName7"
+        assert after_update < 0.1
+
+
+class TestSymbolSearchServer(object):
+    def _run(self, tmpdir, *requests):
+        tmpdir.join("spam.py").write("def spam(): pass\n")
+        index = symbolIndexer.SymbolIndex(str(tmpdir))
+        index.update(jobs=1)
+        stdin = io.StringIO("".join(json.dumps(r) + "\n" for r in requests))
+        stdout = io.StringIO()
+        server = symbolSearch.SymbolSearchServer(index, stdin=stdin, stdout=stdout)
+
+        def write(relpath, text):
+            tmpdir.join(relpath).write(text)
+
+        return server, stdout, write
+
+    def test_query(self, tmpdir):
+        server, stdout, _ = self._run(tmpdir, {"id": 1, "query": "spam"})
+
+        server.watch()
+
+        (response,) = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        assert response["id"] == 1
+        assert [r["name"] for r in response["results"]] == ["spam"]
+
+    def test_changed(self, tmpdir):
+        server, stdout, write = self._run(
+            tmpdir,
+            {"id": 1, "changed": ["spam.py", "eggs.py"]},
+            {"id": 2, "query": "eggs"},
+            {"id": 3, "query": "spam"},
+            {"id": 4, "bogus": True},
+        )
+        write("spam.py", "def spam_and_eggs(): pass\n")
+        write("eggs.py", "def eggs(): pass\n")
+
+        server.watch()
+
+        responses = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        assert responses[0] == {"id": 1, "results": {"parsed": 2, "removed": 0}}
+        assert [r["name"] for r in responses[1]["results"]] == [
+            "eggs",
+            "spam_and_eggs",
+        ]
+        assert [r["name"] for r in responses[2]["results"]] == ["spam_and_eggs"]
+        assert responses[3] == {"id": 4, "error": "unsupported request"}
@@ -38,6 +38,150 @@ class AddCLISubparserTests(unittest.TestCase):
             stub.calls,
             [
                 ("subparsers.add_parser", None, {"name": "pytest"}),
+                (
+                    "argparser.add_argument",
+                    ("--incremental",),
+                    {
+                        "action": "store_true",
+                        "help": "only collect the files that changed since the last run",
+                    },
+                ),
+                (
+                    "argparser.add_argument",
+                    ("--jobs",),
+                    {
+                        "type": int,
+                        "default": 1,
+                        "help": "the number of processes to collect the tests with",
+                    },
+                ),
+                (
+                    "argparser.add_argument",
+                    ("--timings",),
+                    {
+                        "action": "store_true",
+                        "help": "write the slowest collectors (and conftest.py imports) to stderr",
+                    },
+                ),
+                (
+                    "argparser.add_argument",
+                    ("--watch",),
+                    {
+                        "action": "store_true",
+                        "help": "keep running and report the tests again whenever files change",
+                    },
+                ),
+            ],
+        )
+
+    def test_run(self):
+        stub = Stub()
+        subparsers = StubSubparsers(stub)
+        parser = StubArgParser(stub)
+        subparsers.return_add_parser = parser
+
+        add_subparser("run", "pytest", subparsers)
+
+        self.assertEqual(
+            stub.calls,
+            [
+                ("subparsers.add_parser", None, {"name": "pytest"}),
+                (
+                    "argparser.add_argument",
+                    ("--port",),
+                    {
+                        "type": int,
+                        "help": "send the results to this local port instead of stdout",
+                    },
+                ),
+                (
+                    "argparser.add_argument",
+                    ("--durations-file",),
+                    {
+                        "dest": "durationsfile",
+                        "help": "record the duration of each test in this file",
+                    },
+                ),
+                (
+                    "argparser.add_argument",
+                    ("--coverage-db",),
+                    {
+                        "dest": "coveragedb",
+                        "help": "record the lines that each test runs in this SQLite file",
+                    },
+                ),
+            ],
+        )
+
+    def test_select(self):
+        stub = Stub()
+        subparsers = StubSubparsers(stub)
+        parser = StubArgParser(stub)
+        subparsers.return_add_parser = parser
+
+        add_subparser("select", "pytest", subparsers)
+
+        self.assertEqual(
+            stub.calls,
+            [
+                ("subparsers.add_parser", None, {"name": "pytest"}),
+                (
+                    "argparser.add_argument",
+                    ("--coverage-db",),
+                    {
+                        "dest": "coveragedb",
+                        "required": True,
+                        "help": "the lines recorded by the runner",
+                    },
+                ),
+                (
+                    "argparser.add_argument",
+                    ("--changed",),
+                    {
+                        "action": "append",
+                        "help": "a changed file, optionally with the lines (e.g. spam.py:10-12,20)",
+                    },
+                ),
+            ],
+        )
+
+    def test_shard(self):
+        stub = Stub()
+        subparsers = StubSubparsers(stub)
+        parser = StubArgParser(stub)
+        subparsers.return_add_parser = parser
+
+        add_subparser("shard", "pytest", subparsers)
+
+        self.assertEqual(
+            stub.calls,
+            [
+                ("subparsers.add_parser", None, {"name": "pytest"}),
+                (
+                    "argparser.add_argument",
+                    ("--shards",),
+                    {
+                        "type": int,
+                        "default": 1,
+                        "help": "the number of shards to split the tests into",
+                    },
+                ),
+                (
+                    "argparser.add_argument",
+                    ("--index",),
+                    {
+                        "type": int,
+                        "help": "only write the pytest args for this shard (0-based)",
+                    },
+                ),
+                (
+                    "argparser.add_argument",
+                    ("--durations-file",),
+                    {
+                        "dest": "durationsfile",
+                        "help": "the durations recorded by the runner",
+                    },
+                ),
             ],
         )
 
@@ -45,8 +189,6 @@ class AddCLISubparserTests(unittest.TestCase):
         subparsers = StubSubparsers(name=None)
         subparsers.return_add_parser = None
 
-        with self.assertRaises(UnsupportedCommandError):
-            add_subparser("run", "pytest", subparsers)
         with self.assertRaises(UnsupportedCommandError):
             add_subparser("debug", "pytest", subparsers)
         with self.assertRaises(UnsupportedCommandError):
@@ -56,6 +198,5 @@ class AddCLISubparserTests(unittest.TestCase):
             [
                 ("add_parser", None, {"name": "pytest"}),
                 ("add_parser", None, {"name": "pytest"}),
-                ("add_parser", None, {"name": "pytest"}),
             ],
         )
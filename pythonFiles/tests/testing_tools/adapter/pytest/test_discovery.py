@@ -21,6 +21,7 @@ from testing_tools.adapter.util import fix_path, fix_relpath, fix_fileid, PATH_J
 from testing_tools.adapter.info import TestInfo, TestPath, ParentInfo
 from testing_tools.adapter.pytest import _pytest_item as pytest_item
 from testing_tools.adapter.pytest._discovery import discover, TestCollector
+from testing_tools.adapter.pytest._timings import CollectionTimer
 
 # In Python 3.8 __len__ is called twice, which impacts some of the test assertions we do below.
 PYTHON_38_OR_LATER = sys.version_info[0] >= 3 and sys.version_info[1] >= 8
@@ -84,6 +85,21 @@ class StubDiscoveredTests(StubProxy):
     def add_test(self, test, parents):
         self.add_call("add_test", None, {"test": test, "parents": parents})
 
+    def add_parents(self, test, parents):
+        self.add_call("add_parents", None, {"test": test, "parents": parents})
+        return test, []
+
+
+class StubStream(StubProxy):
+    def __init__(self, stub=None):
+        super(StubStream, self).__init__(stub, "stream")
+
+    def add(self, test, parents):
+        self.add_call("add", (test.id, parents), None)
+
+    def remove(self, test):
+        self.add_call("remove", (test.id,), None)
+
 
 class FakeFunc(object):
     def __init__(self, name):
@@ -471,6 +487,35 @@ class DiscoverTests(unittest.TestCase):
                 sys.stdout = sys.__stdout__
         self.assertEqual(captured, pytest_stdout)
 
+    def test_timings(self):
+        stub = Stub()
+        pytest = StubPyTest(stub)
+        plugin = StubPlugin(stub)
+        plugin.discovered = []
+
+        sys.stderr = StringIO()
+        try:
+            discover([], timings=True, _pytest_main=pytest.main, _plugin=plugin)
+            captured = sys.stderr.getvalue()
+        finally:
+            sys.stderr = sys.__stderr__
+
+        plugins = stub.calls[0][2]["plugins"]
+        self.assertEqual(len(plugins), 2)
+        self.assertIs(plugins[0], plugin)
+        self.assertIsInstance(plugins[1], CollectionTimer)
+        self.assertEqual(
+            captured.splitlines(),
+            [
+                "slowest collectors (0.000s collecting, 0.000s importing conftest.py files):",
+                "  seconds   items  kind       id",
+            ],
+        )
+
+    def test_timings_with_jobs(self):
+        with self.assertRaises(ValueError):
+            discover([], jobs=2, timings=True)
+
 
 class CollectorTests(unittest.TestCase):
     def test_modifyitems(self):
@@ -783,6 +828,54 @@ class CollectorTests(unittest.TestCase):
             ],
         )
 
+    def test_streamed(self):
+        stub = Stub()
+        discovered = StubDiscoveredTests(stub)
+        stream = StubStream(stub)
+        session = StubPytestSession(stub)
+        testroot = fix_path("/a/b/c")
+        relfile = fix_path("x/test_eggs.py")
+        items = [
+            StubFunctionItem(
+                stub,
+                nodeid=relfile + "::" + name,
+                name=name,
+                location=(relfile, lineno, name),
+                fspath=PATH_JOIN(testroot, relfile),
+                function=FakeFunc(name),
+            )
+            for name, lineno in [("test_spam", 12), ("test_ham", 20)]
+        ]
+        collector = TestCollector(tests=discovered, stream=stream)
+
+        collector.pytest_itemcollected(items[0])
+        during = [call for call in stub.calls if call[0].startswith("stream.")]
+        collector.pytest_itemcollected(items[1])
+        # "test_ham" was deselected.
+        session.items = items[:1]
+        collector.pytest_collection_modifyitems(session, None, session.items)
+        collector.pytest_collection_finish(session)
+
+        calls = [
+            call
+            for call in stub.calls
+            if call[0].startswith(("stream.", "discovered."))
+        ]
+        self.assertEqual(
+            during, [("stream.add", ("./x/test_eggs.py::test_spam", []), None)]
+        )
+        self.assertEqual(
+            [call[0] for call in calls],
+            [
+                "discovered.add_parents",
+                "stream.add",
+                "discovered.add_parents",
+                "stream.add",
+                "stream.remove",
+            ],
+        )
+        self.assertEqual(calls[-1][1], ("./x/test_eggs.py::test_ham",))
+
     def test_doctest(self):
         stub = Stub()
         discovered = StubDiscoveredTests(stub)
@@ -0,0 +1,242 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+from __future__ import print_function, unicode_literals
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from ....util import Stub, StubProxy
+from testing_tools.adapter.impact import CoverageStore
+from testing_tools.adapter.pytest._run import run, CoverageRecorder, TestReporter
+
+
+class StubPyTest(StubProxy):
+    def __init__(self, stub=None):
+        super(StubPyTest, self).__init__(stub, "pytest")
+        self.return_main = 0
+
+    def main(self, args, plugins):
+        self.add_call("main", None, {"args": args, "plugins": plugins})
+        return self.return_main
+
+
+class StubPlugin(object):
+    counts = {"passed": 1}
+    durations = {"./test_spam.py::test_spam": 1.5}
+
+
+class StubConfig(object):
+    rootdir = "/a/b/c"
+
+
+class FakeReport(object):
+    def __init__(self, nodeid, when, outcome, duration=0.5, **attrs):
+        self.nodeid = nodeid
+        self.when = when
+        self.outcome = outcome
+        self.passed = outcome == "passed"
+        self.failed = outcome == "failed"
+        self.skipped = outcome == "skipped"
+        self.duration = duration
+        self.longrepr = None
+        self.longreprtext = ""
+        self.__dict__.update(attrs)
+
+
+##################################
+# tests
+
+
+class RunTests(unittest.TestCase):
+    def test_basic(self):
+        stub = Stub()
+        pytest = StubPyTest(stub)
+        plugin = StubPlugin()
+
+        result = run(["-x"], hidestdio=False, _pytest_main=pytest.main, _plugin=plugin)
+
+        self.assertEqual(result, (0, {"passed": 1}))
+        self.assertEqual(
+            stub.calls,
+            [
+                ("pytest.main", None, {"args": ["-x"], "plugins": [plugin]}),
+            ],
+        )
+
+    def test_tests_failed(self):
+        stub = Stub()
+        pytest = StubPyTest(stub)
+        pytest.return_main = 1
+
+        result = run(
+            [], hidestdio=False, _pytest_main=pytest.main, _plugin=StubPlugin()
+        )
+
+        self.assertEqual(result, (1, {"passed": 1}))
+
+    def test_durations_recorded(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        filename = os.path.join(tmpdir, "durations.json")
+        with open(filename, "w") as outfile:
+            json.dump({"./test_spam.py::test_eggs": 0.5}, outfile)
+        pytest = StubPyTest()
+
+        run(
+            [],
+            hidestdio=False,
+            durationsfile=filename,
+            _pytest_main=pytest.main,
+            _plugin=StubPlugin(),
+        )
+        with open(filename) as infile:
+            durations = json.load(infile)
+
+        self.assertEqual(
+            durations,
+            {"./test_spam.py::test_eggs": 0.5, "./test_spam.py::test_spam": 1.5},
+        )
+
+    def test_coverage_kept_on_error(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        filename = os.path.join(tmpdir, "coverage.db")
+        plugin = StubPlugin()
+        plugin.get_testid = lambda nodeid: "./" + nodeid
+
+        def pytest_main(args, plugins):
+            recorder = plugins[1]
+            recorder._store.record(
+                recorder._get_testid("test_spam.py::test_spam"), {"./spam.py": {1}}
+            )
+            raise RuntimeError("spam")
+
+        with self.assertRaises(RuntimeError):
+            run(
+                [],
+                hidestdio=False,
+                coveragedb=filename,
+                _pytest_main=pytest_main,
+                _plugin=plugin,
+            )
+        store = CoverageStore(filename)
+        self.addCleanup(store.close)
+
+        self.assertEqual(store.get_testids(), {"./test_spam.py::test_spam"})
+
+
+class TestReporterTests(unittest.TestCase):
+    def _run(self, *reports):
+        events = []
+        reporter = TestReporter(events.append)
+        reporter.pytest_configure(StubConfig())
+        for report in reports:
+            if report.when == "setup":
+                reporter.pytest_runtest_logstart(report.nodeid, None)
+            reporter.pytest_runtest_logreport(report)
+        return reporter, events
+
+    def test_outcomes(self):
+        nodeid = "test_spam.py::test_{}".format
+        reporter, events = self._run(
+            FakeReport(nodeid("passed"), "setup", "passed"),
+            FakeReport(nodeid("passed"), "call", "passed"),
+            FakeReport(nodeid("passed"), "teardown", "passed"),
+            FakeReport(nodeid("failed"), "setup", "passed"),
+            FakeReport(nodeid("failed"), "call", "failed", longreprtext="oops"),
+            FakeReport(nodeid("failed"), "teardown", "passed"),
+            FakeReport(
+                nodeid("skipped"),
+                "setup",
+                "skipped",
+                longrepr=("test_spam.py", 3, "Skipped: nope"),
+            ),
+            FakeReport(nodeid("skipped"), "teardown", "passed"),
+            FakeReport(nodeid("xfailed"), "setup", "passed"),
+            FakeReport(nodeid("xfailed"), "call", "skipped", wasxfail="known"),
+            FakeReport(nodeid("xfailed"), "teardown", "passed"),
+            FakeReport(nodeid("error"), "setup", "passed"),
+            FakeReport(nodeid("error"), "call", "passed"),
+            FakeReport(nodeid("error"), "teardown", "failed", longreprtext="bad"),
+        )
+
+        self.maxDiff = None
+        self.assertEqual(
+            [(e["type"], e["id"], e.get("outcome"), e.get("message")) for e in events],
+            [
+                ("start", "./test_spam.py::test_passed", None, None),
+                ("result", "./test_spam.py::test_passed", "passed", None),
+                ("start", "./test_spam.py::test_failed", None, None),
+                ("result", "./test_spam.py::test_failed", "failed", "oops"),
+                ("start", "./test_spam.py::test_skipped", None, None),
+                ("result", "./test_spam.py::test_skipped", "skipped", "Skipped: nope"),
+                ("start", "./test_spam.py::test_xfailed", None, None),
+                ("result", "./test_spam.py::test_xfailed", "xfailed", "known"),
+                ("start", "./test_spam.py::test_error", None, None),
+                ("result", "./test_spam.py::test_error", "error", "bad"),
+            ],
+        )
+        self.assertEqual(
+            reporter.counts,
+            {"passed": 1, "failed": 1, "skipped": 1, "xfailed": 1, "error": 1},
+        )
+
+    def test_duration(self):
+        _, events = self._run(
+            FakeReport("test_spam.py::test_spam", "setup", "passed", 0.25),
+            FakeReport("test_spam.py::test_spam", "call", "passed", 1.0),
+            FakeReport("test_spam.py::test_spam", "teardown", "passed", 0.5),
+        )
+
+        self.assertEqual(events[-1]["duration"], 1.75)
+
+    def test_durations(self):
+        reporter, _ = self._run(
+            FakeReport("test_spam.py::test_spam", "setup", "passed", 0.25),
+            FakeReport("test_spam.py::test_spam", "call", "passed", 1.0),
+            FakeReport("test_spam.py::test_spam", "teardown", "passed", 0.5),
+            FakeReport("test_spam.py::test_eggs", "setup", "passed", 0.25),
+            FakeReport("test_spam.py::test_eggs", "call", "failed", 0.5),
+            FakeReport("test_spam.py::test_eggs", "teardown", "passed", 0.25),
+        )
+
+        self.assertEqual(
+            reporter.durations,
+            {"./test_spam.py::test_spam": 1.75, "./test_spam.py::test_eggs": 1.0},
+        )
+
+
+class CoverageRecorderTests(unittest.TestCase):
+    def test_record(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        filename = os.path.join(tmpdir, "spam.py")
+        source = "def spam():\n    return 42\n"
+        with open(filename, "w") as outfile:
+            outfile.write(source)
+        namespace = {}
+        exec(compile(source, filename, "exec"), namespace)
+
+        class Config(object):
+            rootdir = tmpdir
+
+        class Item(object):
+            nodeid = "test_spam.py::test_spam"
+
+        store = CoverageStore(":memory:")
+        recorder = CoverageRecorder(store, lambda nodeid: "./" + nodeid)
+        recorder.pytest_configure(Config())
+        wrapper = recorder.pytest_runtest_protocol(Item(), None)
+        next(wrapper)
+        namespace["spam"]()
+        with self.assertRaises(StopIteration):
+            wrapper.send(None)
+
+        self.assertEqual(store.get_testids(), {"./test_spam.py::test_spam"})
+        self.assertEqual(
+            store.select("./spam.py", [(2, 2)]), {"./test_spam.py::test_spam"}
+        )
@@ -0,0 +1,147 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+from __future__ import print_function, unicode_literals
+
+import unittest
+
+from ....util import Stub, StubProxy
+from testing_tools.adapter.info import TestInfo, TestPath
+from testing_tools.adapter.pytest._select import select
+from testing_tools.adapter.util import fix_path
+
+
+class StubDiscover(StubProxy):
+    def __init__(self, stub=None):
+        super(StubDiscover, self).__init__(stub, "discover")
+        self.return_discover = ([], [])
+
+    def discover(self, pytestargs, hidestdio):
+        self.add_call("discover", (pytestargs, hidestdio))
+        return self.return_discover
+
+
+class StubStore(StubProxy):
+    def __init__(self, stub=None):
+        super(StubStore, self).__init__(stub, "store")
+        self.return_get_testids = set()
+        self.return_select = {}
+
+    def __call__(self, filename):
+        self.add_call("__init__", (filename,))
+        return self
+
+    def get_testids(self):
+        self.add_call("get_testids")
+        return self.return_get_testids
+
+    def select(self, fileid, ranges=None):
+        self.add_call("select", (fileid, ranges))
+        return self.return_select.get(fileid, set())
+
+    def close(self):
+        self.add_call("close")
+
+
+def _make_test(name):
+    return TestInfo(
+        id="./test_spam.py::" + name,
+        name=name,
+        path=TestPath(root=fix_path("/a/b/c"), relfile="./test_spam.py", func=name),
+        source="./test_spam.py:1",
+        markers=None,
+        parentid="./test_spam.py",
+    )
+
+
+class SelectTests(unittest.TestCase):
+    def test_basic(self):
+        stub = Stub()
+        discover = StubDiscover(stub)
+        store = StubStore(stub)
+        tests = [_make_test("test_one"), _make_test("test_two"), _make_test("test_new")]
+        discover.return_discover = ([], tests)
+        store.return_get_testids = {
+            "./test_spam.py::test_one",
+            "./test_spam.py::test_two",
+        }
+        store.return_select = {"./x/spam.py": {"./test_spam.py::test_two"}}
+
+        result = select(
+            ["spam"],
+            True,
+            coveragedb="coverage.db",
+            changed=[
+                fix_path("/a/b/c/x/spam.py:3-4"),
+                fix_path("/a/b/c/x/spam.py:10"),
+                fix_path("/a/b/c/x/eggs.py"),
+            ],
+            _discover=discover.discover,
+            _store=store,
+        )
+
+        self.assertEqual(
+            result,
+            (
+                tests,
+                {
+                    "tests": ["./test_spam.py::test_two", "./test_spam.py::test_new"],
+                    "args": [
+                        fix_path("/a/b/c/test_spam.py::test_two"),
+                        fix_path("/a/b/c/test_spam.py::test_new"),
+                    ],
+                    "unrecorded": 1,
+                },
+            ),
+        )
+        self.assertEqual(
+            sorted(stub.calls),
+            sorted(
+                [
+                    ("discover.discover", (["spam"], True), None),
+                    ("store.__init__", ("coverage.db",), None),
+                    ("store.get_testids", None, None),
+                    ("store.select", ("./x/spam.py", [(3, 4), (10, 10)]), None),
+                    ("store.select", ("./x/eggs.py", None), None),
+                    ("store.close", None, None),
+                ]
+            ),
+        )
+
+    def test_test_file_changed(self):
+        store = StubStore()
+        discover = StubDiscover()
+        tests = [_make_test("test_skipped")]
+        discover.return_discover = ([], tests)
+        # Recorded, but without any lines.
+        store.return_get_testids = {"./test_spam.py::test_skipped"}
+
+        _, selection = select(
+            ["spam"],
+            coveragedb="coverage.db",
+            changed=[fix_path("/a/b/c/test_spam.py:12")],
+            _discover=discover.discover,
+            _store=store,
+        )
+
+        self.assertEqual(selection["tests"], ["./test_spam.py::test_skipped"])
+        self.assertEqual(selection["unrecorded"], 0)
+
+    def test_whole_file(self):
+        store = StubStore()
+        discover = StubDiscover()
+        discover.return_discover = ([], [_make_test("test_one")])
+
+        select(
+            ["spam"],
+            coveragedb="coverage.db",
+            changed=[fix_path("/a/b/c/x/spam.py:3"), fix_path("/a/b/c/x/spam.py")],
+            _discover=discover.discover,
+            _store=store,
+        )
+
+        self.assertIn(("store.select", ("./x/spam.py", None), None), store.calls)
+
+    def test_missing_db(self):
+        with self.assertRaises(ValueError):
+            select(["spam"], changed=["spam.py"])
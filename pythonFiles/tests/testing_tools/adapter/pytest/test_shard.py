@@ -0,0 +1,83 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+from __future__ import print_function, unicode_literals
+
+import unittest
+
+from ....util import Stub, StubProxy
+from testing_tools.adapter.info import TestInfo, TestPath
+from testing_tools.adapter.pytest._shard import shard
+from testing_tools.adapter.util import fix_path
+
+
+class StubDiscover(StubProxy):
+    def __init__(self, stub=None):
+        super(StubDiscover, self).__init__(stub, "discover")
+        self.return_discover = ([], [])
+
+    def discover(self, pytestargs, hidestdio):
+        self.add_call("discover", (pytestargs, hidestdio))
+        return self.return_discover
+
+
+def _make_test(name):
+    return TestInfo(
+        id="./test_spam.py::" + name,
+        name=name,
+        path=TestPath(root=fix_path("/a/b/c"), relfile="./test_spam.py", func=name),
+        source="./test_spam.py:1",
+        markers=None,
+        parentid="./test_spam.py",
+    )
+
+
+class ShardTests(unittest.TestCase):
+    def test_basic(self):
+        stub = Stub()
+        discover = StubDiscover(stub)
+        tests = [_make_test("test_one"), _make_test("test_two")]
+        discover.return_discover = ([], tests)
+
+        result = shard(["spam"], True, shards=2, _discover=discover.discover)
+
+        self.assertEqual(
+            result,
+            (
+                tests,
+                [
+                    {
+                        "index": 0,
+                        "duration": 1.0,
+                        "estimated": 1,
+                        "tests": ["./test_spam.py::test_one"],
+                        "args": [fix_path("/a/b/c/test_spam.py::test_one")],
+                    },
+                    {
+                        "index": 1,
+                        "duration": 1.0,
+                        "estimated": 1,
+                        "tests": ["./test_spam.py::test_two"],
+                        "args": [fix_path("/a/b/c/test_spam.py::test_two")],
+                    },
+                ],
+            ),
+        )
+        self.assertEqual(stub.calls, [("discover.discover", (["spam"], True), None)])
+
+    def test_index(self):
+        discover = StubDiscover()
+        discover.return_discover = ([], [_make_test("test_one")])
+
+        _, shards = shard(["spam"], shards=3, index=2, _discover=discover.discover)
+
+        self.assertEqual(
+            shards,
+            [{"index": 2, "duration": 0.0, "estimated": 0, "tests": [], "args": []}],
+        )
+
+    def test_bad_index(self):
+        discover = StubDiscover()
+
+        with self.assertRaises(ValueError):
+            shard(["spam"], shards=2, index=2, _discover=discover.discover)
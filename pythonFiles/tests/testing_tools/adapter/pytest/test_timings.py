@@ -0,0 +1,195 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+from __future__ import print_function, unicode_literals
+
+import unittest
+
+from testing_tools.adapter.pytest._timings import CollectionTimer
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def time(self):
+        return self.now
+
+
+class FakeNode(object):
+    def __init__(self, nodeid, parent=None):
+        self.nodeid = nodeid
+        self.parent = parent
+
+    def listchain(self):
+        chain = []
+        node = self
+        while node is not None:
+            chain.insert(0, node)
+            node = node.parent
+        return chain
+
+
+class Session(FakeNode):
+    pass
+
+
+class Dir(FakeNode):
+    pass
+
+
+class Module(FakeNode):
+    pass
+
+
+class Function(FakeNode):
+    def __init__(self, nodeid, parent, fspath):
+        super(Function, self).__init__(nodeid, parent)
+        self.fspath = fspath
+
+
+class FakeReport(object):
+    def __init__(self, nodeid):
+        self.nodeid = nodeid
+
+
+class FakeConfig(object):
+    rootdir = "/a/b"
+
+
+class FakeSession(object):
+    def __init__(self, items):
+        self.items = items
+
+
+class FakeManager(object):
+    def __init__(self, clock):
+        self.clock = clock
+        self.imported = []
+
+    def _importconftest(self, conftestpath, importmode):
+        self.imported.append((conftestpath, importmode))
+        self.clock.now += 0.5
+        return conftestpath
+
+
+class CollectionTimerTests(unittest.TestCase):
+    def _collect(self, timer, clock, node, seconds, nested=()):
+        timer.pytest_collectstart(node)
+        clock.now += seconds
+        for func in nested:
+            func()
+        timer.pytest_collectreport(FakeReport(node.nodeid))
+
+    def test_timings(self):
+        clock = FakeClock()
+        manager = FakeManager(clock)
+        timer = CollectionTimer(_time=clock.time)
+        timer.pytest_plugin_registered(timer, manager)
+        timer.pytest_configure(FakeConfig())
+        importconftest = manager._importconftest
+
+        session = Session("")
+        tests = Dir("tests", session)
+        spam = Module("tests/test_spam.py", tests)
+        eggs = Module("tests/test_eggs.py", tests)
+        items = [
+            Function("tests/test_spam.py::test_one", spam, "/a/b/tests/test_spam.py"),
+            Function("tests/test_spam.py::test_two", spam, "/a/b/tests/test_spam.py"),
+            Function("tests/test_eggs.py::test_one", eggs, "/a/b/tests/test_eggs.py"),
+        ]
+
+        importconftest("/a/b/conftest.py", "prepend")
+        self._collect(
+            timer,
+            clock,
+            session,
+            0.25,
+            [
+                # Newer versions of pytest collect the directories on the
+                # way to the given args while collecting the session.
+                lambda: self._collect(
+                    timer,
+                    clock,
+                    tests,
+                    1.0,
+                    [lambda: importconftest("/a/b/tests/conftest.py", "prepend")],
+                ),
+            ],
+        )
+        self._collect(timer, clock, spam, 3.0)
+        self._collect(timer, clock, eggs, 2.0)
+        # The same conftest.py is not counted twice.
+        importconftest("/a/b/conftest.py", "prepend")
+        timer.pytest_collection_finish(FakeSession(items))
+        timings = timer.get_timings()
+
+        self.assertEqual(
+            timings,
+            [
+                (3.0, "module", "./tests/test_spam.py", 2),
+                (2.0, "module", "./tests/test_eggs.py", 1),
+                (1.0, "dir", "./tests", 3),
+                (0.5, "conftest", "./conftest.py", 3),
+                (0.5, "conftest", "./tests/conftest.py", 3),
+                (0.25, "session", ".", 3),
+            ],
+        )
+        self.assertEqual(
+            manager.imported,
+            [
+                ("/a/b/conftest.py", "prepend"),
+                ("/a/b/tests/conftest.py", "prepend"),
+                ("/a/b/conftest.py", "prepend"),
+            ],
+        )
+
+    def test_failed_collector(self):
+        clock = FakeClock()
+        timer = CollectionTimer(_time=clock.time)
+        session = Session("")
+        spam = Module("test_spam.py", session)
+
+        timer.pytest_collectstart(session)
+        clock.now += 1.0
+        timer.pytest_collectstart(spam)
+        clock.now += 2.0
+        # There is no report for test_spam.py.
+        timer.pytest_collectreport(FakeReport(""))
+        timer.pytest_collectreport(FakeReport("test_spam.py"))
+        timings = timer.get_timings()
+
+        self.assertEqual(timings, [(3.0, "session", ".", 0)])
+
+    def test_format_table(self):
+        clock = FakeClock()
+        timer = CollectionTimer(_time=clock.time)
+        timer.pytest_plugin_registered(timer, FakeManager(clock))
+        timer.pytest_configure(FakeConfig())
+        session = Session("")
+        modules = [Module("test_{}.py".format(i), session) for i in range(3)]
+
+        for index, module in enumerate(modules):
+            self._collect(timer, clock, module, 0.125 * (index + 1))
+        timer.pytest_collection_finish(
+            FakeSession([Function("test_2.py::test_it", modules[2], "/a/b/test_2.py")])
+        )
+        lines = timer.format_table(limit=2)
+
+        self.assertEqual(
+            lines,
+            [
+                "slowest collectors (0.750s collecting, 0.000s importing conftest.py files):",
+                "  seconds   items  kind       id",
+                "    0.375       1  module     ./test_2.py",
+                "    0.250       0  module     ./test_1.py",
+            ],
+        )
+
+    def test_no_importconftest(self):
+        timer = CollectionTimer()
+
+        timer.pytest_plugin_registered(timer, object())
+        lines = timer.format_table()
+
+        self.assertEqual(len(lines), 2)
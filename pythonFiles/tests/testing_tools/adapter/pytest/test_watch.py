@@ -0,0 +1,191 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+from __future__ import print_function, unicode_literals
+
+import unittest
+
+from ....util import Stub, StubProxy
+from testing_tools.adapter.info import TestInfo, TestPath
+from testing_tools.adapter.pytest._watch import watch
+from testing_tools.adapter.util import fix_path
+
+
+class Stopped(Exception):
+    pass
+
+
+class StubDiscover(StubProxy):
+    def __init__(self, stub=None):
+        super(StubDiscover, self).__init__(stub, "discover")
+        self.results = []
+
+    def discover(self, pytestargs, hidestdio, incremental=False, refresh=False):
+        self.add_call(
+            "discover",
+            (pytestargs, hidestdio),
+            {"incremental": incremental, "refresh": refresh},
+        )
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+class StubWatcher(StubProxy):
+    def __init__(self, stub=None):
+        super(StubWatcher, self).__init__(stub, "watcher")
+        self.changes = []
+
+    def wait(self):
+        self.add_call("wait")
+        if not self.changes:
+            raise Stopped
+        return self.changes.pop(0)
+
+    def close(self):
+        self.add_call("close")
+
+
+def _make_tests(*names):
+    return [
+        TestInfo(
+            id="./test_spam.py::" + name,
+            name=name,
+            path=TestPath(root=fix_path("/a/b/c"), relfile="./test_spam.py", func=name),
+            source="./test_spam.py:1",
+            markers=None,
+            parentid="./test_spam.py",
+        )
+        for name in names
+    ]
+
+
+class WatchTests(unittest.TestCase):
+    def _watch(self, stub, discover, watcher, **kwargs):
+        def report(parents, tests):
+            stub.add_call("report", (parents, tests))
+
+        def get_watcher(root):
+            stub.add_call("get_watcher", (root,))
+            return watcher
+
+        def forget_modules(changed):
+            stub.add_call("forget_modules", (sorted(changed),))
+
+        with self.assertRaises(Stopped):
+            watch(
+                ["spam"],
+                report,
+                _discover=discover.discover,
+                _get_watcher=get_watcher,
+                _forget_modules=forget_modules,
+                _cwd=lambda: fix_path("/a/b/c"),
+                **kwargs
+            )
+
+    def test_basic(self):
+        stub = Stub()
+        discover = StubDiscover(stub)
+        tests1 = _make_tests("test_one")
+        tests2 = _make_tests("test_one", "test_two")
+        discover.results = [("parents1", tests1), ("parents2", tests2)]
+        watcher = StubWatcher(stub)
+        # An empty set means nothing changed (yet).
+        watcher.changes = [set(), {fix_path("/a/b/c/test_spam.py")}]
+
+        self._watch(stub, discover, watcher, hidestdio=True)
+
+        self.assertEqual(
+            stub.calls,
+            [
+                ("get_watcher", (fix_path("/a/b/c"),), None),
+                (
+                    "discover.discover",
+                    (["spam"], True),
+                    {"incremental": True, "refresh": False},
+                ),
+                ("report", ("parents1", tests1), None),
+                ("watcher.wait", None, None),
+                ("watcher.wait", None, None),
+                ("forget_modules", ([fix_path("/a/b/c/test_spam.py")],), None),
+                (
+                    "discover.discover",
+                    (["spam"], True),
+                    {"incremental": True, "refresh": False},
+                ),
+                ("report", ("parents2", tests2), None),
+                ("watcher.wait", None, None),
+                ("watcher.close", None, None),
+            ],
+        )
+
+    def test_other_module_changed(self):
+        stub = Stub()
+        discover = StubDiscover(stub)
+        tests = _make_tests("test_one")
+        discover.results = [("parents", tests)] * 4
+        watcher = StubWatcher(stub)
+        # A helper that the (cached) test file may import, then files
+        # that the cache already handles.
+        watcher.changes = [
+            {fix_path("/a/b/c/helpers.py")},
+            {fix_path("/a/b/c/conftest.py"), fix_path("/a/b/c/pytest.ini")},
+            {fix_path("/a/b/c/test_spam.py")},
+        ]
+
+        self._watch(stub, discover, watcher)
+
+        self.assertEqual(
+            [
+                kwargs["refresh"]
+                for name, _, kwargs in stub.calls
+                if name == "discover.discover"
+            ],
+            [False, True, False, False],
+        )
+        # The test modules are imported again too.
+        self.assertIn(
+            (
+                "forget_modules",
+                (
+                    sorted(
+                        [fix_path("/a/b/c/helpers.py"), fix_path("/a/b/c/test_spam.py")]
+                    ),
+                ),
+                None,
+            ),
+            stub.calls,
+        )
+
+    def test_discovery_failed(self):
+        stub = Stub()
+        discover = StubDiscover(stub)
+        discover.results = [Exception("pytest discovery failed"), ("parents", [])]
+        watcher = StubWatcher(stub)
+        watcher.changes = [{fix_path("/a/b/c/test_spam.py")}]
+
+        self._watch(stub, discover, watcher)
+
+        self.assertEqual(
+            [name for name, _, _ in stub.calls],
+            [
+                "get_watcher",
+                "discover.discover",
+                # Nothing is reported until the problem is fixed.
+                "watcher.wait",
+                "forget_modules",
+                "discover.discover",
+                "report",
+                "watcher.wait",
+                "watcher.close",
+            ],
+        )
+
+    def test_unsupported(self):
+        stub = Stub()
+        with self.assertRaises(ValueError):
+            watch([], None, jobs=2, _get_watcher=lambda root: StubWatcher(stub))
+        with self.assertRaises(ValueError):
+            watch([], None, format="ndjson", _get_watcher=lambda r: StubWatcher(stub))
+        self.assertEqual(stub.calls, [])
@@ -23,6 +23,11 @@ class StubTool(StubProxy):
             raise NotImplementedError
         return self.return_discover
 
+    def watch(self, args, report, **kwargs):
+        self.add_call("watch", (args,), kwargs)
+        for parents, tests in self.return_watch:
+            report(parents, tests)
+
 
 class StubReporter(StubProxy):
     def __init__(self, stub=None):
@@ -38,8 +43,6 @@ class StubReporter(StubProxy):
 
 class ParseGeneralTests(unittest.TestCase):
     def test_unsupported_command(self):
-        with self.assertRaises(SystemExit):
-            parse_args(["run", "pytest"])
         with self.assertRaises(SystemExit):
             parse_args(["debug", "pytest"])
         with self.assertRaises(SystemExit):
@@ -57,7 +60,21 @@ class ParseDiscoverTests(unittest.TestCase):
 
         self.assertEqual(tool, "pytest")
         self.assertEqual(cmd, "discover")
-        self.assertEqual(args, {"pretty": False, "hidestdio": True, "simple": False})
+        self.assertEqual(
+            args,
+            {
+                "pretty": False,
+                "hidestdio": True,
+                "fullstdio": False,
+                "simple": False,
+                "format": "json",
+                "incremental": False,
+                "jobs": 1,
+                "timings": False,
+                "watch": False,
+                "snapshot": None,
+            },
+        )
         self.assertEqual(toolargs, [])
 
     def test_pytest_full(self):
@@ -78,7 +95,21 @@ class ParseDiscoverTests(unittest.TestCase):
 
         self.assertEqual(tool, "pytest")
         self.assertEqual(cmd, "discover")
-        self.assertEqual(args, {"pretty": False, "hidestdio": True, "simple": False})
+        self.assertEqual(
+            args,
+            {
+                "pretty": False,
+                "hidestdio": True,
+                "fullstdio": False,
+                "simple": False,
+                "format": "json",
+                "incremental": False,
+                "jobs": 1,
+                "timings": False,
+                "watch": False,
+                "snapshot": None,
+            },
+        )
         self.assertEqual(
             toolargs,
             [
@@ -98,24 +129,208 @@ class ParseDiscoverTests(unittest.TestCase):
                 "pytest",
                 "--simple",
                 "--no-hide-stdio",
+                "--full-stdio",
                 "--pretty",
+                "--format",
+                "ndjson",
+                "--incremental",
+                "--jobs",
+                "4",
+                "--timings",
+                "--watch",
+                "--snapshot",
+                "tests.snapshot",
             ]
         )
 
         self.assertEqual(tool, "pytest")
         self.assertEqual(cmd, "discover")
-        self.assertEqual(args, {"pretty": True, "hidestdio": False, "simple": True})
+        self.assertEqual(
+            args,
+            {
+                "pretty": True,
+                "hidestdio": False,
+                "fullstdio": True,
+                "simple": True,
+                "format": "ndjson",
+                "incremental": True,
+                "jobs": 4,
+                "timings": True,
+                "watch": True,
+                "snapshot": "tests.snapshot",
+            },
+        )
         self.assertEqual(toolargs, [])
 
+    def test_unittest_default(self):
+        tool, cmd, args, toolargs = parse_args(
+            ["discover", "unittest", "--", "-s", "tests", "-p", "*_test.py"]
+        )
+
+        self.assertEqual(tool, "unittest")
+        self.assertEqual(cmd, "discover")
+        self.assertEqual(
+            args,
+            {
+                "pretty": False,
+                "hidestdio": True,
+                "fullstdio": False,
+                "simple": False,
+                "format": "json",
+                "snapshot": None,
+            },
+        )
+        self.assertEqual(toolargs, ["-s", "tests", "-p", "*_test.py"])
+
     def test_unsupported_tool(self):
-        with self.assertRaises(SystemExit):
-            parse_args(["discover", "unittest"])
         with self.assertRaises(SystemExit):
             parse_args(["discover", "nose"])
         with self.assertRaises(SystemExit):
             parse_args(["discover", "???"])
 
 
+class ParseRunTests(unittest.TestCase):
+    def test_pytest_default(self):
+        tool, cmd, args, toolargs = parse_args(["run", "pytest", "--", "-x"])
+
+        self.assertEqual(tool, "pytest")
+        self.assertEqual(cmd, "run")
+        self.assertEqual(
+            args,
+            {
+                "hidestdio": True,
+                "fullstdio": False,
+                "port": None,
+                "durationsfile": None,
+                "coveragedb": None,
+            },
+        )
+        self.assertEqual(toolargs, ["-x"])
+
+    def test_pytest_opts(self):
+        tool, cmd, args, toolargs = parse_args(
+            [
+                "run",
+                "pytest",
+                "--no-hide-stdio",
+                "--full-stdio",
+                "--port",
+                "4567",
+                "--durations-file",
+                "durations.json",
+                "--coverage-db",
+                "coverage.db",
+            ]
+        )
+
+        self.assertEqual(tool, "pytest")
+        self.assertEqual(cmd, "run")
+        self.assertEqual(
+            args,
+            {
+                "hidestdio": False,
+                "fullstdio": True,
+                "port": 4567,
+                "durationsfile": "durations.json",
+                "coveragedb": "coverage.db",
+            },
+        )
+        self.assertEqual(toolargs, [])
+
+    def test_unsupported_tool(self):
+        with self.assertRaises(SystemExit):
+            parse_args(["run", "unittest"])
+
+
+class ParseShardTests(unittest.TestCase):
+    def test_pytest_default(self):
+        tool, cmd, args, toolargs = parse_args(["shard", "pytest", "--", "tests"])
+
+        self.assertEqual(tool, "pytest")
+        self.assertEqual(cmd, "shard")
+        self.assertEqual(
+            args,
+            {
+                "hidestdio": True,
+                "pretty": False,
+                "shards": 1,
+                "index": None,
+                "durationsfile": None,
+            },
+        )
+        self.assertEqual(toolargs, ["tests"])
+
+    def test_pytest_opts(self):
+        tool, cmd, args, toolargs = parse_args(
+            [
+                "shard",
+                "pytest",
+                "--no-hide-stdio",
+                "--pretty",
+                "--shards",
+                "4",
+                "--index",
+                "2",
+                "--durations-file",
+                "durations.json",
+            ]
+        )
+
+        self.assertEqual(tool, "pytest")
+        self.assertEqual(cmd, "shard")
+        self.assertEqual(
+            args,
+            {
+                "hidestdio": False,
+                "pretty": True,
+                "shards": 4,
+                "index": 2,
+                "durationsfile": "durations.json",
+            },
+        )
+        self.assertEqual(toolargs, [])
+
+    def test_unsupported_tool(self):
+        with self.assertRaises(SystemExit):
+            parse_args(["shard", "unittest"])
+
+
+class ParseSelectTests(unittest.TestCase):
+    def test_pytest(self):
+        tool, cmd, args, toolargs = parse_args(
+            [
+                "select",
+                "pytest",
+                "--pretty",
+                "--coverage-db",
+                "coverage.db",
+                "--changed",
+                "spam.py:1-3",
+                "--changed",
+                "eggs.py",
+                "--",
+                "tests",
+            ]
+        )
+
+        self.assertEqual(tool, "pytest")
+        self.assertEqual(cmd, "select")
+        self.assertEqual(
+            args,
+            {
+                "hidestdio": True,
+                "pretty": True,
+                "coveragedb": "coverage.db",
+                "changed": ["spam.py:1-3", "eggs.py"],
+            },
+        )
+        self.assertEqual(toolargs, ["tests"])
+
+    def test_missing_db(self):
+        with self.assertRaises(SystemExit):
+            parse_args(["select", "pytest", "--changed", "spam.py"])
+
+
 class MainTests(unittest.TestCase):
 
     # TODO: We could use an integration test for pytest.discover().
@@ -149,6 +364,62 @@ class MainTests(unittest.TestCase):
             ],
         )
 
+    def test_discover_watch(self):
+        stub = Stub()
+        tool = StubTool("spamspamspam", stub)
+        first, second = (object(), object()), (object(), object())
+        tool.return_watch = [first, second]
+        reporter = StubReporter(stub)
+        main(
+            tool.name,
+            "discover",
+            {"spam": "eggs", "pretty": True, "watch": True},
+            [],
+            _tools={
+                tool.name: {
+                    "discover": tool.discover,
+                    "_watch": tool.watch,
+                }
+            },
+            _reporters={
+                "discover": reporter.report,
+            },
+        )
+
+        self.assertEqual(
+            tool.calls,
+            [
+                (
+                    "spamspamspam.watch",
+                    ([],),
+                    {"spam": "eggs", "pretty": True, "watch": True},
+                ),
+                (
+                    "reporter.report",
+                    (first[1], first[0]),
+                    {"spam": "eggs", "pretty": False, "watch": True},
+                ),
+                (
+                    "reporter.report",
+                    (second[1], second[0]),
+                    {"spam": "eggs", "pretty": False, "watch": True},
+                ),
+            ],
+        )
+
+    def test_discover_watch_unsupported(self):
+        tool = StubTool("unittest")
+        with self.assertRaises(UnsupportedCommandError):
+            main(
+                "unittest",
+                "discover",
+                {"watch": True},
+                [],
+                _tools={"unittest": {"discover": tool.discover}},
+                _reporters={"discover": None},
+            )
+        self.assertEqual(tool.calls, [])
+
     def test_unsupported_tool(self):
         with self.assertRaises(UnsupportedToolError):
             main(
@@ -0,0 +1,230 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+from __future__ import absolute_import
+
+import json
+import shutil
+import tempfile
+import unittest
+
+from testing_tools.adapter import compact
+from testing_tools.adapter.info import ParentInfo, TestInfo, TestPath
+from testing_tools.adapter.util import PATH_JOIN, fix_path
+
+
+def _get_discovered(names=("spam", "eggs", "ham")):
+    testroot = fix_path("/a/b/c")
+    relfile = fix_path("./x/test_spam.py")
+    tests = [
+        TestInfo(
+            id="./x/test_spam.py::test_" + name,
+            name="test_" + name,
+            path=TestPath(root=testroot, relfile=relfile, func="test_" + name),
+            source="{}:{}".format(relfile, 10 + i),
+            markers=["skip"] if name == "ham" else [],
+            parentid="./x/test_spam.py",
+        )
+        for i, name in enumerate(names)
+    ]
+    parents = [
+        ParentInfo(id=".", kind="folder", name=testroot),
+        ParentInfo(
+            id="./x",
+            kind="folder",
+            name="x",
+            root=testroot,
+            relpath=fix_path("./x"),
+            parentid=".",
+        ),
+        ParentInfo(
+            id="./x/test_spam.py",
+            kind="file",
+            name="test_spam.py",
+            root=testroot,
+            relpath=relfile,
+            parentid="./x",
+        ),
+    ]
+    return tests, parents
+
+
+def _reload(payload):
+    # What the client (or the snapshot file) sees.
+    return json.loads(json.dumps(payload))
+
+
+def _sorted_tests(data):
+    for root in data:
+        root["tests"].sort(key=lambda test: test["id"])
+    return data
+
+
+class EncodeTests(unittest.TestCase):
+    def test_round_trip(self):
+        tests, parents = _get_discovered()
+        testroot = fix_path("/a/b/c")
+
+        payload = _reload(compact.encode(tests, parents))
+        data = compact.decode(payload)
+
+        self.maxDiff = None
+        self.assertEqual(payload["format"], "compact")
+        self.assertEqual(
+            data,
+            [
+                {
+                    "rootid": ".",
+                    "root": testroot,
+                    "parents": [
+                        {
+                            "id": "./x",
+                            "kind": "folder",
+                            "name": "x",
+                            "relpath": fix_path("./x"),
+                            "parentid": ".",
+                        },
+                        {
+                            "id": "./x/test_spam.py",
+                            "kind": "file",
+                            "name": "test_spam.py",
+                            "relpath": fix_path("./x/test_spam.py"),
+                            "parentid": "./x",
+                        },
+                    ],
+                    "tests": [
+                        {
+                            "id": "./x/test_spam.py::test_" + name,
+                            "name": "test_" + name,
+                            "source": "{}:{}".format(
+                                fix_path("./x/test_spam.py"), lineno
+                            ),
+                            "markers": markers,
+                            "parentid": "./x/test_spam.py",
+                        }
+                        for name, lineno, markers in [
+                            ("spam", 10, []),
+                            ("eggs", 11, []),
+                            ("ham", 12, ["skip"]),
+                        ]
+                    ],
+                }
+            ],
+        )
+
+    def test_strings_not_repeated(self):
+        tests, parents = _get_discovered()
+
+        payload = compact.encode(tests, parents)
+
+        strings = payload["strings"]
+        self.assertEqual(len(strings), len(set(strings)))
+        self.assertEqual(strings.count("./x/test_spam.py"), 1)
+
+    def test_id_without_parent_prefix(self):
+        tests, parents = _get_discovered(["spam"])
+        tests[0] = tests[0]._replace(id="spam-eggs")
+
+        payload = _reload(compact.encode(tests, parents))
+        data = compact.decode(payload)
+
+        self.assertLess(payload["tests"][0][2], 0)
+        self.assertEqual(data[0]["tests"][0]["id"], "spam-eggs")
+
+    def test_same_id(self):
+        tests, parents = _get_discovered()
+
+        first = compact.encode(tests, parents)
+        second = compact.encode(tests, parents)
+        changed = compact.encode(tests[:-1], parents)
+
+        self.assertEqual(first["id"], second["id"])
+        self.assertNotEqual(first["id"], changed["id"])
+
+
+class DiffTests(unittest.TestCase):
+    def test_no_previous(self):
+        tests, parents = _get_discovered()
+
+        delta, payload = compact.diff(None, tests, parents)
+
+        self.assertIs(delta, payload)
+        self.assertEqual(payload["format"], "compact")
+
+    def test_unchanged(self):
+        tests, parents = _get_discovered()
+        previous = _reload(compact.encode(tests, parents))
+
+        delta, payload = compact.diff(previous, tests, parents)
+
+        self.assertEqual(delta["format"], "compact-delta")
+        self.assertEqual(delta["base"], previous["id"])
+        self.assertEqual(delta["id"], previous["id"])
+        self.assertEqual(delta["strings"], [])
+        self.assertEqual(delta["parents"], [])
+        self.assertEqual(delta["tests"], [])
+        self.assertEqual(delta["removedParents"], [])
+        self.assertEqual(delta["removedTests"], [])
+
+    def test_changed(self):
+        tests, parents = _get_discovered(["spam", "eggs", "ham"])
+        previous = _reload(compact.encode(tests, parents))
+        tests, parents = _get_discovered(["spam", "ham", "bacon"])
+
+        delta, payload = compact.diff(previous, tests, parents)
+        applied = compact.apply_delta(previous, _reload(delta))
+
+        self.assertEqual(delta["strings"], ["::test_bacon", "test_bacon"])
+        # "ham" moved to another line and "bacon" is new.
+        self.assertEqual(len(delta["tests"]), 2)
+        self.assertEqual(len(delta["removedTests"]), 1)
+        self.assertEqual(applied["id"], payload["id"])
+        self.assertEqual(
+            _sorted_tests(compact.decode(applied)),
+            _sorted_tests(compact.decode(_reload(payload))),
+        )
+
+    def test_too_many_unused_strings(self):
+        tests, parents = _get_discovered(["spam", "eggs", "ham"])
+        previous = _reload(compact.encode(tests, parents))
+        previous["strings"].extend("unused{}".format(i) for i in range(20))
+        previous["id"] = "spam"
+
+        delta, payload = compact.diff(previous, tests, parents)
+
+        self.assertIs(delta, payload)
+        self.assertNotIn("unused0", payload["strings"])
+
+    def test_wrong_base(self):
+        tests, parents = _get_discovered()
+        previous = _reload(compact.encode(tests, parents))
+        delta, _ = compact.diff(previous, tests, parents)
+        previous["id"] = "spam"
+
+        with self.assertRaises(ValueError):
+            compact.apply_delta(previous, delta)
+
+
+class SnapshotTests(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.filename = PATH_JOIN(self.tmpdir, "tests.snapshot")
+
+    def test_missing(self):
+        self.assertIsNone(compact.load_snapshot(self.filename))
+
+    def test_corrupt(self):
+        with open(self.filename, "w") as outfile:
+            outfile.write('{"format": ')
+
+        self.assertIsNone(compact.load_snapshot(self.filename))
+
+    def test_saved(self):
+        tests, parents = _get_discovered()
+        payload = compact.encode(tests, parents)
+
+        compact.save_snapshot(self.filename, payload)
+        compact.save_snapshot(self.filename, payload)
+
+        self.assertEqual(compact.load_snapshot(self.filename), _reload(payload))
@@ -292,6 +292,166 @@ class DiscoveredTestsTests(unittest.TestCase):
             ),
         )
 
+    def test_parents_cached(self):
+        testroot = fix_path("/a/b/c")
+        tests = [
+            TestInfo(
+                id="./test_{}.py::test_spam".format(name),
+                name="test_spam",
+                path=TestPath(
+                    root=testroot,
+                    relfile=fix_path("./test_{}.py".format(name)),
+                    func="test_spam",
+                ),
+                source=fix_path("./test_{}.py:2".format(name)),
+                markers=[],
+                parentid="./test_{}.py".format(name),
+            )
+            for name in ["spam", "eggs"]
+        ]
+        discovered = DiscoveredTests()
+        discovered.add_test(
+            tests[0],
+            [("./test_spam.py", "test_spam.py", "file"), (".", testroot, "folder")],
+        )
+
+        first = discovered.parents
+        second = discovered.parents
+        discovered.add_test(
+            tests[1],
+            [("./test_eggs.py", "test_eggs.py", "file"), (".", testroot, "folder")],
+        )
+        third = discovered.parents
+
+        self.assertIs(second, first)
+        self.assertEqual([p.id for p in first], [".", "./test_spam.py"])
+        self.assertEqual(
+            [p.id for p in third], [".", "./test_eggs.py", "./test_spam.py"]
+        )
+
+    def test_add_test_returns_added(self):
+        testroot = fix_path("/a/b/c")
+        relfile = fix_path("./x/test_spam.py")
+        tests = [
+            TestInfo(
+                id="./x/test_spam.py::test_" + name,
+                name="test_" + name,
+                path=TestPath(root=testroot, relfile=relfile, func="test_" + name),
+                source="{}:{}".format(relfile, lineno),
+                markers=[],
+                parentid="./x/test_spam.py",
+            )
+            for name, lineno in [("spam", 11), ("eggs", 14)]
+        ]
+        parents = [
+            ("./x/test_spam.py", "test_spam.py", "file"),
+            ("./x", "x", "folder"),
+            (".", testroot, "folder"),
+        ]
+        discovered = DiscoveredTests()
+
+        first = discovered.add_test(tests[0], parents)
+        second = discovered.add_test(tests[1], parents)
+
+        self.maxDiff = None
+        self.assertEqual(
+            first,
+            (
+                tests[0],
+                [
+                    ParentInfo(id=".", kind="folder", name=testroot),
+                    ParentInfo(
+                        id="./x",
+                        kind="folder",
+                        name="x",
+                        root=testroot,
+                        relpath=fix_path("./x"),
+                        parentid=".",
+                    ),
+                    ParentInfo(
+                        id="./x/test_spam.py",
+                        kind="file",
+                        name="test_spam.py",
+                        root=testroot,
+                        relpath=relfile,
+                        parentid="./x",
+                    ),
+                ],
+            ),
+        )
+        self.assertEqual(second, (tests[1], []))
+
+    def test_add_parents(self):
+        testroot = fix_path("/a/b/c")
+        relfile = fix_path("./x/test_spam.py")
+        test = TestInfo(
+            id="./x/test_spam.py::test_spam",
+            name="test_spam",
+            path=TestPath(root=testroot, relfile=relfile, func="test_spam"),
+            source="{}:{}".format(relfile, 11),
+            markers=[],
+            parentid="./x/test_spam.py",
+        )
+        parents = [
+            ("./x/test_spam.py", "test_spam.py", "file"),
+            ("./x", "x", "folder"),
+            (".", testroot, "folder"),
+        ]
+        discovered = DiscoveredTests()
+
+        added = discovered.add_parents(test, parents)
+
+        self.assertEqual(added[0], test)
+        self.assertEqual([p.id for p in added[1]], [".", "./x", "./x/test_spam.py"])
+        self.assertEqual(len(discovered), 0)
+        self.assertEqual(discovered.parents, added[1])
+
+    def test_parents_processed_once(self):
+        testroot = fix_path("/a/b/c")
+        relfile = fix_path("./x/test_spam.py")
+        tests = [
+            TestInfo(
+                id="./x/test_spam.py::SpamTests::test_spam[{}]".format(i),
+                name="test_spam[{}]".format(i),
+                path=TestPath(
+                    root=testroot,
+                    relfile=relfile,
+                    func="SpamTests.test_spam",
+                    sub=["[{}]".format(i)],
+                ),
+                source="{}:{}".format(relfile, 12),
+                markers=[],
+                parentid="./x/test_spam.py::SpamTests::test_spam",
+            )
+            for i in range(3)
+        ]
+        parents = [
+            ("./x/test_spam.py::SpamTests::test_spam", "test_spam", "function"),
+            ("./x/test_spam.py::SpamTests", "SpamTests", "suite"),
+            ("./x/test_spam.py", "test_spam.py", "file"),
+            ("./x", "x", "folder"),
+            (".", testroot, "folder"),
+        ]
+        # Once a parent is added, the rest of its chain isn't looked at.
+        stale = [parents[0]] + [
+            (parentid, "???", kind) for parentid, _, kind in parents[1:]
+        ]
+        discovered = DiscoveredTests()
+
+        added = [discovered.add_test(tests[0], parents)[1]]
+        for test in tests[1:]:
+            added.append(discovered.add_test(test, stale)[1])
+
+        self.assertEqual([len(a) for a in added], [5, 0, 0])
+        self.assertEqual(
+            [p.name for p in discovered.parents],
+            [testroot, "x", "test_spam.py", "SpamTests", "test_spam"],
+        )
+        self.assertEqual(
+            [test.parentid for test in discovered],
+            ["./x/test_spam.py::SpamTests::test_spam"] * 3,
+        )
+
     def test_multiroot(self):
         # the first root
         testroot1 = fix_path("/a/b/c")
@@ -6,13 +6,17 @@ from __future__ import absolute_import, unicode_literals
 import json
 import os
 import os.path
+import shutil
 import subprocess
 import sys
+import tempfile
+import threading
 import unittest
 
 import pytest
 
 from ...__main__ import TESTING_TOOLS_ROOT
+from testing_tools.adapter import compact
 from testing_tools.adapter.util import fix_path, PATH_SEP
 
 # Pytest 3.7 and later uses pathlib/pathlib2 for path resolution.
@@ -42,13 +46,16 @@ def run_adapter(cmd, tool, *cliargs):
 
 def _run_adapter(cmd, tool, *cliargs, **kwargs):
     hidestdio = kwargs.pop("hidestdio", True)
+    adapterargs = list(kwargs.pop("adapterargs", ()))
     assert not kwargs or tuple(kwargs) == ("stderr",)
     kwds = kwargs
-    argv = [sys.executable, SCRIPT, cmd, tool, "--"] + list(cliargs)
+    argv = [sys.executable, SCRIPT, cmd, tool] + adapterargs + ["--"] + list(cliargs)
     if not hidestdio:
         argv.insert(4, "--no-hide-stdio")
         kwds["stderr"] = subprocess.STDOUT
-    argv.append("--cache-clear")
+    # For incremental discovery the cache must be kept between runs.
+    if tool == "pytest" and "--incremental" not in adapterargs:
+        argv.append("--cache-clear")
     print(
         "running {!r}".format(" ".join(arg.rpartition(CWD + "/")[-1] for arg in argv))
     )
@@ -356,6 +363,347 @@ class PytestTests(unittest.TestCase):
             ],
         )
 
+    def test_discover_incremental(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        projroot = os.path.join(tmpdir, "simple")
+        shutil.copytree(os.path.join(DATA_DIR, "simple"), projroot)
+        testroot = os.path.join(projroot, "tests")
+        # Depending on the version, pytest collects the files of a
+        # directory before or after its subdirectories, sorted or not.
+        for name in ("eggs", "spam"):
+            os.mkdir(os.path.join(testroot, name))
+            filename = os.path.join(testroot, name, "test_{}.py".format(name))
+            with open(filename, "w") as outfile:
+                outfile.write("def test_{}():\n    pass\n".format(name))
+        with open(os.path.join(testroot, "test_ham.py"), "w") as outfile:
+            outfile.write(
+                "class TestHam(object):\n    def test_ham(self):\n        pass\n"
+            )
+        argv = ["discover", "pytest", "--rootdir", projroot, testroot]
+        expected = json.loads(_run_adapter(*argv))
+
+        first = json.loads(_run_adapter(*argv, adapterargs=["--incremental"]))
+        second = json.loads(_run_adapter(*argv, adapterargs=["--incremental"]))
+        # Only the changed files are collected, between the cached ones.
+        for filename in ("test_spam.py", os.path.join("spam", "test_spam.py")):
+            with open(os.path.join(testroot, filename), "a") as outfile:
+                outfile.write("\n\ndef test_incremental():\n    pass\n")
+        changed = json.loads(_run_adapter(*argv, adapterargs=["--incremental"]))
+        changed_expected = json.loads(_run_adapter(*argv))
+        os.remove(os.path.join(testroot, "eggs", "test_eggs.py"))
+        removed = json.loads(_run_adapter(*argv, adapterargs=["--incremental"]))
+
+        self.maxDiff = None
+        self.assertEqual(first, expected)
+        self.assertEqual(second, expected)
+        self.assertEqual(changed, changed_expected)
+        self.assertEqual(
+            sorted(test["id"] for test in removed[0]["tests"]),
+            [
+                "./tests/spam/test_spam.py::test_incremental",
+                "./tests/spam/test_spam.py::test_spam",
+                "./tests/test_ham.py::TestHam::test_ham",
+                "./tests/test_spam.py::test_incremental",
+                "./tests/test_spam.py::test_simple",
+            ],
+        )
+        self.assertEqual(removed, json.loads(_run_adapter(*argv)))
+
+    def test_discover_parallel(self):
+        projroot = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, projroot)
+        for name in ["spam", "ham", "eggs"]:
+            testroot = os.path.join(projroot, name)
+            os.makedirs(os.path.join(testroot, "sub"))
+            with open(os.path.join(testroot, "test_{}.py".format(name)), "w") as f:
+                f.write("def test_one():\n    pass\n\n\ndef test_two():\n    pass\n")
+            with open(
+                os.path.join(testroot, "sub", "test_{}2.py".format(name)), "w"
+            ) as f:
+                f.write(
+                    "class TestSub(object):\n    def test_sub(self):\n        pass\n"
+                )
+        # Depending on the version, pytest collects these before or
+        # among the dirs.
+        for name in ["test_bacon.py", "test_x.py"]:
+            with open(os.path.join(projroot, name), "w") as f:
+                f.write("def test_one():\n    pass\n")
+        argv = ["discover", "pytest", "--rootdir", projroot, projroot]
+        expected = json.loads(_run_adapter(*argv))
+
+        result = json.loads(_run_adapter(*argv, adapterargs=["--jobs", "2"]))
+        result3 = json.loads(_run_adapter(*argv, adapterargs=["--jobs", "3"]))
+
+        self.maxDiff = None
+        self.assertEqual(len(expected[0]["tests"]), 11)
+        self.assertEqual(result, expected)
+        self.assertEqual(result3, expected)
+
+    def test_discover_timings(self):
+        projroot = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, projroot)
+        with open(os.path.join(projroot, "conftest.py"), "w") as f:
+            f.write("")
+        with open(os.path.join(projroot, "test_spam.py"), "w") as f:
+            f.write("def test_one():\n    pass\n\n\ndef test_two():\n    pass\n")
+        errfile = tempfile.TemporaryFile("w+")
+        self.addCleanup(errfile.close)
+
+        _run_adapter(
+            "discover",
+            "pytest",
+            "--rootdir",
+            projroot,
+            projroot,
+            adapterargs=["--timings"],
+            stderr=errfile,
+        )
+        errfile.seek(0)
+        lines = errfile.read().splitlines()
+        rows = [line.split() for line in lines[2:]]
+
+        self.assertTrue(lines[0].startswith("slowest collectors ("))
+        self.assertEqual(lines[1].split(), ["seconds", "items", "kind", "id"])
+        self.assertIn(["module", "./test_spam.py"], [row[2:] for row in rows])
+        self.assertIn(["2", "conftest", "./conftest.py"], [row[1:] for row in rows])
+
+    def test_discover_watch_helper_changed(self):
+        projroot = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, projroot)
+        helpers = os.path.join(projroot, "helpers.py")
+        with open(helpers, "w") as f:
+            f.write("PARAMS = [1, 2]\n")
+        with open(os.path.join(projroot, "test_spam.py"), "w") as f:
+            f.write(
+                "import pytest\n"
+                "from helpers import PARAMS\n"
+                "\n"
+                "\n"
+                "@pytest.mark.parametrize('x', PARAMS)\n"
+                "def test_spam(x):\n"
+                "    pass\n"
+            )
+        argv = [sys.executable, SCRIPT, "discover", "pytest", "--watch"]
+        argv += ["--", "--rootdir", projroot, projroot]
+        proc = subprocess.Popen(
+            argv,
+            cwd=projroot,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            universal_newlines=True,
+        )
+        self.addCleanup(proc.wait)
+        self.addCleanup(proc.kill)
+        # Don't hang if the change is never noticed.
+        timer = threading.Timer(60, proc.kill)
+        timer.start()
+        self.addCleanup(timer.cancel)
+
+        first = json.loads(proc.stdout.readline())
+        with open(helpers, "w") as f:
+            f.write("PARAMS = [1, 2, 3]\n")
+        second = json.loads(proc.stdout.readline())
+
+        self.assertEqual(
+            [test["id"] for test in first[0]["tests"]],
+            ["./test_spam.py::test_spam[1]", "./test_spam.py::test_spam[2]"],
+        )
+        self.assertEqual(
+            [test["id"] for test in second[0]["tests"]],
+            [
+                "./test_spam.py::test_spam[1]",
+                "./test_spam.py::test_spam[2]",
+                "./test_spam.py::test_spam[3]",
+            ],
+        )
+
+    def test_discover_ndjson(self):
+        projroot, testroot = resolve_testroot("simple")
+
+        out = _run_adapter(
+            "discover",
+            "pytest",
+            "--rootdir",
+            projroot,
+            testroot,
+            adapterargs=["--format", "ndjson"],
+        )
+        records = [json.loads(line) for line in out.splitlines()]
+
+        self.assertEqual(
+            [(r["type"], r["id"]) for r in records],
+            [
+                ("root", "."),
+                ("parent", "./tests"),
+                ("parent", "./tests/test_spam.py"),
+                ("test", "./tests/test_spam.py::test_simple"),
+            ],
+        )
+
+    def test_discover_compact(self):
+        projroot, testroot = resolve_testroot("simple")
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        snapshot = os.path.join(tmpdir, "tests.snapshot")
+        argv = ["discover", "pytest", "--rootdir", projroot, testroot]
+        adapterargs = ["--format", "compact", "--snapshot", snapshot]
+
+        full = json.loads(_run_adapter(*argv, adapterargs=adapterargs))
+        delta = json.loads(_run_adapter(*argv, adapterargs=adapterargs))
+
+        self.assertEqual(
+            [test["id"] for test in compact.decode(full)[0]["tests"]],
+            ["./tests/test_spam.py::test_simple"],
+        )
+        self.assertEqual(delta["format"], "compact-delta")
+        self.assertEqual(delta["base"], full["id"])
+        self.assertEqual(delta["tests"], [])
+
+    def test_shard(self):
+        projroot = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, projroot)
+        with open(os.path.join(projroot, "test_spam.py"), "w") as f:
+            f.write(
+                "".join("def test_{}():\n    pass\n\n\n".format(i) for i in range(5))
+            )
+        argv = ["shard", "pytest", "--rootdir", projroot, projroot]
+
+        result = json.loads(_run_adapter(*argv, adapterargs=["--shards", "2"]))
+        args = _run_adapter(*argv, adapterargs=["--shards", "2", "--index", "1"])
+
+        self.assertEqual(result["tests"], 5)
+        self.assertEqual([len(s["tests"]) for s in result["shards"]], [3, 2])
+        self.assertEqual(
+            sorted(t for s in result["shards"] for t in s["tests"]),
+            ["./test_spam.py::test_{}".format(i) for i in range(5)],
+        )
+        self.assertEqual(args.splitlines(), result["shards"][1]["args"])
+
+    def test_select(self):
+        projroot = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, projroot)
+        with open(os.path.join(projroot, "spam.py"), "w") as f:
+            f.write("def spam():\n    return 1\n\n\ndef eggs():\n    return 2\n")
+        with open(os.path.join(projroot, "test_spam.py"), "w") as f:
+            f.write(
+                "import spam\n\n\n"
+                "def test_spam():\n    assert spam.spam() == 1\n\n\n"
+                "def test_eggs():\n    assert spam.eggs() == 2\n"
+            )
+        dbfile = os.path.join(projroot, "coverage.db")
+        pytestargs = ["--rootdir", projroot, projroot]
+        _run_adapter(
+            "run", "pytest", *pytestargs, adapterargs=["--coverage-db", dbfile]
+        )
+
+        changed = os.path.join(projroot, "spam.py")
+        result = json.loads(
+            _run_adapter(
+                "select",
+                "pytest",
+                *pytestargs,
+                adapterargs=["--coverage-db", dbfile, "--changed", changed + ":6"]
+            )
+        )
+
+        self.assertEqual(result["tests"], ["./test_spam.py::test_eggs"])
+        self.assertEqual(result["unrecorded"], 0)
+        self.assertEqual(result["discovered"], 2)
+
+    def test_run_simple(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        projroot = os.path.join(tmpdir, "simple")
+        shutil.copytree(os.path.join(DATA_DIR, "simple"), projroot)
+        testroot = os.path.join(projroot, "tests")
+        discovered = json.loads(
+            run_adapter("discover", "pytest", "--rootdir", projroot, testroot)
+        )
+
+        out = run_adapter("run", "pytest", "--rootdir", projroot, testroot)
+        events = [json.loads(line) for line in out.splitlines()]
+
+        self.assertEqual(
+            [(e["type"], e.get("id"), e.get("outcome")) for e in events],
+            [
+                ("start", discovered[0]["tests"][0]["id"], None),
+                ("result", discovered[0]["tests"][0]["id"], "passed"),
+                ("finished", None, None),
+            ],
+        )
+        self.assertEqual(events[-1]["exitcode"], 0)
+        self.assertEqual(events[-1]["counts"], {"passed": 1})
+
+
+@pytest.mark.functional
+class UnittestTests(unittest.TestCase):
+    def setUp(self):
+        if PATH_SEP is not os.path.sep:
+            raise unittest.SkipTest("functional tests require unmodified env")
+        super(UnittestTests, self).setUp()
+
+    def test_discover_simple(self):
+        projroot = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, projroot)
+        testroot = os.path.join(projroot, "tests")
+        os.mkdir(testroot)
+        open(os.path.join(testroot, "__init__.py"), "w").close()
+        with open(os.path.join(testroot, "test_spam.py"), "w") as outfile:
+            outfile.write(
+                "import unittest\n"
+                "\n"
+                "\n"
+                "class SpamTests(unittest.TestCase):\n"
+                "    def test_simple(self):\n"
+                "        pass\n"
+            )
+
+        out = run_adapter("discover", "unittest", "-s", testroot, "-t", projroot)
+        result = json.loads(out)
+
+        self.maxDiff = None
+        self.assertEqual(
+            result,
+            [
+                {
+                    "root": projroot,
+                    "rootid": ".",
+                    "parents": [
+                        {
+                            "id": "./tests",
+                            "kind": "folder",
+                            "name": "tests",
+                            "relpath": fix_path("./tests"),
+                            "parentid": ".",
+                        },
+                        {
+                            "id": "./tests/test_spam.py",
+                            "kind": "file",
+                            "name": "test_spam.py",
+                            "relpath": fix_path("./tests/test_spam.py"),
+                            "parentid": "./tests",
+                        },
+                        {
+                            "id": "./tests/test_spam.py::SpamTests",
+                            "kind": "suite",
+                            "name": "SpamTests",
+                            "parentid": "./tests/test_spam.py",
+                        },
+                    ],
+                    "tests": [
+                        {
+                            "id": "./tests/test_spam.py::SpamTests::test_simple",
+                            "name": "test_simple",
+                            "source": fix_path("./tests/test_spam.py:5"),
+                            "markers": [],
+                            "parentid": "./tests/test_spam.py::SpamTests",
+                        },
+                    ],
+                }
+            ],
+        )
+
 
 COMPLEX = {
     "root": None,
@@ -0,0 +1,145 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+from __future__ import absolute_import, print_function
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from testing_tools.adapter.impact import CoverageStore, LineTracer, parse_change
+from testing_tools.adapter.util import PATH_JOIN
+
+
+class ParseChangeTests(unittest.TestCase):
+    def test_no_lines(self):
+        self.assertEqual(parse_change("x/spam.py"), ("x/spam.py", None))
+
+    def test_lines(self):
+        self.assertEqual(
+            parse_change("x/spam.py:10-12,20"), ("x/spam.py", [(10, 12), (20, 20)])
+        )
+
+    def test_colon_in_filename(self):
+        self.assertEqual(parse_change("C:\\x\\spam.py"), ("C:\\x\\spam.py", None))
+        self.assertEqual(parse_change("C:\\x\\spam.py:3"), ("C:\\x\\spam.py", [(3, 3)]))
+
+
+class LineTracerTests(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def _load(self, name, source):
+        filename = PATH_JOIN(self.root, name)
+        with open(filename, "w") as outfile:
+            outfile.write(source)
+        namespace = {}
+        exec(compile(source, filename, "exec"), namespace)
+        return namespace
+
+    def test_lines(self):
+        ns = self._load(
+            "spam.py",
+            "def spam(x):\n    if x:\n        return 1\n    return 2\n",
+        )
+        tracer = LineTracer(self.root)
+
+        # The previous trace function is restored.
+        previous = sys.gettrace()
+        tracer.start()
+        ns["spam"](True)
+        lines = tracer.stop()
+
+        self.assertIs(sys.gettrace(), previous)
+        self.assertEqual(lines, {"./spam.py": {2, 3}})
+
+    def test_previous_tracer(self):
+        ns = self._load(
+            "spam.py",
+            "def spam(x):\n    if x:\n        return 1\n    return 2\n",
+        )
+        tracer = LineTracer(self.root)
+        events = []
+
+        def previous(frame, event, arg):
+            if frame.f_code.co_name == "spam":
+                events.append((event, frame.f_lineno))
+                return previous
+            return None
+
+        original = sys.gettrace()
+        sys.settrace(previous)
+        try:
+            tracer.start()
+            ns["spam"](False)
+            lines = tracer.stop()
+        finally:
+            sys.settrace(original)
+
+        self.assertEqual(lines, {"./spam.py": {2, 4}})
+        self.assertEqual(events, [("call", 1), ("line", 2), ("line", 4), ("return", 4)])
+
+    def test_outside_root(self):
+        ns = self._load("spam.py", "def spam(func):\n    return func()\n")
+        tracer = LineTracer(os.path.join(self.root, "sub"))
+
+        tracer.start()
+        ns["spam"](lambda: None)
+        lines = tracer.stop()
+
+        self.assertEqual(lines, {})
+
+
+class CoverageStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.store = CoverageStore(":memory:")
+        self.store.record(
+            "./test_x.py::test_spam",
+            {"./x.py": {2, 3}, "./test_x.py": {10}},
+        )
+        self.store.record(
+            "./test_x.py::test_eggs",
+            {"./x.py": {6}, "./test_x.py": {14}},
+        )
+
+    def test_get_testids(self):
+        self.assertEqual(
+            self.store.get_testids(),
+            {"./test_x.py::test_spam", "./test_x.py::test_eggs"},
+        )
+
+    def test_select_lines(self):
+        self.assertEqual(
+            self.store.select("./x.py", [(3, 4)]), {"./test_x.py::test_spam"}
+        )
+        self.assertEqual(
+            self.store.select("./x.py", [(1, 2), (6, 6)]),
+            {"./test_x.py::test_spam", "./test_x.py::test_eggs"},
+        )
+
+    def test_select_file(self):
+        self.assertEqual(
+            self.store.select("./x.py"),
+            {"./test_x.py::test_spam", "./test_x.py::test_eggs"},
+        )
+
+    def test_select_lines_not_run(self):
+        # e.g. an import at the top of the file
+        self.assertEqual(
+            self.store.select("./x.py", [(1, 1)]),
+            {"./test_x.py::test_spam", "./test_x.py::test_eggs"},
+        )
+
+    def test_select_unknown_file(self):
+        self.assertEqual(self.store.select("./y.py", [(1, 1)]), set())
+
+    def test_record_again(self):
+        self.store.record("./test_x.py::test_spam", {"./y.py": {1}})
+
+        self.assertEqual(
+            self.store.select("./x.py", [(2, 3)]), {"./test_x.py::test_eggs"}
+        )
+        self.assertEqual(self.store.select("./y.py"), {"./test_x.py::test_spam"})
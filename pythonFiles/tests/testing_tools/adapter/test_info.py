@@ -0,0 +1,135 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+from __future__ import absolute_import
+
+import unittest
+
+from testing_tools.adapter.info import ParentInfo, TestInfo, TestPath
+from testing_tools.adapter.util import fix_path
+
+
+def _copy(value):
+    # An equal string that is a different object.
+    return "".join(list(value))
+
+
+def _get_test(**kwargs):
+    testroot = fix_path("/a/b/c")
+    relfile = fix_path("./x/test_spam.py")
+    values = dict(
+        id="./x/test_spam.py::test_spam",
+        name="test_spam",
+        path=TestPath(root=testroot, relfile=relfile, func="test_spam"),
+        source="{}:{}".format(relfile, 11),
+        markers=None,
+        parentid="./x/test_spam.py",
+    )
+    values.update(kwargs)
+    return TestInfo(**values)
+
+
+class TestPathTests(unittest.TestCase):
+    def test_interned(self):
+        testroot = fix_path("/a/b/c")
+        relfile = fix_path("./x/test_spam.py")
+
+        first = TestPath(_copy(testroot), _copy(relfile), _copy("test_spam"))
+        second = TestPath(_copy(testroot), _copy(relfile), _copy("test_spam"))
+
+        self.assertIs(first.root, second.root)
+        self.assertIs(first.relfile, second.relfile)
+        self.assertIs(first.func, second.func)
+
+    def test_no_dict(self):
+        path = TestPath(fix_path("/a/b/c"), fix_path("./x/test_spam.py"), None)
+
+        with self.assertRaises(AttributeError):
+            path.spam = "eggs"
+
+    def test_missing(self):
+        relfile = fix_path("./x/test_spam.py")
+
+        with self.assertRaises(TypeError):
+            TestPath(None, relfile, "test_spam")
+        with self.assertRaises(TypeError):
+            TestPath(fix_path("/a/b/c"), "", "test_spam")
+
+
+class ParentInfoTests(unittest.TestCase):
+    def test_interned(self):
+        testroot = fix_path("/a/b/c")
+
+        first = ParentInfo(
+            "./x", _copy("folder"), "x", _copy(testroot), fix_path("./x"), "."
+        )
+        second = ParentInfo(
+            "./x", _copy("folder"), "x", _copy(testroot), fix_path("./x"), "."
+        )
+
+        self.assertIs(first.kind, second.kind)
+        self.assertIs(first.root, second.root)
+
+    def test_root(self):
+        parent = ParentInfo(".", "folder", fix_path("/a/b/c"))
+
+        self.assertIsNone(parent.root)
+        self.assertIsNone(parent.parentid)
+
+    def test_invalid(self):
+        testroot = fix_path("/a/b/c")
+        for args, exctype in [
+            ((None, "folder", "x", testroot, fix_path("./x"), "."), TypeError),
+            (("./x", None, "x", testroot, fix_path("./x"), "."), TypeError),
+            (("./x", "spam", "x", testroot, fix_path("./x"), "."), ValueError),
+            (("./x", "folder", None, testroot, fix_path("./x"), "."), TypeError),
+            (("./x", "folder", "x", None, None, "."), TypeError),
+            (("./x", "folder", "x", testroot, fix_path("./x"), None), TypeError),
+            (("./x", "folder", "x", testroot, None, "."), TypeError),
+        ]:
+            with self.subTest(args):
+                with self.assertRaises(exctype):
+                    ParentInfo(*args)
+
+
+class TestInfoTests(unittest.TestCase):
+    def test_normalized(self):
+        test = _get_test(markers=None)
+
+        self.assertEqual(test.markers, [])
+        self.assertEqual(test.kind, "function")
+        self.assertEqual(test.root, fix_path("/a/b/c"))
+        self.assertEqual(test.srcfile, fix_path("./x/test_spam.py"))
+        self.assertEqual(test.lineno, 11)
+
+    def test_kind_interned(self):
+        first = _get_test(kind=_copy("doctest"))
+        second = _get_test(kind=_copy("doctest"))
+
+        self.assertIs(first.kind, second.kind)
+
+    def test_invalid(self):
+        for kwargs, exctype in [
+            (dict(id=None), TypeError),
+            (dict(name=None), TypeError),
+            (dict(path=None), TypeError),
+            (dict(source=None), TypeError),
+            (dict(source="spam"), ValueError),
+            (dict(source="spam:"), ValueError),
+            (dict(source="spam:-1"), ValueError),
+            (dict(markers=["spam"]), ValueError),
+            (dict(parentid=None), TypeError),
+            (dict(kind="spam"), ValueError),
+        ]:
+            with self.subTest(kwargs):
+                with self.assertRaises(exctype):
+                    _get_test(**kwargs)
+
+    def test_make_not_checked(self):
+        test = _get_test()
+
+        made = TestInfo._make(test[:3] + ("spam",) + test[4:])
+        replaced = test._replace(kind="spam")
+
+        self.assertEqual(made.source, "spam")
+        self.assertEqual(replaced.kind, "spam")
@@ -1,13 +1,27 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License.
 
+try:
+    from io import StringIO
+except ImportError:  # 2.7
+    from StringIO import StringIO
 import json
+import shutil
+import sys
+import tempfile
 import unittest
 
 from ...util import StubProxy
-from testing_tools.adapter.util import fix_path, fix_relpath
+from testing_tools.adapter import compact
+from testing_tools.adapter.util import PATH_JOIN, fix_path, fix_relpath
 from testing_tools.adapter.info import TestInfo, TestPath, ParentInfo
-from testing_tools.adapter.report import report_discovered
+from testing_tools.adapter.report import (
+    report_discovered,
+    report_selected,
+    report_shards,
+    DiscoveryStream,
+    _open_stdout,
+)
 
 
 class StubSender(StubProxy):
@@ -1177,3 +1191,275 @@ class ReportDiscoveredTests(unittest.TestCase):
                 ("send", (expected,), None),
             ],
         )
+
+
+class DiscoveryStreamTests(unittest.TestCase):
+    def _get_tests(self):
+        testroot = fix_path("/a/b/c")
+        relfile = fix_path("./x/test_spam.py")
+        tests = [
+            TestInfo(
+                id="./x/test_spam.py::test_" + name,
+                name="test_" + name,
+                path=TestPath(root=testroot, relfile=relfile, func="test_" + name),
+                source="{}:{}".format(relfile, lineno),
+                markers=[],
+                parentid="./x/test_spam.py",
+            )
+            for name, lineno in [("spam", 11), ("eggs", 14)]
+        ]
+        parents = [
+            ParentInfo(id=".", kind="folder", name=testroot),
+            ParentInfo(
+                id="./x",
+                kind="folder",
+                name="x",
+                root=testroot,
+                relpath=fix_path("./x"),
+                parentid=".",
+            ),
+            ParentInfo(
+                id="./x/test_spam.py",
+                kind="file",
+                name="test_spam.py",
+                root=testroot,
+                relpath=relfile,
+                parentid="./x",
+            ),
+        ]
+        expected = [
+            {"type": "root", "id": ".", "root": testroot},
+            {
+                "type": "parent",
+                "id": "./x",
+                "kind": "folder",
+                "name": "x",
+                "relpath": fix_path("./x"),
+                "parentid": ".",
+                "root": testroot,
+            },
+            {
+                "type": "parent",
+                "id": "./x/test_spam.py",
+                "kind": "file",
+                "name": "test_spam.py",
+                "relpath": relfile,
+                "parentid": "./x",
+                "root": testroot,
+            },
+            {
+                "type": "test",
+                "id": "./x/test_spam.py::test_spam",
+                "name": "test_spam",
+                "source": "{}:{}".format(relfile, 11),
+                "markers": [],
+                "parentid": "./x/test_spam.py",
+                "root": testroot,
+            },
+            {
+                "type": "test",
+                "id": "./x/test_spam.py::test_eggs",
+                "name": "test_eggs",
+                "source": "{}:{}".format(relfile, 14),
+                "markers": [],
+                "parentid": "./x/test_spam.py",
+                "root": testroot,
+            },
+        ]
+        return tests, parents, expected
+
+    def test_streamed(self):
+        stub = StubSender()
+        tests, parents, expected = self._get_tests()
+        stream = DiscoveryStream(_send=stub.send)
+
+        stream.add(tests[0], parents)
+        during = len(stub.calls)
+        stream.add(tests[1], [])
+        report_discovered(tests, parents, format="ndjson", stream=stream)
+
+        self.maxDiff = None
+        self.assertEqual(during, 4)
+        self.assertEqual(stub.calls, [("send", (r,), None) for r in expected])
+
+    def test_not_streamed(self):
+        stub = StubSender()
+        tests, parents, expected = self._get_tests()
+
+        report_discovered(tests, parents, format="ndjson", _send=stub.send)
+
+        self.maxDiff = None
+        self.assertEqual(stub.calls, [("send", (r,), None) for r in expected])
+
+    def test_simple(self):
+        stub = StubSender()
+        tests, parents, _ = self._get_tests()
+
+        report_discovered(tests, parents, simple=True, format="ndjson", _send=stub.send)
+
+        self.assertEqual(
+            [call[1][0]["id"] for call in stub.calls],
+            ["./x/test_spam.py::test_spam", "./x/test_spam.py::test_eggs"],
+        )
+
+    def test_removed(self):
+        stub = StubSender()
+        tests, parents, expected = self._get_tests()
+        stream = DiscoveryStream(_send=stub.send)
+
+        stream.add(tests[0], parents)
+        stream.add(tests[1], [])
+        stream.remove(tests[1])
+
+        self.assertEqual(
+            stub.calls[-1],
+            (
+                "send",
+                (
+                    {
+                        "type": "removed",
+                        "id": "./x/test_spam.py::test_eggs",
+                        "root": fix_path("/a/b/c"),
+                    },
+                ),
+                None,
+            ),
+        )
+
+
+class OpenStdoutTests(unittest.TestCase):
+    def setUp(self):
+        self.stdout = sys.stdout
+        self.addCleanup(setattr, sys, "stdout", self.stdout)
+
+    def test_dup_closed(self):
+        with tempfile.TemporaryFile("w+") as fakestdout:
+            sys.stdout = fakestdout
+
+            outfile, close = _open_stdout()
+            outfile.write("spam\n")
+            close()
+
+            self.assertTrue(outfile.closed)
+            self.assertFalse(fakestdout.closed)
+            fakestdout.seek(0)
+            self.assertEqual(fakestdout.read(), "spam\n")
+
+    def test_no_fileno(self):
+        sys.stdout = StringIO()
+
+        outfile, _ = _open_stdout()
+
+        self.assertIs(outfile, sys.stdout)
+
+
+class ReportCompactTests(unittest.TestCase):
+    _get_tests = DiscoveryStreamTests._get_tests
+
+    def test_basic(self):
+        stub = StubSender()
+        tests, parents, _ = self._get_tests()
+        expected = StubSender()
+        report_discovered(tests, parents, _send=expected.send)
+
+        report_discovered(tests, parents, format="compact", _send=stub.send)
+        ((_, (payload,), _),) = stub.calls
+
+        self.assertEqual(payload["format"], "compact")
+        self.assertEqual(compact.decode(payload), expected.calls[0][1][0])
+
+    def test_snapshot(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        snapshot = PATH_JOIN(tmpdir, "tests.snapshot")
+        stub = StubSender()
+        tests, parents, _ = self._get_tests()
+
+        report_discovered(
+            tests, parents, format="compact", snapshot=snapshot, _send=stub.send
+        )
+        report_discovered(
+            tests[:1], parents, format="compact", snapshot=snapshot, _send=stub.send
+        )
+        (_, (full,), _), (_, (delta,), _) = stub.calls
+
+        self.assertEqual(full["format"], "compact")
+        self.assertEqual(delta["format"], "compact-delta")
+        self.assertEqual(delta["base"], full["id"])
+        self.assertEqual(len(delta["removedTests"]), 1)
+        self.assertEqual(compact.load_snapshot(snapshot)["id"], delta["id"])
+
+    def test_simple(self):
+        tests, parents, _ = self._get_tests()
+
+        with self.assertRaises(ValueError):
+            report_discovered(tests, parents, simple=True, format="compact")
+
+
+class ReportShardsTests(unittest.TestCase):
+    SHARDS = [
+        {
+            "index": 0,
+            "duration": 3.0,
+            "estimated": 0,
+            "tests": ["./test_spam.py::test_spam"],
+            "args": ["/a/b/c/test_spam.py::test_spam"],
+        },
+        {
+            "index": 1,
+            "duration": 2.0,
+            "estimated": 1,
+            "tests": ["./test_spam.py::test_eggs", "./test_ham.py::test_ham"],
+            "args": ["/a/b/c/test_spam.py::test_eggs", "/a/b/c/test_ham.py::test_ham"],
+        },
+    ]
+
+    def test_all(self):
+        stub = StubSender()
+
+        report_shards(self.SHARDS, [object()] * 3, _send=stub.send)
+
+        self.assertEqual(
+            stub.calls,
+            [("send", ({"tests": 3, "shards": self.SHARDS},), None)],
+        )
+
+    def test_index(self):
+        sent = []
+
+        report_shards(self.SHARDS[1:], [object()] * 3, index=1, _send=sent.append)
+
+        self.assertEqual(
+            sent,
+            ["/a/b/c/test_spam.py::test_eggs", "/a/b/c/test_ham.py::test_ham"],
+        )
+
+
+class ReportSelectedTests(unittest.TestCase):
+    def test_basic(self):
+        stub = StubSender()
+        selection = {
+            "tests": ["./test_spam.py::test_spam"],
+            "args": ["/a/b/c/test_spam.py::test_spam"],
+            "unrecorded": 0,
+        }
+
+        report_selected(selection, [object()] * 3, _send=stub.send)
+
+        self.assertEqual(
+            stub.calls,
+            [
+                (
+                    "send",
+                    (
+                        {
+                            "tests": ["./test_spam.py::test_spam"],
+                            "args": ["/a/b/c/test_spam.py::test_spam"],
+                            "unrecorded": 0,
+                            "discovered": 3,
+                        },
+                    ),
+                    None,
+                )
+            ],
+        )
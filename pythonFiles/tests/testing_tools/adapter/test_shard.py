@@ -0,0 +1,139 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+from __future__ import absolute_import, print_function
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from testing_tools.adapter.info import TestInfo, TestPath
+from testing_tools.adapter.shard import (
+    estimate_durations,
+    load_durations,
+    split_tests,
+    update_durations,
+)
+
+
+def _make_test(relfile, name):
+    return TestInfo(
+        id="{}::{}".format(relfile, name),
+        name=name,
+        path=TestPath(root="/a/b/c", relfile=relfile, func=name),
+        source="{}:{}".format(relfile, 1),
+        markers=None,
+        parentid=relfile,
+    )
+
+
+class DurationsFileTests(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.filename = os.path.join(self.tmpdir, "durations.json")
+
+    def test_missing(self):
+        self.assertEqual(load_durations(self.filename), {})
+        self.assertEqual(load_durations(None), {})
+
+    def test_update(self):
+        update_durations(self.filename, {"./x.py::spam": 1.0, "./x.py::eggs": 2.0})
+        update_durations(self.filename, {"./x.py::spam": 3.0})
+
+        self.assertEqual(
+            load_durations(self.filename), {"./x.py::spam": 3.0, "./x.py::eggs": 2.0}
+        )
+
+    def test_bad_file(self):
+        with open(self.filename, "w") as outfile:
+            json.dump([1, 2, 3], outfile)
+
+        with self.assertRaises(ValueError):
+            load_durations(self.filename)
+
+
+class EstimateDurationsTests(unittest.TestCase):
+    def test_estimates(self):
+        tests = [
+            _make_test("./x.py", "spam"),
+            _make_test("./x.py", "ham"),
+            _make_test("./x.py", "eggs"),
+            _make_test("./x.py", "new"),
+            _make_test("./y.py", "spam"),
+            _make_test("./z.py", "new"),
+        ]
+        durations = {
+            "./x.py::spam": 1.0,
+            "./x.py::ham": 2.0,
+            "./x.py::eggs": 6.0,
+            "./y.py::spam": 4.0,
+            "./gone.py::spam": 100.0,
+        }
+
+        estimates = estimate_durations(tests, durations)
+
+        self.assertEqual(
+            estimates,
+            [
+                (1.0, False),
+                (2.0, False),
+                (6.0, False),
+                # the median of its file
+                (2.0, True),
+                (4.0, False),
+                # the median of all the known tests
+                (3.0, True),
+            ],
+        )
+
+    def test_no_history(self):
+        tests = [_make_test("./x.py", "spam"), _make_test("./y.py", "eggs")]
+
+        estimates = estimate_durations(tests, {})
+
+        self.assertEqual(estimates, [(1.0, True), (1.0, True)])
+
+
+class SplitTestsTests(unittest.TestCase):
+    def test_balanced(self):
+        tests = [_make_test("./x.py", "test{}".format(i)) for i in range(6)]
+        durations = dict(
+            zip([test.id for test in tests], [5.0, 4.0, 3.0, 3.0, 2.0, 2.0])
+        )
+
+        shards = split_tests(tests, 2, durations)
+
+        self.assertEqual(
+            [(duration, [t.name for t in shard], n) for duration, shard, n in shards],
+            [
+                (10.0, ["test0", "test3", "test5"], 0),
+                (9.0, ["test1", "test2", "test4"], 0),
+            ],
+        )
+
+    def test_no_history(self):
+        tests = [_make_test("./x.py", "test{}".format(i)) for i in range(5)]
+
+        shards = split_tests(tests, 2)
+
+        self.assertEqual(
+            [(duration, len(shard), n) for duration, shard, n in shards],
+            [(3.0, 3, 3), (2.0, 2, 2)],
+        )
+
+    def test_more_shards_than_tests(self):
+        tests = [_make_test("./x.py", "spam")]
+
+        shards = split_tests(tests, 3)
+
+        self.assertEqual(
+            [(duration, len(shard)) for duration, shard, _ in shards],
+            [(1.0, 1), (0.0, 0), (0.0, 0)],
+        )
+
+    def test_bad_count(self):
+        with self.assertRaises(ValueError):
+            split_tests([], 0)
@@ -9,6 +9,7 @@ import os.path
 import posixpath
 import shlex
 import sys
+import tempfile
 import unittest
 
 import pytest
@@ -20,9 +21,11 @@ except ImportError:
     from pathlib2 import Path
 
 from testing_tools.adapter.util import (
+    CapturedOutput,
     fix_path,
     fix_relpath,
     fix_fileid,
+    hide_stdio,
     shlex_unsplit,
 )
 
@@ -329,3 +332,68 @@ class ShlexUnsplitTests(unittest.TestCase):
             "-x ''\"'\"'<quoted>'\"'\"'' 'spam\"spam\"spam' 'ham'\"'\"'ham'\"'\"'ham' eggs",
         )
         self.assertEqual(shlex.split(joined), argv)
+
+
+class CapturedOutputTests(unittest.TestCase):
+    def _capture(self, text, tail=None):
+        fileobj = tempfile.TemporaryFile("w+")
+        self.addCleanup(fileobj.close)
+        # Leave it positioned at the end, like hide_stdio() does.
+        fileobj.write(text)
+        return CapturedOutput(fileobj, tail)
+
+    def test_no_tail(self):
+        captured = self._capture("spam\neggs\n")
+
+        self.assertEqual(captured.getvalue(), "spam\neggs\n")
+
+    def test_shorter_than_tail(self):
+        captured = self._capture("spam\neggs\n", tail=100)
+
+        self.assertEqual(captured.getvalue(), "spam\neggs\n")
+
+    def test_tail(self):
+        captured = self._capture("x" * 1000 + "spam\neggs\n", tail=10)
+
+        self.assertEqual(
+            captured.getvalue(),
+            "[1000 bytes of earlier output omitted]\nspam\neggs\n",
+        )
+
+    def test_full(self):
+        captured = self._capture("x" * 1000 + "spam\neggs\n", tail=10)
+
+        self.assertEqual(captured.getvalue(full=True), "x" * 1000 + "spam\neggs\n")
+
+    def test_closed(self):
+        captured = self._capture("spam\neggs\n")
+
+        captured.close()
+
+        self.assertTrue(captured._file.closed)
+        with self.assertRaises(ValueError):
+            captured.getvalue()
+
+    def test_repeated(self):
+        captured = self._capture("spam", tail=2)
+        first = captured.getvalue()
+        captured._file.write("eggs")
+        second = captured.getvalue()
+
+        self.assertEqual(first, "[2 bytes of earlier output omitted]\nam")
+        self.assertEqual(second, "[6 bytes of earlier output omitted]\ngs")
+
+
+class HideStdioTests(unittest.TestCase):
+    def test_captured(self):
+        with hide_stdio() as captured:
+            print("spam")
+            value = captured.getvalue()
+
+        self.assertEqual(value, "spam\n")
+
+    def test_closed_on_exit(self):
+        with hide_stdio() as captured:
+            print("spam")
+
+        self.assertTrue(captured._file.closed)
@@ -0,0 +1,122 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+from __future__ import absolute_import, print_function
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from testing_tools.adapter.util import PATH_JOIN, fix_path
+from testing_tools.adapter.watch import (
+    forget_modules,
+    is_watched,
+    InotifyWatcher,
+    PollingWatcher,
+)
+
+
+class FakeModule(object):
+    def __init__(self, filename=None):
+        if filename is not None:
+            self.__file__ = fix_path(filename)
+
+
+def _write(filename, text):
+    with open(filename, "w") as outfile:
+        outfile.write(text)
+
+
+class HelpersTests(unittest.TestCase):
+    def test_is_watched(self):
+        self.assertTrue(is_watched(fix_path("/a/b/test_spam.py")))
+        self.assertTrue(is_watched(fix_path("/a/b/conftest.py")))
+        self.assertTrue(is_watched(fix_path("/a/b/pytest.ini")))
+        self.assertFalse(is_watched(fix_path("/a/b/spam.txt")))
+        self.assertFalse(is_watched(fix_path("/a/b/spam.pyc")))
+
+    def test_forget_modules(self):
+        modules = {
+            "sys": FakeModule(),
+            "test_spam": FakeModule("/a/b/test_spam.py"),
+            "test_ham": FakeModule("/a/b/test_ham.py"),
+            "x": FakeModule("/a/b/x/__init__.py"),
+            "x.test_eggs": FakeModule("/a/b/x/test_eggs.py"),
+            "y.test_eggs": FakeModule("/a/b/y/test_eggs.py"),
+        }
+        changed = [fix_path("/a/b/test_spam.py"), fix_path("/a/b/x")]
+
+        forgotten = forget_modules(changed, _modules=modules)
+
+        self.assertEqual(sorted(forgotten), ["test_spam", "x", "x.test_eggs"])
+        self.assertEqual(sorted(modules), ["sys", "test_ham", "y.test_eggs"])
+
+
+class WatcherTests(object):
+    def setUp(self):
+        super(WatcherTests, self).setUp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        _write(PATH_JOIN(self.root, "test_spam.py"), "")
+
+    def watcher(self):
+        raise NotImplementedError
+
+    def test_nothing_changed(self):
+        watcher = self.watcher()
+
+        changed = watcher.wait(0.2)
+
+        self.assertEqual(changed, set())
+
+    def test_changes(self):
+        watcher = self.watcher()
+        _write(PATH_JOIN(self.root, "test_spam.py"), "def test_spam(): pass\n")
+        _write(PATH_JOIN(self.root, "test_ham.py"), "")
+        _write(PATH_JOIN(self.root, "spam.txt"), "")
+
+        changed = watcher.wait(5)
+
+        self.assertEqual(
+            changed,
+            {PATH_JOIN(self.root, "test_spam.py"), PATH_JOIN(self.root, "test_ham.py")},
+        )
+
+    def test_new_directory(self):
+        watcher = self.watcher()
+        subdir = PATH_JOIN(self.root, "x")
+        os.mkdir(subdir)
+        _write(PATH_JOIN(subdir, "test_eggs.py"), "")
+        watcher.wait(5)
+
+        _write(PATH_JOIN(subdir, "test_eggs.py"), "def test_eggs(): pass\n")
+        changed = watcher.wait(5)
+
+        self.assertIn(PATH_JOIN(subdir, "test_eggs.py"), changed)
+
+    def test_ignored_directory(self):
+        watcher = self.watcher()
+        cachedir = PATH_JOIN(self.root, ".pytest_cache")
+        os.mkdir(cachedir)
+        _write(PATH_JOIN(cachedir, "spam.py"), "")
+
+        changed = watcher.wait(0.5)
+
+        self.assertEqual(changed, set())
+
+
+class PollingWatcherTests(WatcherTests, unittest.TestCase):
+    def watcher(self):
+        watcher = PollingWatcher(self.root, interval=0.05)
+        self.addCleanup(watcher.close)
+        return watcher
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "inotify is Linux-only")
+class InotifyWatcherTests(WatcherTests, unittest.TestCase):
+    def watcher(self):
+        watcher = InotifyWatcher(self.root)
+        self.addCleanup(watcher.close)
+        return watcher
@@ -0,0 +1,25 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+# These are the test cases used by test_discovery.py.
+
+import unittest
+
+
+class SpamTests(unittest.TestCase):
+    def test_spam(self):
+        pass
+
+    @unittest.skip("???")
+    def test_skipped(self):
+        pass
+
+    @unittest.expectedFailure
+    def test_failing(self):
+        raise Exception
+
+
+@unittest.skip("???")
+class EggsTests(unittest.TestCase):
+    def test_eggs(self):
+        pass
@@ -0,0 +1,265 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+from __future__ import print_function, unicode_literals
+
+import doctest
+import unittest
+
+from ....util import Stub, StubProxy
+from testing_tools.adapter.util import fix_path, ABS_PATH, DIRNAME, PATH_JOIN
+from testing_tools.adapter.info import TestInfo, TestPath, ParentInfo
+from testing_tools.adapter.unittest import _discovery
+from testing_tools.adapter.unittest._discovery import discover, TestCollector
+from . import _cases
+
+
+TESTROOT = DIRNAME(ABS_PATH(__file__))
+FILEID = "./_cases.py"
+RELFILE = fix_path(FILEID)
+
+
+class StubLoader(StubProxy):
+    def __init__(self, stub=None):
+        super(StubLoader, self).__init__(stub, "loader")
+        self.return_discover = unittest.TestSuite()
+        self.errors = []
+
+    def discover(self, start, pattern, top):
+        self.add_call("discover", (start, pattern, top), None)
+        return self.return_discover
+
+
+class StubStream(StubProxy):
+    def __init__(self, stub=None):
+        super(StubStream, self).__init__(stub, "stream")
+
+    def add(self, test, parents):
+        self.add_call("add", (test, parents), None)
+
+
+def _suite(*cases):
+    suite = unittest.TestSuite()
+    for cls, methodname in cases:
+        suite.addTest(cls(methodname))
+    return suite
+
+
+def _expected_test(cls, methodname, lineno, markers=None):
+    suiteid = "{}::{}".format(FILEID, cls.__name__)
+    return TestInfo(
+        id="{}::{}".format(suiteid, methodname),
+        name=methodname,
+        path=TestPath(
+            root=TESTROOT,
+            relfile=RELFILE,
+            func="{}.{}".format(cls.__name__, methodname),
+        ),
+        source="{}:{}".format(RELFILE, lineno),
+        markers=markers,
+        parentid=suiteid,
+    )
+
+
+class ParseArgsTests(unittest.TestCase):
+    def test_defaults(self):
+        args = _discovery._parse_args([])
+
+        self.assertEqual(
+            (args.start, args.pattern, args.top, args.patterns),
+            (".", "test*.py", None, None),
+        )
+
+    def test_options(self):
+        args = _discovery._parse_args(
+            ["-v", "-s", "tests", "-p", "*_test.py", "-t", ".", "-k", "spam"]
+        )
+
+        self.assertEqual(
+            (args.start, args.pattern, args.top, args.patterns),
+            ("tests", "*_test.py", ".", ["*spam*"]),
+        )
+
+    def test_positional(self):
+        args = _discovery._parse_args(["tests", "*_test.py", "."])
+
+        self.assertEqual(
+            (args.start, args.pattern, args.top),
+            ("tests", "*_test.py", "."),
+        )
+
+    def test_too_many_args(self):
+        with self.assertRaises(SystemExit):
+            _discovery._parse_args(["tests", "*_test.py", ".", "???"])
+
+
+class DiscoverTests(unittest.TestCase):
+    def test_basic(self):
+        stub = Stub()
+        loader = StubLoader(stub)
+        loader.return_discover = _suite(
+            (_cases.SpamTests, "test_spam"),
+        )
+
+        parents, tests = discover(["-s", TESTROOT], _loader=loader)
+
+        self.assertEqual(
+            parents,
+            [
+                ParentInfo(id=".", kind="folder", name=TESTROOT),
+                ParentInfo(
+                    id=FILEID,
+                    kind="file",
+                    name="_cases.py",
+                    root=TESTROOT,
+                    relpath=RELFILE,
+                    parentid=".",
+                ),
+                ParentInfo(
+                    id=FILEID + "::SpamTests",
+                    kind="suite",
+                    name="SpamTests",
+                    root=TESTROOT,
+                    parentid=FILEID,
+                ),
+            ],
+        )
+        self.assertEqual(tests, [_expected_test(_cases.SpamTests, "test_spam", 10)])
+        self.assertEqual(
+            stub.calls,
+            [
+                ("loader.discover", (TESTROOT, "test*.py", None), None),
+            ],
+        )
+
+    def test_top_level_dir(self):
+        loader = StubLoader()
+        loader.return_discover = _suite(
+            (_cases.SpamTests, "test_spam"),
+        )
+        topdir = DIRNAME(TESTROOT)
+
+        parents, tests = discover(["-s", TESTROOT, "-t", topdir], _loader=loader)
+
+        self.assertEqual(
+            [(p.id, p.kind) for p in parents],
+            [
+                (".", "folder"),
+                ("./unittest", "folder"),
+                ("./unittest/_cases.py", "file"),
+                ("./unittest/_cases.py::SpamTests", "suite"),
+            ],
+        )
+        self.assertEqual(tests[0].id, "./unittest/_cases.py::SpamTests::test_spam")
+        self.assertEqual(tests[0].path.root, topdir)
+
+    def test_no_tests_found(self):
+        loader = StubLoader()
+
+        parents, tests = discover([], _loader=loader)
+
+        self.assertEqual(parents, [])
+        self.assertEqual(tests, [])
+
+    def test_failure(self):
+        loader = StubLoader()
+        loader.errors = ["Failed to import test module: test_spam"]
+
+        with self.assertRaises(Exception):
+            discover([], _loader=loader)
+
+    def test_stream(self):
+        stub = Stub()
+        loader = StubLoader()
+        loader.return_discover = _suite(
+            (_cases.SpamTests, "test_spam"),
+            (_cases.SpamTests, "test_skipped"),
+        )
+        stream = StubStream(stub)
+
+        parents, tests = discover(["-s", TESTROOT], stream=stream, _loader=loader)
+
+        streamed = [call[1][0] for call in stub.calls]
+        self.assertEqual(
+            stub.calls,
+            [
+                ("stream.add", (streamed[0], parents), None),
+                ("stream.add", (streamed[1], []), None),
+            ],
+        )
+        self.assertEqual(
+            [test.name for test in streamed], ["test_spam", "test_skipped"]
+        )
+        # The streamed tests are not kept.
+        self.assertEqual(tests, [])
+
+
+class CollectorTests(unittest.TestCase):
+    def test_nested_suites(self):
+        suite = unittest.TestSuite(
+            [
+                _suite(
+                    (_cases.SpamTests, "test_spam"),
+                    (_cases.SpamTests, "test_skipped"),
+                ),
+                unittest.TestSuite(
+                    [
+                        _suite(
+                            (_cases.SpamTests, "test_failing"),
+                            (_cases.EggsTests, "test_eggs"),
+                        ),
+                    ]
+                ),
+            ]
+        )
+        collector = TestCollector(TESTROOT)
+
+        collector.add_suite(suite)
+
+        self.assertEqual(
+            list(collector._tests),
+            [
+                _expected_test(_cases.SpamTests, "test_spam", 10),
+                _expected_test(_cases.SpamTests, "test_skipped", 13, ["skip"]),
+                _expected_test(
+                    _cases.SpamTests, "test_failing", 17, ["expected-failure"]
+                ),
+                _expected_test(_cases.EggsTests, "test_eggs", 24, ["skip"]),
+            ],
+        )
+        self.assertEqual(
+            [p.id for p in collector._tests.parents],
+            [".", FILEID, FILEID + "::EggsTests", FILEID + "::SpamTests"],
+        )
+
+    def test_parse_test(self):
+        collector = TestCollector(TESTROOT)
+
+        test, parents = collector.parse_test(_cases.SpamTests("test_spam"))
+
+        self.assertEqual(test, _expected_test(_cases.SpamTests, "test_spam", 10))
+        self.assertEqual(
+            parents,
+            [
+                (FILEID + "::SpamTests", "SpamTests", "suite"),
+                (FILEID, "_cases.py", "file"),
+                (".", TESTROOT, "folder"),
+            ],
+        )
+
+    def test_parse_test_outside_root(self):
+        collector = TestCollector(PATH_JOIN(TESTROOT, "spam"))
+
+        test, parents = collector.parse_test(_cases.SpamTests("test_spam"))
+
+        self.assertIsNone(test)
+        self.assertIsNone(parents)
+
+    def test_parse_test_not_a_method(self):
+        collector = TestCollector(TESTROOT)
+        case = doctest.DocTestCase(doctest.DocTest([], {}, "spam", None, 0, None))
+
+        test, parents = collector.parse_test(case)
+
+        self.assertIsNone(test)
+        self.assertIsNone(parents)
@@ -32,6 +32,9 @@ const ISOLATED = _ISOLATED;
 //
 // ignored scripts:
 //  * install_debugpy.py  (used only for extension development)
+//  * jsonLinesServer.py  (a helper module for the other scripts)
+//  * refactor_benchmark.py  (used only for extension development)
+//  * testing_tools/discovery_benchmark.py  (used only for extension development)
 
 export * as testing_tools from './testing_tools';
 export * as vscode_datascience_helpers from './vscode_datascience_helpers';
@@ -270,6 +273,78 @@ export function symbolProvider(
     return [args, parse];
 }
 
+//============================
+// symbolIndexer.py
+
+namespace _symbolIndexer {
+    export type Summary = {
+        files: number;
+        symbols: number;
+        parsed: number;
+        removed: number;
+    };
+}
+
+export function symbolIndexer(
+    root: string,
+    cacheFile?: string
+): [string[], (out: string) => _symbolIndexer.Summary] {
+    const script = path.join(SCRIPTS_DIR, 'symbolIndexer.py');
+    const args = [ISOLATED, script, root];
+    if (cacheFile) {
+        args.push('--cache', cacheFile);
+    }
+
+    function parse(out: string): _symbolIndexer.Summary {
+        return JSON.parse(out);
+    }
+
+    return [args, parse];
+}
+
+//============================
+// symbolSearch.py
+
+namespace _symbolSearch {
+    type Position = {
+        line: number;
+        character: number;
+    };
+    export type Symbol = {
+        file: string;
+        kind: string;
+        name: string;
+        // If no namespace then ''.
+        namespace: string;
+        range: {
+            start: Position;
+            end: Position;
+        };
+    };
+}
+
+export function symbolSearch(
+    root: string,
+    query: string,
+    limit?: number,
+    cacheFile?: string
+): [string[], (out: string) => _symbolSearch.Symbol[]] {
+    const script = path.join(SCRIPTS_DIR, 'symbolSearch.py');
+    const args = [ISOLATED, script, root, query];
+    if (limit !== undefined) {
+        args.push('--limit', `${limit}`);
+    }
+    if (cacheFile) {
+        args.push('--cache', cacheFile);
+    }
+
+    function parse(out: string): _symbolSearch.Symbol[] {
+        return JSON.parse(out);
+    }
+
+    return [args, parse];
+}
+
 //============================
 // printEnvVariables.py
 